@@ -0,0 +1,58 @@
+"""Compare two benchmark result files.
+
+    python -m benchmarks.compare results/baseline.json results/candidate.json
+
+Prints every numeric metric shared by both reports (throughput and latency for
+``http_bench``, ingest rates and per-transaction costs for ``ingest_replay``,
+parse times for ``parser_bench``)
+with the relative change of the candidate against the baseline. Exits non-zero
+when ``--fail-over`` is given and any p99 regresses by more than that percentage.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def _change(old: float, new: float) -> str:
+    if not old:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def compare(baseline: dict, candidate: dict):
+    rows = []
+    for name, old in baseline["results"].items():
+        new = candidate["results"].get(name)
+        if new is None:
+            continue
+        for metric, value in old.items():
+            if isinstance(value, (int, float)) and isinstance(new.get(metric), (int, float)):
+                rows.append((name, metric, value, new[metric], _change(value, new[metric])))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--fail-over", type=float, default=None, help="fail if any p99 regresses by more than this percent")
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text())
+    candidate = json.loads(args.candidate.read_text())
+    print(f"baseline : {baseline['meta'].get('git_commit')} {baseline['meta'].get('label', '')}")
+    print(f"candidate: {candidate['meta'].get('git_commit')} {candidate['meta'].get('label', '')}")
+    print(f"{'scenario':<24}{'metric':<32}{'baseline':>12}{'candidate':>12}{'change':>10}")
+
+    regressed = False
+    for name, metric, old, new, change in compare(baseline, candidate):
+        print(f"{name:<24}{metric:<32}{old:>12}{new:>12}{change:>10}")
+        if args.fail_over is not None and metric == "p99_ms" and old and (new - old) / old * 100 > args.fail_over:
+            regressed = True
+
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Micro-benchmark for response serialization.
+
+Compares FastAPI's default path (response_model validation, jsonable_encoder,
+stdlib json.dumps) with the response classes in ``src.responses`` on the two
+payload shapes that grow with the data: the escrow-transactions listing (a
+plain dict) and the bulk campaign lookup (a pydantic model). Reports
+microseconds per response and the body size for each payload size.
+
+    python -m benchmarks.json_bench --sizes 10,100,1000,10000
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def transactions_payload(rng: random.Random, size: int) -> dict:
+    transactions = [{
+        "signature": "".join(rng.choices("123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz", k=88)),
+        "amount": rng.randint(1, 5000) / 1000,
+        "from": f"sender{rng.randint(0, size)}",
+        "mint": None,
+        "timestamp": 1_700_000_000 + i,
+    } for i in range(size)]
+    return {
+        "transactionCount": size,
+        "contributors": sorted({t["from"] for t in transactions}),
+        "transactions": transactions,
+    }
+
+
+def campaigns_payload(rng: random.Random, size: int):
+    from src.schema import CampaignBulkResponse, CampaignData
+    now = datetime.now(timezone.utc)
+    campaigns = [CampaignData(
+        id=f"id-{i}", name=f"Campaign {i}", symbol="TKN", contract_address=f"ca{i}",
+        wallet_address=f"wallet{i}", goal_amount=rng.randint(10, 1000), status="active",
+        created_at=now, expires_at=now + timedelta(days=7), campaign_type="launch",
+        current_balance=rng.random() * 100, contributor_count=rng.randint(0, 500),
+    ) for i in range(size)]
+    return CampaignBulkResponse(success=True, campaigns=campaigns)
+
+
+def bench(render, repeat: int) -> dict:
+    body = render()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        render()
+    elapsed = time.perf_counter() - started
+    return {"us_per_response": round(elapsed / repeat * 1e6, 2), "bytes": len(body)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="response serialization micro-benchmark")
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="transactions / campaigns per response")
+    parser.add_argument("--min-items", type=int, default=200000, help="items serialized per measurement")
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "json_bench.json")
+    args = parser.parse_args()
+
+    from src.responses import ModelResponse, ORJSONResponse
+    from src.schema import CampaignBulkResponse
+
+    loop = asyncio.new_event_loop()
+    bulk_field = create_response_field(name="bulk", type_=CampaignBulkResponse)
+
+    def default_path(content, field=None):
+        encoded = loop.run_until_complete(
+            serialize_response(field=field, response_content=content, is_coroutine=True)
+        )
+        return JSONResponse(encoded).body
+
+    rng = random.Random(7)
+    results = {}
+    for size in (int(s) for s in args.sizes.split(",")):
+        repeat = max(3, args.min_items // size)
+        transactions = transactions_payload(rng, size)
+        campaigns = campaigns_payload(rng, size)
+        cases = {
+            f"escrow_transactions_{size}_default": lambda: default_path(transactions),
+            f"escrow_transactions_{size}_orjson": lambda: ORJSONResponse(transactions).body,
+            f"bulk_campaigns_{size}_default": lambda: default_path(campaigns, bulk_field),
+            f"bulk_campaigns_{size}_model": lambda: ModelResponse(campaigns).body,
+        }
+        for name, render in cases.items():
+            results[name] = bench(render, repeat)
+            print(f"{name:<36} {results[name]}")
+
+    report = {
+        "meta": {"timestamp": datetime.now(timezone.utc).isoformat(), "python": platform.python_version(),
+                 "min_items": args.min_items},
+        "results": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
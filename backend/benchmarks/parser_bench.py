@@ -0,0 +1,107 @@
+"""Micro-benchmark for ``parse_transaction`` on large multi-instruction transactions.
+
+Compares the current parser with the previous balance-delta heuristic (kept
+here as ``legacy_parse_transaction``) on synthetic transactions with many
+accounts and several transfers to the escrow, and reports time per transaction
+and how many of the expected transfers each parser recovered with the right
+sender.
+
+    python -m benchmarks.parser_bench --accounts 8,64,256 --transfers 1,8,32
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from solders.rpc.responses import GetTransactionResp
+
+from benchmarks.solana_fixtures import random_pubkey, random_signature, transfer_transaction
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def legacy_parse_transaction(tx_detail, wallet_address: str):
+    """The pre-rewrite parser: first positive delta, O(n^2) fee-tolerant sender guess"""
+    pre_balances = tx_detail.meta.pre_balances
+    post_balances = tx_detail.meta.post_balances
+    account_keys = [getattr(key, "pubkey", key) for key in tx_detail.transaction.message.account_keys]
+    for i, (pre, post) in enumerate(zip(pre_balances, post_balances)):
+        if str(account_keys[i]) == wallet_address and post > pre:
+            amount_lamports = post - pre
+            sender = "Unknown"
+            for j, (pre_j, post_j) in enumerate(zip(pre_balances, post_balances)):
+                if j != i and post_j < pre_j and abs((pre_j - post_j) - amount_lamports) < 5000:
+                    sender = str(account_keys[j])
+                    break
+            return [{'amount': amount_lamports / 1e9, 'from': sender}]
+    return []
+
+
+def build_case(rng: random.Random, accounts: int, transfers: int):
+    escrow = random_pubkey(rng)
+    senders = [random_pubkey(rng) for _ in range(transfers)]
+    moves = [(s, escrow, rng.randint(1, 5000) * 10 ** 6) for s in senders]
+    raw = transfer_transaction(random_signature(rng), 1, 1, moves, extra_accounts=accounts, rng=rng)
+    tx = GetTransactionResp.from_json(json.dumps(raw)).value.transaction
+    return tx, escrow, {(s, l) for s, _, l in moves}
+
+
+def score(found, expected) -> float:
+    got = {(t['from'], round(float(t['amount']) * 10 ** 9)) for t in found}
+    return len(got & expected) / len(expected)
+
+
+def bench(parser, cases, repeat: int) -> dict:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for tx, escrow, _ in cases:
+            parser(tx, escrow)
+    elapsed = time.perf_counter() - started
+    recovered = sum(score(parser(tx, escrow), expected) for tx, escrow, expected in cases) / len(cases)
+    return {"us_per_tx": round(elapsed / (repeat * len(cases)) * 1e6, 2), "recovered_fraction": round(recovered, 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="parse_transaction micro-benchmark")
+    parser.add_argument("--accounts", default="8,64,256", help="unrelated accounts per transaction")
+    parser.add_argument("--transfers", default="1,8,32", help="transfers to the escrow per transaction")
+    parser.add_argument("--cases", type=int, default=50, help="distinct transactions per combination")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "parser_bench.json")
+    args = parser.parse_args()
+
+    # parse_transaction lives in src.services, which reads settings on import
+    os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+    os.environ.setdefault("SOLANA_RPC_URL", "http://127.0.0.1:9")
+    os.environ.setdefault("REDIS_URL", "redis://127.0.0.1:9/0")
+    os.environ.setdefault("WALLET", "9o24Px7asSDJ1ZLyQhZd7vehm9kX4VuTeJh7VGryjXkm")
+    from src.services import parse_transaction
+    logging.getLogger("service").setLevel(logging.WARNING)
+
+    rng = random.Random(11)
+    results = {}
+    for accounts in (int(a) for a in args.accounts.split(",")):
+        for transfers in (int(t) for t in args.transfers.split(",")):
+            cases = [build_case(rng, accounts, transfers) for _ in range(args.cases)]
+            name = f"accounts_{accounts}_transfers_{transfers}"
+            results[f"{name}_legacy"] = bench(legacy_parse_transaction, cases, args.repeat)
+            results[f"{name}_current"] = bench(parse_transaction, cases, args.repeat)
+            print(f"{name:<32} legacy {results[f'{name}_legacy']}  current {results[f'{name}_current']}")
+
+    report = {
+        "meta": {"timestamp": datetime.now(timezone.utc).isoformat(), "python": platform.python_version(),
+                 "cases": args.cases, "repeat": args.repeat},
+        "results": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Seed a benchmark database with synthetic campaigns and transactions.
+
+    python -m benchmarks.seed --database-url postgresql+asyncpg://... --campaigns 10000 --transactions 1000000
+
+Data is generated from a fixed random seed so two runs against the same
+parameters produce identical tables. The addresses of the seeded campaigns are
+written to a manifest so the load generator can pick realistic request targets.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import sqlalchemy as sa
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.base import Base
+from src.models import Campaign, Transaction
+
+CHUNK_SIZE = 5000
+
+
+def _pubkey(rng: random.Random) -> str:
+    return str(Pubkey(rng.randbytes(32)))
+
+
+def _signature(rng: random.Random) -> str:
+    return str(Signature(rng.randbytes(64)))
+
+
+def build_campaigns(rng: random.Random, count: int):
+    now = datetime.now(timezone.utc)
+    for i in range(count):
+        yield {
+            "id": f"{i:08d}-0000-4000-8000-{rng.getrandbits(48):012x}",
+            "campaign_id": f"cmp_{i:08x}",
+            "wallet_address": _pubkey(rng),
+            "is_active": True,
+            "contract_address": _pubkey(rng),
+            "goal_amount": Decimal(rng.randint(50, 5000)),
+            "expires_at": now + timedelta(days=rng.randint(1, 30)),
+            "campaign_type": "dex ads",
+            "name": f"Bench Token {i}",
+            "symbol": f"B{i}",
+            "image_url": None,
+            "status": "active",
+            "created_at": now,
+            "liquidity": Decimal("10000"),
+            "market_cap": Decimal("125000"),
+            "price_usd": Decimal("0.000123"),
+            "volume_24h": Decimal("2500"),
+        }
+
+
+def build_transactions(rng: random.Random, campaigns, count: int, skew: float):
+    """Transactions spread over campaigns; ``skew`` > 0 concentrates them on low indexes"""
+    now = int(time.time())
+    contributors = [_pubkey(rng) for _ in range(max(1, count // 20))]
+    for _ in range(count):
+        index = int(len(campaigns) * (rng.random() ** (1 + skew)))
+        campaign = campaigns[index]
+        amount = Decimal(rng.randint(1, 5000)) / 1000
+        ts = now - rng.randint(0, 30 * 86400)
+        yield {
+            "id": f"{rng.getrandbits(128):032x}",
+            "campaign_id": campaign["campaign_id"],
+            "signature": _signature(rng),
+            "amount": amount,
+            "from_wallet": rng.choice(contributors),
+            "to_wallet": campaign["wallet_address"],
+            "timestamp": ts,
+            "amount_usd": amount * 180,
+            "block_time": datetime.fromtimestamp(ts, timezone.utc),
+            "processed_at": datetime.fromtimestamp(ts + 5, timezone.utc),
+        }
+
+
+async def _insert_chunks(conn, table, rows):
+    chunk = []
+    inserted = 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            await conn.execute(sa.insert(table), chunk)
+            inserted += len(chunk)
+            chunk = []
+    if chunk:
+        await conn.execute(sa.insert(table), chunk)
+        inserted += len(chunk)
+    return inserted
+
+
+async def seed(database_url: str, campaigns: int, transactions: int, skew: float = 0.0,
+               seed_value: int = 42, manifest: Path = None, reset: bool = False) -> dict:
+    rng = random.Random(seed_value)
+    engine = create_async_engine(database_url)
+    started = time.perf_counter()
+    try:
+        async with engine.begin() as conn:
+            if reset:
+                await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+
+        campaign_rows = list(build_campaigns(rng, campaigns))
+        async with engine.begin() as conn:
+            await _insert_chunks(conn, Campaign.__table__, campaign_rows)
+        async with engine.begin() as conn:
+            await _insert_chunks(conn, Transaction.__table__,
+                                 build_transactions(rng, campaign_rows, transactions, skew))
+            if engine.dialect.name == "postgresql":
+                await conn.execute(sa.text("ANALYZE"))
+    finally:
+        await engine.dispose()
+
+    info = {
+        "campaigns": campaigns,
+        "transactions": transactions,
+        "skew": skew,
+        "seed": seed_value,
+        "seconds": round(time.perf_counter() - started, 2),
+        "targets": [
+            {"campaign_id": c["campaign_id"], "contract_address": c["contract_address"],
+             "wallet_address": c["wallet_address"]}
+            for c in campaign_rows
+        ],
+    }
+    if manifest:
+        manifest.parent.mkdir(parents=True, exist_ok=True)
+        manifest.write_text(json.dumps(info))
+    return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a benchmark database")
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--campaigns", type=int, default=10_000)
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--skew", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--manifest", type=Path, default=Path(__file__).resolve().parent / "results" / "manifest.json")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first (destroys data)")
+    args = parser.parse_args()
+
+    info = asyncio.run(seed(args.database_url, args.campaigns, args.transactions, args.skew,
+                            args.seed, args.manifest, reset=args.reset))
+    print(f"Seeded {info['campaigns']} campaigns and {info['transactions']} transactions in {info['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Recorded and synthetic Solana RPC fixtures, and a client that replays them.
+
+Fixture sets are directories holding two JSON-lines files with raw JSON-RPC
+responses exactly as the node returned them:
+
+    signatures.jsonl    {"address": <wallet>, "response": <getSignaturesForAddress response>}
+    transactions.jsonl  {"signature": <sig>, "response": <getTransaction response (jsonParsed)>}
+
+They can be recorded from a real node (``record_fixtures``) or generated
+(``synthesize_fixtures``), and are served by ``ReplayClient`` which mimics the
+subset of ``solana.rpc.api.Client`` used by the monitor.
+"""
+import json
+import random
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from solders.pubkey import Pubkey
+from solders.rpc.responses import GetSignaturesForAddressResp, GetTransactionResp
+from solders.signature import Signature
+
+SYSTEM_PROGRAM = "11111111111111111111111111111111"
+COMPUTE_BUDGET_PROGRAM = "ComputeBudget111111111111111111111111111111"
+MEMO_PROGRAM = "MemoSq4gqABAXKb96qnH8TysNcWxMyWCqXgDLGmfcHr"
+
+SIGNATURES_FILE = "signatures.jsonl"
+TRANSACTIONS_FILE = "transactions.jsonl"
+
+
+def random_pubkey(rng: random.Random) -> str:
+    return str(Pubkey(rng.randbytes(32)))
+
+
+def random_signature(rng: random.Random) -> str:
+    return str(Signature(rng.randbytes(64)))
+
+
+def _rpc(result) -> dict:
+    return {"jsonrpc": "2.0", "id": 1, "result": result}
+
+
+def _account(pubkey: str, signer: bool = False, writable: bool = False) -> dict:
+    return {"pubkey": pubkey, "signer": signer, "writable": writable, "source": "transaction"}
+
+
+def transfer_transaction(signature: str, slot: int, block_time: int, transfers: List[tuple],
+                         fee: int = 5000, extra_accounts: int = 0, memo: Optional[str] = None,
+                         references: Iterable[str] = (), rng: Optional[random.Random] = None) -> dict:
+    """Build a jsonParsed getTransaction response containing system transfers.
+
+    ``transfers`` is a list of ``(source, destination, lamports)``. The fee payer
+    is the first source. ``extra_accounts`` adds unrelated writable accounts
+    touched by opaque program instructions, which is what large DEX/aggregator
+    transactions look like to a balance-delta parser. ``references`` are added as
+    read-only accounts, like the Solana Pay ``reference`` parameter.
+    """
+    rng = rng or random.Random(slot)
+    keys: List[str] = []
+    index: Dict[str, int] = {}
+
+    def key(pubkey: str) -> int:
+        if pubkey not in index:
+            index[pubkey] = len(keys)
+            keys.append(pubkey)
+        return index[pubkey]
+
+    fee_payer = transfers[0][0]
+    key(fee_payer)
+    for source, destination, _ in transfers:
+        key(source)
+        key(destination)
+    extras = [random_pubkey(rng) for _ in range(extra_accounts)]
+    for extra in extras:
+        key(extra)
+    for program in (SYSTEM_PROGRAM, COMPUTE_BUDGET_PROGRAM) + ((MEMO_PROGRAM,) if memo else ()):
+        key(program)
+    references = list(references)
+    for reference in references:
+        key(reference)
+
+    pre = [rng.randint(10, 1000) * 10 ** 9 if k not in (SYSTEM_PROGRAM, COMPUTE_BUDGET_PROGRAM, MEMO_PROGRAM, *references)
+           else 1 for k in keys]
+    post = list(pre)
+    post[index[fee_payer]] -= fee
+    for source, destination, lamports in transfers:
+        post[index[source]] -= lamports
+        post[index[destination]] += lamports
+    for extra in extras:
+        # opaque programs shuffle small lamport amounts between unrelated accounts
+        post[index[extra]] += rng.randint(-5000, 5000)
+
+    instructions = [{"programId": COMPUTE_BUDGET_PROGRAM, "accounts": [], "data": "3GAG5eogvTjV", "stackHeight": None}]
+    instructions += [
+        {"program": "system", "programId": SYSTEM_PROGRAM, "stackHeight": None,
+         "parsed": {"type": "transfer", "info": {"source": s, "destination": d, "lamports": l}}}
+        for s, d, l in transfers
+    ]
+    for extra in extras:
+        instructions.append({"programId": random_pubkey(rng), "accounts": [extra, fee_payer],
+                             "data": "3Bxs4h24hBtQy9rw", "stackHeight": None})
+    if memo:
+        instructions.append({"program": "spl-memo", "programId": MEMO_PROGRAM, "parsed": memo, "stackHeight": None})
+
+    signers = {fee_payer} | {s for s, _, _ in transfers}
+    writable = signers | {d for _, d, _ in transfers} | set(extras)
+    return _rpc({
+        "slot": slot,
+        "blockTime": block_time,
+        "version": 0,
+        "transaction": {
+            "signatures": [signature],
+            "message": {
+                "accountKeys": [_account(k, k in signers, k in writable) for k in keys],
+                "recentBlockhash": random_pubkey(rng),
+                "instructions": instructions,
+            },
+        },
+        "meta": {
+            "err": None, "status": {"Ok": None}, "fee": fee,
+            "preBalances": pre, "postBalances": post,
+            "innerInstructions": [], "logMessages": [],
+            "preTokenBalances": [], "postTokenBalances": [], "rewards": [],
+            "loadedAddresses": {"writable": [], "readonly": []},
+            "computeUnitsConsumed": 450,
+        },
+    })
+
+
+def signatures_response(entries: List[dict]) -> dict:
+    return _rpc([
+        {"signature": e["signature"], "slot": e["slot"], "err": None, "memo": None,
+         "blockTime": e["block_time"], "confirmationStatus": "finalized"}
+        for e in entries
+    ])
+
+
+def synthesize_fixtures(out_dir: Path, wallets: int, per_wallet: int = 5, seed: int = 7,
+                        extra_accounts: int = 0) -> Path:
+    """Generate a fixture set of ``wallets`` escrow wallets each receiving ``per_wallet`` transfers"""
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    now = int(time.time())
+    slot = 300_000_000
+    with open(out_dir / SIGNATURES_FILE, "w") as sig_file, open(out_dir / TRANSACTIONS_FILE, "w") as tx_file:
+        for _ in range(wallets):
+            wallet = random_pubkey(rng)
+            entries = []
+            for _ in range(per_wallet):
+                slot += rng.randint(1, 20)
+                block_time = now - rng.randint(0, 3600)
+                signature = random_signature(rng)
+                lamports = rng.randint(1, 5000) * 10 ** 6
+                tx = transfer_transaction(signature, slot, block_time, [(random_pubkey(rng), wallet, lamports)],
+                                          extra_accounts=extra_accounts, rng=rng)
+                tx_file.write(json.dumps({"signature": signature, "response": tx}) + "\n")
+                entries.append({"signature": signature, "slot": slot, "block_time": block_time})
+            entries.sort(key=lambda e: e["slot"], reverse=True)  # newest first, like the node
+            sig_file.write(json.dumps({"address": wallet, "response": signatures_response(entries)}) + "\n")
+    return out_dir
+
+
+def record_fixtures(out_dir: Path, rpc_url: str, wallets: Iterable[str], limit: int = 5) -> Path:
+    """Record real getSignaturesForAddress/getTransaction responses for ``wallets``"""
+    from solana.rpc.api import Client
+
+    client = Client(rpc_url)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with open(out_dir / SIGNATURES_FILE, "a") as sig_file, open(out_dir / TRANSACTIONS_FILE, "a") as tx_file:
+        for wallet in wallets:
+            signatures = client.get_signatures_for_address(Pubkey.from_string(wallet), limit=limit)
+            sig_file.write(json.dumps({"address": wallet, "response": json.loads(signatures.to_json())}) + "\n")
+            for sig_info in signatures.value:
+                tx = client.get_transaction(sig_info.signature, encoding="jsonParsed",
+                                            max_supported_transaction_version=0)
+                tx_file.write(json.dumps({"signature": str(sig_info.signature),
+                                          "response": json.loads(tx.to_json())}) + "\n")
+    return out_dir
+
+
+def load_fixtures(fixtures_dir: Path, max_wallets: Optional[int] = None):
+    """Load and pre-parse a fixture set; returns (wallet order, signatures, transactions)"""
+    wallets: List[str] = []
+    signatures: Dict[str, GetSignaturesForAddressResp] = {}
+    with open(fixtures_dir / SIGNATURES_FILE) as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry["address"] not in signatures:
+                wallets.append(entry["address"])
+            signatures[entry["address"]] = GetSignaturesForAddressResp.from_json(json.dumps(entry["response"]))
+            if max_wallets and len(wallets) >= max_wallets:
+                break
+    wanted = {str(s.signature) for resp in signatures.values() for s in resp.value}
+    transactions: Dict[str, GetTransactionResp] = {}
+    with open(fixtures_dir / TRANSACTIONS_FILE) as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry["signature"] in wanted:
+                transactions[entry["signature"]] = GetTransactionResp.from_json(json.dumps(entry["response"]))
+    return wallets, signatures, transactions
+
+
+class ReplayClient:
+    """Serves pre-parsed fixtures through the ``solana.rpc.api.Client`` call signatures.
+
+    ``latency_ms`` adds a blocking sleep per call, like the real synchronous client.
+    """
+
+    _EMPTY_TX = GetTransactionResp.from_json(json.dumps(_rpc(None)))
+
+    def __init__(self, signatures: Dict[str, GetSignaturesForAddressResp],
+                 transactions: Dict[str, GetTransactionResp], latency_ms: float = 0.0):
+        self.signatures = signatures
+        self.transactions = transactions
+        self.latency = latency_ms / 1000
+        self.calls: Counter = Counter()
+
+    def _call(self, method: str):
+        self.calls[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_signatures_for_address(self, account, before=None, until=None, limit=None, commitment=None):
+        self._call("getSignaturesForAddress")
+        resp = self.signatures.get(str(account))
+        if resp is None:
+            return GetSignaturesForAddressResp([])
+        entries = list(resp.value)
+        if before is not None:
+            positions = [i for i, e in enumerate(entries) if e.signature == before]
+            entries = entries[positions[0] + 1:] if positions else []
+        if until is not None:
+            positions = [i for i, e in enumerate(entries) if e.signature == until]
+            entries = entries[:positions[0]] if positions else entries
+        return GetSignaturesForAddressResp(entries[:limit] if limit else entries)
+
+    def get_transaction(self, tx_sig, encoding="json", commitment=None, max_supported_transaction_version=None):
+        self._call("getTransaction")
+        return self.transactions.get(str(tx_sig), self._EMPTY_TX)
@@ -0,0 +1,169 @@
+"""Local stand-ins for DexScreener, CoinGecko and the Solana JSON-RPC.
+
+Each service is mounted under its own path prefix on a single aiohttp server and
+answers after a configurable delay, so benchmarks measure our own code plus a
+known, repeatable upstream latency instead of the public internet.
+
+    python -m benchmarks.stubs --port 9100 --rpc-latency-ms 40 --coingecko-latency-ms 120
+
+Point the app at it with:
+
+    SOLANA_RPC_URL=http://127.0.0.1:9100/rpc
+    COINGECKO_API_URL=http://127.0.0.1:9100/coingecko/api/v3
+    DEXSCREENER_API_URL=http://127.0.0.1:9100/dexscreener
+"""
+import argparse
+import asyncio
+import os
+import random
+from typing import Dict
+
+from aiohttp import web
+
+SYSTEM_PROGRAM = "11111111111111111111111111111111"
+
+
+class StubState:
+    def __init__(self, rpc_latency_ms: float = 0, coingecko_latency_ms: float = 0,
+                 dexscreener_latency_ms: float = 0, jitter: float = 0.1):
+        self.latency = {
+            "rpc": rpc_latency_ms / 1000,
+            "coingecko": coingecko_latency_ms / 1000,
+            "dexscreener": dexscreener_latency_ms / 1000,
+        }
+        self.jitter = jitter
+        self.calls: Dict[str, int] = {}
+
+    async def delay(self, service: str, method: str):
+        self.calls[f"{service}.{method}"] = self.calls.get(f"{service}.{method}", 0) + 1
+        base = self.latency[service]
+        if base > 0:
+            await asyncio.sleep(max(0.0, random.gauss(base, base * self.jitter)))
+
+
+# --------------------------
+# CoinGecko
+# --------------------------
+async def coingecko_simple_price(request: web.Request) -> web.Response:
+    state: StubState = request.app["state"]
+    await state.delay("coingecko", "simple_price")
+    return web.json_response({"solana": {"usd": 180.0 + random.random()}})
+
+
+async def coingecko_market_chart_range(request: web.Request) -> web.Response:
+    state: StubState = request.app["state"]
+    await state.delay("coingecko", "market_chart_range")
+    start, end = int(request.query["from"]), int(request.query["to"])
+    # 5-minute samples, like CoinGecko for ranges under a day
+    first = start - start % 300
+    return web.json_response({"prices": [[ts * 1000, 180.0 + (ts // 300) % 10] for ts in range(first, end + 1, 300)]})
+
+
+# --------------------------
+# DexScreener
+# --------------------------
+def _pair(address: str) -> dict:
+    return {
+        "chainId": "solana",
+        "baseToken": {"address": address, "name": f"Token {address[:6]}", "symbol": address[:4].upper()},
+        "priceUsd": "0.000123",
+        "liquidity": {"usd": 10000.5},
+        "volume": {"h24": 2500.25},
+        "marketCap": 125000,
+        "info": {
+            "imageUrl": f"https://dd.dexscreener.com/ds-data/tokens/solana/{address}.png",
+            "websites": [{"url": "https://example.org"}],
+            "socials": [{"type": "twitter", "url": "https://x.com/example"}],
+        },
+    }
+
+
+async def dexscreener_tokens(request: web.Request) -> web.Response:
+    state: StubState = request.app["state"]
+    await state.delay("dexscreener", "tokens")
+    addresses = request.match_info["addresses"].split(",")
+    return web.json_response({"schemaVersion": "1.0.0", "pairs": [_pair(a) for a in addresses]})
+
+
+# --------------------------
+# Solana JSON-RPC
+# --------------------------
+def _context(result) -> dict:
+    return {"context": {"slot": 300000000, "apiVersion": "1.18.0"}, "value": result}
+
+
+def _account(lamports: int) -> dict:
+    return {"lamports": lamports, "owner": SYSTEM_PROGRAM, "data": ["", "base64"],
+            "executable": False, "rentEpoch": 18446744073709551615, "space": 0}
+
+
+def rpc_result(state: StubState, method: str, params: list):
+    if method == "getSlot":
+        return 300000000
+    if method == "getBalance":
+        return _context(random.randint(1, 500) * 10 ** 9)
+    if method == "getAccountInfo":
+        return _context(_account(1461600))
+    if method == "getMultipleAccounts":
+        return _context([_account(random.randint(1, 500) * 10 ** 9) for _ in params[0]])
+    raise KeyError(method)
+
+
+async def solana_rpc(request: web.Request) -> web.Response:
+    state: StubState = request.app["state"]
+    payload = await request.json()
+    batch = payload if isinstance(payload, list) else [payload]
+    await state.delay("rpc", batch[0]["method"] if len(batch) == 1 else "batch")
+
+    responses = []
+    for call in batch:
+        try:
+            result = rpc_result(state, call["method"], call.get("params", []))
+            responses.append({"jsonrpc": "2.0", "id": call.get("id"), "result": result})
+        except KeyError:
+            responses.append({"jsonrpc": "2.0", "id": call.get("id"),
+                              "error": {"code": -32601, "message": "Method not found"}})
+    return web.json_response(responses if isinstance(payload, list) else responses[0])
+
+
+async def stub_stats(request: web.Request) -> web.Response:
+    return web.json_response(request.app["state"].calls)
+
+
+def build_app(state: StubState) -> web.Application:
+    app = web.Application()
+    app["state"] = state
+    app.router.add_get("/coingecko/api/v3/simple/price", coingecko_simple_price)
+    app.router.add_get("/coingecko/api/v3/coins/solana/market_chart/range", coingecko_market_chart_range)
+    app.router.add_get("/dexscreener/latest/dex/tokens/{addresses}", dexscreener_tokens)
+    app.router.add_post("/rpc", solana_rpc)
+    app.router.add_get("/_stats", stub_stats)
+    return app
+
+
+def upstream_env(host: str, port: int) -> Dict[str, str]:
+    """Environment variables pointing the app at a stub server"""
+    base = f"http://{host}:{port}"
+    return {
+        "SOLANA_RPC_URL": f"{base}/rpc",
+        "COINGECKO_API_URL": f"{base}/coingecko/api/v3",
+        "DEXSCREENER_API_URL": f"{base}/dexscreener",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run local upstream stand-ins")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--rpc-latency-ms", type=float, default=float(os.environ.get("STUB_RPC_LATENCY_MS", 0)))
+    parser.add_argument("--coingecko-latency-ms", type=float, default=float(os.environ.get("STUB_COINGECKO_LATENCY_MS", 0)))
+    parser.add_argument("--dexscreener-latency-ms", type=float, default=float(os.environ.get("STUB_DEXSCREENER_LATENCY_MS", 0)))
+    parser.add_argument("--jitter", type=float, default=0.1, help="latency standard deviation as a fraction of the mean")
+    args = parser.parse_args()
+
+    state = StubState(args.rpc_latency_ms, args.coingecko_latency_ms, args.dexscreener_latency_ms, args.jitter)
+    web.run_app(build_app(state), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
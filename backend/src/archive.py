@@ -0,0 +1,139 @@
+"""Archival of transactions of expired campaigns.
+
+Every hot query filters ``transactions`` by campaign_id, but the table only
+grows. Once a campaign has been expired for ARCHIVE_RETENTION_DAYS, the
+``archive_expired_transactions`` task moves its rows to
+``transactions_archive`` so the hot table and its indexes stay small.
+
+On PostgreSQL the archive is range-partitioned by month of the transaction
+``timestamp``. A month's partition (``transactions_archive_<YYYYMM>``) is
+created the first time a row for it is archived, and old months can be
+detached or dropped on their own.
+
+Reads go through ``all_transactions``, which unions both tables, so
+endpoints do not need to know whether a campaign was archived. Transfers
+that arrive for an archived campaign land in the hot table as usual and are
+moved on the next run.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+
+import sqlalchemy as sa
+
+from src.config import config, async_session, read_session
+from src.models import ArchivedTransaction, Campaign, Transaction
+from src.logger import setup_logger
+
+logger = setup_logger("archive", "archive.log")
+
+ARCHIVE_TABLE = ArchivedTransaction.__tablename__
+# columns copied from transactions; archived_at is filled in by the archive
+_COLUMNS = [c.name for c in ArchivedTransaction.__table__.columns if c.name != 'archived_at']
+_known_partitions: Set[str] = set()
+
+
+# ----------------------------------------------------------------------------
+# Reads
+# ----------------------------------------------------------------------------
+
+def all_transactions(campaign_ids) -> sa.Subquery:
+    """Hot and archived transactions of ``campaign_ids`` (a list or a select of ids) as one subquery"""
+    def _part(model):
+        return sa.select(*(getattr(model, name) for name in _COLUMNS)).where(model.campaign_id.in_(campaign_ids))
+    return sa.union_all(_part(Transaction), _part(ArchivedTransaction)).subquery("all_transactions")
+
+
+async def known_signatures(db, signatures: List[str]) -> Set[str]:
+    """Signatures among ``signatures`` that are already saved, hot or archived"""
+    if not signatures:
+        return set()
+    stmt = sa.union(
+        sa.select(Transaction.signature).where(Transaction.signature.in_(signatures)),
+        sa.select(ArchivedTransaction.signature).where(ArchivedTransaction.signature.in_(signatures)),
+    )
+    return set((await db.execute(stmt)).scalars())
+
+
+async def stream_transactions(campaign_id: str, chunk_size: int = 1000) -> AsyncIterator[Dict]:
+    """Every transaction of a campaign, hot and archived, oldest first.
+
+    Rows are read with a server-side cursor, so exports of any size run in
+    constant memory.
+    """
+    rows = all_transactions([campaign_id])
+    stmt = sa.select(rows).order_by(rows.c.timestamp, rows.c.signature, rows.c.transfer_index)
+    async with read_session() as db:
+        result = await db.stream(stmt.execution_options(yield_per=chunk_size))
+        async for row in result.mappings():
+            yield dict(row)
+
+
+# ----------------------------------------------------------------------------
+# Archival
+# ----------------------------------------------------------------------------
+
+def _month_start(ts: int) -> datetime:
+    return datetime.fromtimestamp(ts, timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+async def _ensure_partitions(db, timestamps: Iterable[int]):
+    """Create the monthly archive partitions covering ``timestamps`` (PostgreSQL only)"""
+    if db.bind.dialect.name != "postgresql":
+        return
+    for start in {_month_start(ts) for ts in timestamps}:
+        name = f"{ARCHIVE_TABLE}_{start:%Y%m}"
+        if name in _known_partitions:
+            continue
+        end = (start + timedelta(days=32)).replace(day=1)
+        await db.execute(sa.text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {ARCHIVE_TABLE} "
+            f"FOR VALUES FROM ({int(start.timestamp())}) TO ({int(end.timestamp())})"
+        ))
+        _known_partitions.add(name)
+
+
+async def archive_campaign(db, campaign_id: str, batch_size: Optional[int] = None) -> int:
+    """Move a campaign's rows from ``transactions`` to the archive; returns the number moved.
+
+    Rows are moved in batches of ARCHIVE_BATCH_SIZE. Each batch is copied and
+    then deleted by id in one DB transaction, so a row written concurrently
+    is never deleted without having been copied.
+    """
+    batch_size = batch_size or config.ARCHIVE_BATCH_SIZE
+    columns = [getattr(Transaction, name) for name in _COLUMNS]
+    moved = 0
+    while True:
+        rows = (await db.execute(
+            sa.select(*columns).where(Transaction.campaign_id == campaign_id).limit(batch_size)
+        )).mappings().all()
+        if not rows:
+            break
+        await _ensure_partitions(db, (row["timestamp"] for row in rows))
+        await db.execute(sa.insert(ArchivedTransaction), [dict(row) for row in rows])
+        await db.execute(sa.delete(Transaction).where(Transaction.id.in_([row["id"] for row in rows])))
+        await db.commit()
+        moved += len(rows)
+        if len(rows) < batch_size:
+            break
+    return moved
+
+
+async def archive_expired(retention_days: Optional[int] = None, limit: int = 100) -> Dict:
+    """Archive up to ``limit`` campaigns expired more than ``retention_days`` ago that still have hot rows"""
+    retention_days = config.ARCHIVE_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    async with async_session() as db:
+        has_hot_rows = sa.exists().where(Transaction.campaign_id == Campaign.campaign_id)
+        campaign_ids = (await db.execute(
+            sa.select(Campaign.campaign_id)
+            .where(Campaign.expires_at < cutoff, has_hot_rows)
+            .order_by(Campaign.expires_at)
+            .limit(limit)
+        )).scalars().all()
+
+        moved = 0
+        for campaign_id in campaign_ids:
+            count = await archive_campaign(db, campaign_id)
+            logger.info(f"Archived {count} transactions of campaign {campaign_id}")
+            moved += count
+    return {"campaigns": len(campaign_ids), "transactions": moved}
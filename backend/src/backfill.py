@@ -0,0 +1,293 @@
+"""Resumable rescan of a wallet's signature history.
+
+The live monitor only looks at the latest 5 signatures of each wallet, so
+contributions are lost when workers are down for a while. A backfill job
+walks a wallet's full history (optionally limited to a slot range), newest
+first, and inserts every transfer that is not in ``transactions`` yet,
+routed to campaigns by reference/memo like the live monitor.
+
+Progress is checkpointed in ``backfill_checkpoints`` after every page, in the
+same DB transaction as the page's inserts, so a job can be stopped and
+resumed at any point without duplicating or skipping rows.
+
+    python -m src.backfill start --wallet <address> [--campaign-id cmp_1234abcd] [--min-slot N] [--max-slot N] [--enqueue]
+    python -m src.backfill resume <job_id> [--enqueue]
+    python -m src.backfill status [<job_id>]
+
+``--enqueue`` hands the job to the ``backfill`` Celery queue, served by its
+own worker so rescans never take slots from live monitoring:
+
+    celery -A src.services worker -Q backfill --concurrency 1
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import sqlalchemy as sa
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+
+from src.config import config, async_session, solana_client
+from src.models import BackfillCheckpoint, Transaction
+from src.services import (celery_app, parse_transaction, transaction_tags, run_async,
+                          _resolve_campaigns, UNATTRIBUTED_CAMPAIGN)
+from src import archive, price_series
+from src.logger import setup_logger
+from src.metrics import BACKFILLED_TRANSACTIONS, observe_upstream
+
+logger = setup_logger("backfill", "backfill.log")
+
+_executor = ThreadPoolExecutor(max_workers=config.BACKFILL_CONCURRENCY, thread_name_prefix="backfill")
+
+
+def _insert_ignoring_duplicates(dialect: str):
+    """INSERT that skips rows whose (signature, transfer_index) already exists"""
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return (
+        insert(Transaction)
+        .on_conflict_do_nothing(index_elements=["signature", "transfer_index"])
+        .returning(Transaction.id)
+    )
+
+
+async def create_job(wallet_address: str, campaign_id: str,
+                     min_slot: Optional[int] = None, max_slot: Optional[int] = None) -> str:
+    """Create a checkpoint row for a new job and return its id"""
+    Pubkey.from_string(wallet_address)  # fail early on a malformed address
+    async with async_session() as db:
+        job = BackfillCheckpoint(wallet_address=wallet_address, campaign_id=campaign_id,
+                                 min_slot=min_slot, max_slot=max_slot)
+        db.add(job)
+        await db.commit()
+        return job.id
+
+
+async def _fetch_details(rpc, signatures: List) -> List:
+    """getTransaction for a page of signatures, BACKFILL_CONCURRENCY calls at a time"""
+    loop = asyncio.get_running_loop()
+
+    def _get(signature):
+        with observe_upstream("solana_rpc", "getTransaction"):
+            return rpc.get_transaction(signature, encoding="jsonParsed", max_supported_transaction_version=0)
+
+    return await asyncio.gather(*(loop.run_in_executor(_executor, _get, sig) for sig in signatures))
+
+
+def _parsed(job: BackfillCheckpoint, sig_info, tx_detail):
+    transaction_data = tx_detail.value.transaction if tx_detail.value else None
+    if not transaction_data or not transaction_data.meta or transaction_data.meta.err:
+        return None
+    transfers = parse_transaction(transaction_data, job.wallet_address)
+    if not transfers:
+        return None
+    keys, memos = transaction_tags(transaction_data)
+    return sig_info, transfers, keys + memos
+
+
+def _rows(job: BackfillCheckpoint, campaign_id: str, sig_info, transfers) -> List[Dict]:
+    block_time = sig_info.block_time or int(time.time())
+    sol_price = price_series.price_at(block_time) if any(t['mint'] is None for t in transfers) else None
+    return [{
+        "campaign_id": campaign_id,
+        "signature": str(sig_info.signature),
+        "transfer_index": t['transfer_index'],
+        "mint": t['mint'],
+        "amount": t['amount'],
+        "from_wallet": t['from'],
+        "to_wallet": job.wallet_address,
+        "timestamp": block_time,
+        "amount_usd": t['amount'] * sol_price if t['mint'] is None and sol_price is not None else None,
+        "block_time": datetime.fromtimestamp(sig_info.block_time, timezone.utc) if sig_info.block_time else None,
+    } for t in transfers]
+
+
+async def run_job(job_id: str, max_pages: Optional[int] = None, rpc=None) -> Dict:
+    """Process pages of a job from its checkpoint until the history (or slot range)
+    is exhausted or ``max_pages`` pages were done. Returns the job's progress.
+
+    The next signature page is requested while the current page's transactions
+    are being fetched, and pages are written with one INSERT ... ON CONFLICT
+    DO NOTHING together with the checkpoint update.
+    """
+    rpc = rpc or solana_client
+    loop = asyncio.get_running_loop()
+    async with async_session() as db:
+        job = await db.get(BackfillCheckpoint, job_id)
+        if job is None:
+            raise ValueError(f"Unknown backfill job {job_id}")
+        if job.status == 'done':
+            return _progress(job)
+        job.status = 'running'
+        job.error = None
+        await db.commit()
+
+        pubkey = Pubkey.from_string(job.wallet_address)
+        insert = _insert_ignoring_duplicates(db.bind.dialect.name)
+
+        def _page(before):
+            with observe_upstream("solana_rpc", "getSignaturesForAddress"):
+                return rpc.get_signatures_for_address(pubkey, before=before, limit=config.BACKFILL_PAGE_SIZE)
+
+        pages_done = 0
+        resume_from = Signature.from_string(job.before_signature) if job.before_signature else None
+        next_page = loop.run_in_executor(_executor, _page, resume_from)
+        try:
+            while True:
+                entries = list((await next_page).value)
+                exhausted = len(entries) < config.BACKFILL_PAGE_SIZE
+                if job.min_slot is not None and entries and entries[-1].slot < job.min_slot:
+                    exhausted = True
+                if not exhausted:
+                    # prefetch the following page while this one is processed
+                    next_page = loop.run_in_executor(_executor, _page, entries[-1].signature)
+
+                in_range = [
+                    e for e in entries
+                    if not e.err
+                    and (job.max_slot is None or e.slot <= job.max_slot)
+                    and (job.min_slot is None or e.slot >= job.min_slot)
+                ]
+                known = await archive.known_signatures(db, [str(e.signature) for e in in_range])
+                todo = [e for e in in_range if str(e.signature) not in known]
+                details = await _fetch_details(rpc, [e.signature for e in todo])
+
+                parsed = [p for p in (_parsed(job, e, tx) for e, tx in zip(todo, details)) if p]
+                # credit by Solana Pay reference / memo like the live monitor, else the job's campaign
+                tags = {t for _, _, page_tags in parsed for t in page_tags}
+                routes = await _resolve_campaigns(db, job.wallet_address, tags, tags)
+                rows = [
+                    row for sig_info, transfers, page_tags in parsed
+                    for row in _rows(job, next((routes[t] for t in page_tags if t in routes), job.campaign_id),
+                                     sig_info, transfers)
+                ]
+                inserted = len((await db.execute(insert, rows)).all()) if rows else 0
+
+                if entries:
+                    job.before_signature = str(entries[-1].signature)
+                job.pages += 1
+                job.signatures_scanned += len(entries)
+                job.transactions_inserted += inserted
+                if exhausted:
+                    job.status = 'done'
+                await db.commit()
+                # historical rows: kept out of ingest_lag_seconds / ingested_transactions_total
+                BACKFILLED_TRANSACTIONS.inc(inserted)
+                logger.info(f"Backfill {job_id}: page {job.pages}, {len(entries)} signatures, "
+                            f"{len(todo)} fetched, {inserted} rows inserted")
+
+                pages_done += 1
+                if exhausted or (max_pages is not None and pages_done >= max_pages):
+                    break
+        except Exception as e:
+            await db.rollback()
+            await _mark_failed(job_id, str(e))
+            logger.error(f"Backfill {job_id} failed at page {job.pages + 1}: {e}", exc_info=True)
+            raise
+        finally:
+            if not next_page.done():
+                next_page.cancel()
+        return _progress(job)
+
+
+async def _mark_failed(job_id: str, error: str):
+    try:
+        async with async_session() as db:
+            await db.execute(
+                sa.update(BackfillCheckpoint)
+                .where(BackfillCheckpoint.id == job_id)
+                .values(status='failed', error=error[:2000])
+            )
+            await db.commit()
+    except Exception as e:
+        logger.error(f"Could not mark backfill {job_id} as failed: {e}")
+
+
+def _progress(job: BackfillCheckpoint) -> Dict:
+    return {
+        "job_id": job.id,
+        "wallet_address": job.wallet_address,
+        "campaign_id": job.campaign_id,
+        "status": job.status,
+        "pages": job.pages,
+        "signatures_scanned": job.signatures_scanned,
+        "transactions_inserted": job.transactions_inserted,
+        "before_signature": job.before_signature,
+        "error": job.error,
+    }
+
+
+async def job_status(job_id: Optional[str] = None) -> List[Dict]:
+    async with async_session() as db:
+        stmt = sa.select(BackfillCheckpoint).order_by(BackfillCheckpoint.created_at.desc())
+        if job_id:
+            stmt = stmt.where(BackfillCheckpoint.id == job_id)
+        return [_progress(job) for job in (await db.execute(stmt.limit(50))).scalars()]
+
+
+@celery_app.task(bind=True, max_retries=5)
+def backfill_wallet(self, job_id: str):
+    """Celery task (``backfill`` queue) to run a slice of a backfill job.
+
+    Processes BACKFILL_PAGES_PER_TASK pages, then re-enqueues itself, so a long
+    rescan is a chain of short tasks rather than one that holds a worker for hours.
+    """
+    try:
+        progress = run_async(run_job(job_id, max_pages=config.BACKFILL_PAGES_PER_TASK))
+    except ValueError:
+        raise
+    except Exception as e:
+        raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
+    if progress["status"] != 'done':
+        backfill_wallet.delay(job_id)
+    elif progress["transactions_inserted"]:
+        from src.services import rebuild_leaderboard
+        rebuild_leaderboard.delay()
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescan a wallet's signature history")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    start = sub.add_parser("start", help="create and run a new backfill job")
+    start.add_argument("--wallet", required=True)
+    start.add_argument("--campaign-id", default=UNATTRIBUTED_CAMPAIGN,
+                       help="campaign credited with transfers that carry no campaign reference or memo")
+    start.add_argument("--min-slot", type=int, default=None)
+    start.add_argument("--max-slot", type=int, default=None)
+    start.add_argument("--enqueue", action="store_true", help="run on the backfill Celery queue instead of inline")
+
+    resume = sub.add_parser("resume", help="continue a job from its checkpoint")
+    resume.add_argument("job_id")
+    resume.add_argument("--enqueue", action="store_true")
+
+    status = sub.add_parser("status", help="show job progress")
+    status.add_argument("job_id", nargs="?")
+
+    args = parser.parse_args()
+    if args.command == "status":
+        for progress in run_async(job_status(args.job_id)):
+            print(progress)
+        return
+
+    if args.command == "start":
+        job_id = run_async(create_job(args.wallet, args.campaign_id, args.min_slot, args.max_slot))
+        print(f"Created backfill job {job_id}")
+    else:
+        job_id = args.job_id
+
+    if args.enqueue:
+        backfill_wallet.delay(job_id)
+        print(f"Enqueued backfill job {job_id} on the backfill queue")
+    else:
+        print(run_async(run_job(job_id)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Escrow wallet balances cached in Redis.
+
+refresh_balances() reads every monitored escrow wallet with getMultipleAccounts
+(up to 100 accounts per call) and stores ``<unix ts>:<lamports>`` under
+``escrow_balance:<wallet>``. /api/escrow-balance serves from there while the
+value is at most BALANCE_CACHE_TTL seconds old and only calls getBalance
+itself on a miss, so RPC load follows the number of wallets and the refresh
+interval, not page views. Values are kept for BALANCE_STALE_TTL seconds so a
+request whose getBalance fails or does not fit its deadline can still answer
+with the last known balance.
+"""
+import time
+from typing import Iterable, List, Optional
+
+import redis
+from solana.rpc.types import DataSliceOpts
+from solders.pubkey import Pubkey
+
+from src.config import config, redis_client, solana_client, sync_redis_client
+from src.logger import setup_logger
+from src.metrics import observe_upstream
+
+logger = setup_logger("balances", "balances.log")
+
+KEY_PREFIX = "escrow_balance"
+MAX_ACCOUNTS_PER_CALL = 100  # getMultipleAccounts limit
+
+
+def _key(wallet_address: str) -> str:
+    return f"{KEY_PREFIX}:{wallet_address}"
+
+
+def _value(lamports: int) -> str:
+    return f"{int(time.time())}:{lamports}"
+
+
+def refresh_balances(wallet_addresses: Iterable[str], rpc=None) -> int:
+    """Fetch and cache the balances of ``wallet_addresses``; returns how many were cached"""
+    rpc = rpc or solana_client
+    wallets: List[str] = list(dict.fromkeys(wallet_addresses))
+    cached = 0
+    for i in range(0, len(wallets), MAX_ACCOUNTS_PER_CALL):
+        chunk = wallets[i:i + MAX_ACCOUNTS_PER_CALL]
+        with observe_upstream("solana_rpc", "getMultipleAccounts"):
+            # only lamports are needed: ask for an empty data slice
+            response = rpc.get_multiple_accounts([Pubkey.from_string(w) for w in chunk],
+                                                 data_slice=DataSliceOpts(offset=0, length=0))
+        pipe = sync_redis_client.pipeline(transaction=False)
+        for wallet, account in zip(chunk, response.value):
+            # a wallet that never received funds has no account: balance 0
+            pipe.setex(_key(wallet), config.BALANCE_STALE_TTL, _value(account.lamports if account else 0))
+        pipe.execute()
+        cached += len(chunk)
+    return cached
+
+
+async def get_cached_balance(wallet_address: str, stale_ok: bool = False) -> Optional[int]:
+    """Cached lamports for a wallet, or None on a miss (or if Redis is unreachable).
+
+    Values older than BALANCE_CACHE_TTL are a miss unless ``stale_ok``.
+    """
+    try:
+        value = await redis_client.get(_key(wallet_address))
+    except redis.RedisError as e:
+        logger.warning(f"Could not read cached balance for {wallet_address}: {e}")
+        return None
+    if value is None:
+        return None
+    ts, _, lamports = value.decode().rpartition(":")
+    if not stale_ok and ts and time.time() - int(ts) > config.BALANCE_CACHE_TTL:
+        return None
+    return int(lamports)
+
+
+async def cache_balance(wallet_address: str, lamports: int):
+    """Store a balance fetched on a cache miss"""
+    try:
+        await redis_client.setex(_key(wallet_address), config.BALANCE_STALE_TTL, _value(lamports))
+    except redis.RedisError as e:
+        logger.warning(f"Could not cache balance for {wallet_address}: {e}")
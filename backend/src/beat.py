@@ -0,0 +1,223 @@
+"""Celery beat scheduler with its state in Redis and a leader lease.
+
+Several ``celery beat`` replicas can run at once; only the holder of the
+``beat:leader`` lease sends tasks, the others wait to take over:
+
+    celery -A src.services beat --loglevel=info   # on as many nodes as wanted
+
+The leader renews the lease every BEAT_LOCK_TTL / 3 seconds. If it dies or
+loses Redis, the lease expires after BEAT_LOCK_TTL seconds and a standby
+takes over within another BEAT_LOCK_TTL / 3. Like the wallet scan leases
+(src/leases.py), the lease carries a fencing token. Each entry's last run
+time is written to ``beat:schedule`` by a script that first checks the token,
+and the task is only sent if that write succeeds. A leader whose lease
+expired (e.g. while paused) therefore stops instead of double-firing.
+
+Because the run times are shared, a new leader carries on with each entry's
+schedule rather than firing everything at start-up. The leader also writes
+``beat:status`` (node, since, last tick) on every renewal; GET /api/health
+reports it.
+"""
+import json
+import os
+import socket
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import redis
+from celery.beat import Scheduler
+
+from src.config import config, sync_redis_client
+from src.logger import setup_logger
+
+logger = setup_logger("beat", "beat.log")
+
+LEADER_KEY = "beat:leader"
+FENCE_KEY = "beat:leader:fence"
+SCHEDULE_KEY = "beat:schedule"
+STATUS_KEY = "beat:status"
+
+# KEYS: leader, fence counter   ARGV: ttl ms
+_ACQUIRE_SCRIPT = sync_redis_client.register_script("""
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return false
+end
+local token = redis.call('INCR', KEYS[2])
+redis.call('SET', KEYS[1], token, 'PX', ARGV[1])
+return token
+""")
+
+# KEYS: leader, status   ARGV: token, ttl ms, status json
+_RENEW_SCRIPT = sync_redis_client.register_script("""
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+redis.call('SET', KEYS[2], ARGV[3])
+return 1
+""")
+
+# KEYS: leader, schedule   ARGV: token, entry name, entry state json
+_SAVE_ENTRY_SCRIPT = sync_redis_client.register_script("""
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[2], ARGV[2], ARGV[3])
+return 1
+""")
+
+# KEYS: leader   ARGV: token
+_RELEASE_SCRIPT = sync_redis_client.register_script("""
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+""")
+
+
+class RedisScheduler(Scheduler):
+    """Scheduler that only runs entries while it holds the Redis leader lease"""
+
+    def __init__(self, *args, **kwargs):
+        self.node = f"{socket.gethostname()}:{os.getpid()}"
+        self.lock_ttl = config.BEAT_LOCK_TTL
+        self.renew_interval = self.lock_ttl / 3
+        self.token: Optional[int] = None
+        self._leader_since: Optional[datetime] = None
+        self._last_renewal = 0.0
+        super().__init__(*args, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Leadership
+    # ------------------------------------------------------------------
+
+    def _status(self) -> str:
+        return json.dumps({
+            "node": self.node,
+            "token": self.token,
+            "since": self._leader_since.isoformat(),
+            "last_tick": datetime.now(timezone.utc).isoformat(),
+        })
+
+    def _acquire(self) -> bool:
+        token = _ACQUIRE_SCRIPT(keys=[LEADER_KEY, FENCE_KEY], args=[self.lock_ttl * 1000], client=sync_redis_client)
+        if not token:
+            return False
+        self.token = int(token)
+        self._leader_since = datetime.now(timezone.utc)
+        self._load_state()
+        logger.info(f"Beat {self.node} is now the leader (token {self.token})")
+        return True
+
+    def _renew(self) -> bool:
+        renewed = _RENEW_SCRIPT(
+            keys=[LEADER_KEY, STATUS_KEY], args=[self.token, self.lock_ttl * 1000, self._status()],
+            client=sync_redis_client,
+        )
+        if not renewed:
+            self._step_down("lease expired before it was renewed")
+        return bool(renewed)
+
+    def _step_down(self, reason: str):
+        logger.warning(f"Beat {self.node} lost leadership (token {self.token}): {reason}")
+        self.token = None
+        self._leader_since = None
+
+    def _hold_leadership(self) -> bool:
+        """True if this replica is the leader, renewing or acquiring the lease as due"""
+        now = time.monotonic()
+        if self.token is None:
+            if not self._acquire():
+                return False
+        elif now - self._last_renewal < self.renew_interval:
+            return True
+        if not self._renew():
+            return False
+        self._last_renewal = now
+        return True
+
+    # ------------------------------------------------------------------
+    # Shared schedule state
+    # ------------------------------------------------------------------
+
+    def _load_state(self):
+        """Take over the last run times recorded by previous leaders"""
+        stored = sync_redis_client.hgetall(SCHEDULE_KEY)
+        for name, entry in self.schedule.items():
+            state = stored.get(name.encode())
+            if state is None:
+                continue
+            state = json.loads(state)
+            entry.last_run_at = datetime.fromisoformat(state["last_run_at"])
+            entry.total_run_count = state["total_run_count"]
+        # rebuild the heap from the loaded run times
+        self._heap = None
+
+    def reserve(self, entry):
+        new_entry = super().reserve(entry)
+        if self.token is not None:
+            saved = _SAVE_ENTRY_SCRIPT(
+                keys=[LEADER_KEY, SCHEDULE_KEY],
+                args=[self.token, entry.name, json.dumps({
+                    "last_run_at": new_entry.last_run_at.isoformat(),
+                    "total_run_count": new_entry.total_run_count,
+                })],
+                client=sync_redis_client,
+            )
+            if not saved:
+                self._step_down(f"another replica holds the lease, not sending {entry.name}")
+        return new_entry
+
+    def apply_entry(self, entry, producer=None):
+        # reserve() gave up the lease: the new leader sends this entry
+        if self.token is not None:
+            super().apply_entry(entry, producer=producer)
+
+    # ------------------------------------------------------------------
+    # Scheduler interface
+    # ------------------------------------------------------------------
+
+    def tick(self, *args, **kwargs):
+        try:
+            if not self._hold_leadership():
+                return self.renew_interval
+            # come back in time to renew the lease
+            return min(super().tick(*args, **kwargs), self.renew_interval)
+        except redis.RedisError as e:
+            logger.error(f"Beat {self.node} cannot reach Redis: {e}")
+            if self.token is not None:
+                self._step_down("Redis unavailable")
+            return self.renew_interval
+
+    def close(self):
+        super().close()
+        if self.token is not None:
+            try:
+                # let a standby take over now rather than after BEAT_LOCK_TTL
+                _RELEASE_SCRIPT(keys=[LEADER_KEY], args=[self.token], client=sync_redis_client)
+                logger.info(f"Beat {self.node} released leadership")
+            except redis.RedisError as e:
+                logger.warning(f"Beat {self.node} could not release leadership: {e}")
+
+    @property
+    def info(self):
+        return f"    . leader lease -> {LEADER_KEY} ({self.lock_ttl}s)"
+
+
+async def leader_status(redis_client) -> Optional[Dict]:
+    """The beat leader's node, leadership start and last tick, for /api/health"""
+    raw = await redis_client.get(STATUS_KEY)
+    if raw is None:
+        return None
+    status = json.loads(raw)
+    last_tick = datetime.fromisoformat(status["last_tick"])
+    age = (datetime.now(timezone.utc) - last_tick).total_seconds()
+    return {
+        "leader": status["node"],
+        "leader_since": status["since"],
+        "last_tick": status["last_tick"],
+        "seconds_since_tick": round(age, 1),
+        # the leader renews every BEAT_LOCK_TTL / 3 seconds, and a standby takes over after BEAT_LOCK_TTL
+        "stale": age > config.BEAT_LOCK_TTL,
+    }
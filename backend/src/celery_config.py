@@ -14,13 +14,20 @@ from src.config import config
 broker_url = config.REDIS_URL
 result_backend = config.REDIS_URL
 
+# Results are only read for debugging: drop them after CELERY_RESULT_EXPIRES
+# seconds instead of the default day
+result_expires = config.CELERY_RESULT_EXPIRES
+
 # --------------------------
 # Serialization
 # --------------------------
-# Tasks and results are always sent in JSON
-task_serializer = 'json'
-result_serializer = 'json'
-accept_content = ['json']
+# Tasks and results are sent in JSON, or in msgpack (smaller, faster to encode)
+# with CELERY_SERIALIZER=msgpack. Workers accept both, so the setting can be
+# switched while messages of the other format are still queued.
+task_serializer = config.CELERY_SERIALIZER
+result_serializer = config.CELERY_SERIALIZER
+accept_content = ['json', 'msgpack']
+result_accept_content = ['json', 'msgpack']
 
 # All time-based operations use UTC
 timezone = 'UTC'
@@ -33,6 +40,27 @@ task_routes = {
     'src.services.update_sol_price': {'queue': 'price_updates'},
     'src.services.check_all_monitored_wallets': {'queue': 'wallet_monitoring'},
     'src.services.check_wallet_transactions': {'queue': 'wallet_monitoring'},
+    'src.services.check_wallet_batch': {'queue': 'wallet_monitoring'},
+    'src.backfill.backfill_wallet': {'queue': 'backfill'},
+}
+
+# --------------------------
+# Results of periodic monitoring tasks
+# --------------------------
+# Nothing reads these results and beat enqueues them every 10-60s (one
+# check_wallet_batch per INGEST_SCAN_BATCH wallets every 15s), so by default
+# they are not written to the result backend at all
+task_annotations = {
+    name: {'ignore_result': not config.CELERY_MONITORING_RESULTS}
+    for name in (
+        'src.services.update_sol_price',
+        'src.services.check_all_monitored_wallets',
+        'src.services.check_wallet_transactions',
+        'src.services.check_wallet_batch',
+        'src.services.refresh_escrow_balances',
+        'src.services.refresh_market_data',
+        'src.services.refresh_leaderboard_velocity',
+    )
 }
 
 # --------------------------
@@ -44,6 +72,13 @@ task_queues = (
     Queue('price_updates', routing_key='price_updates'),
     Queue('wallet_monitoring', routing_key='wallet_monitoring'),
 )
+# The 'backfill' queue is deliberately not listed above: workers started without -Q
+# consume every queue in task_queues, and rescans must not occupy the live monitoring
+# workers. It is created on first use and served by its own worker:
+#   celery -A src.services worker -Q backfill --concurrency 1
+
+# Modules with tasks outside src.services
+imports = ('src.backfill',)
 
 # --------------------------
 # Worker Behavior
@@ -61,9 +96,9 @@ task_max_retries = 3           # Max retries per task = 3
 # --------------------------
 # Beat (Scheduler) Settings
 # --------------------------
-# Stores periodic schedule in a file (persistent across restarts)
-beat_scheduler = 'celery.beat.PersistentScheduler'
-beat_schedule_filename = 'celerybeat-schedule'
+# Several beat replicas can run: the one holding a Redis lease sends the tasks,
+# and the last run of each entry is kept in Redis for whoever leads next (src/beat.py)
+beat_scheduler = 'src.beat:RedisScheduler'
 
 # --------------------------
 # Logging & Monitoring
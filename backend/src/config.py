@@ -1,24 +1,86 @@
 
+import os
+import tempfile
+import time
 from pathlib import Path
+import redis as redis_sync
 import redis.asyncio as redis
 from solana.rpc.api import Client
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Dict, List, Literal, Optional
 from sqlalchemy import NullPool
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool, StaticPool
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.exc import SQLAlchemyError
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from fastapi import Request, Response
 from src.base import Base
 from src.logger import setup_logger
+from src.metrics import instrument_engine
 
 logger = setup_logger("config", "config.log")
 class Config(BaseSettings):
     DATABASE_URL: str 
+    DATABASE_READ_URL: Optional[str] = None  # read replica for GET routes; the primary when unset
+    READ_YOUR_WRITES_SECONDS: int = 10       # after a write, the client's reads go to the primary this long
     SOLANA_RPC_URL: str
     WALLET: str
     REDIS_URL:str
+    PROMETHEUS_PUSHGATEWAY_URL: Optional[str] = None  # push worker metrics instead of multiprocess mode
+    # Celery messages and results (src/celery_config.py)
+    CELERY_SERIALIZER: Literal["json", "msgpack"] = "json"  # format of task messages and results
+    CELERY_RESULT_EXPIRES: int = 3600       # seconds a stored task result is kept
+    CELERY_MONITORING_RESULTS: bool = False  # also store results of the periodic monitoring tasks
+    BEAT_LOCK_TTL: int = 30                 # seconds before a dead beat leader's lease expires and a standby takes over
+    # Third-party API base urls (overridable so benchmarks can point them at local stubs)
+    COINGECKO_API_URL: str = "https://api.coingecko.com/api/v3"
+    DEXSCREENER_API_URL: str = "https://api.dexscreener.com"
+    BULK_CAMPAIGN_LIMIT: int = 50  # max contract addresses per bulk campaign lookup
+    BALANCE_CACHE_TTL: int = 30  # seconds an escrow balance stays cached (refreshed every 10s)
+    # HTTP compression / caching of read endpoints
+    GZIP_MIN_SIZE: int = 1024       # responses smaller than this many bytes are sent uncompressed
+    HTTP_CACHE_MAX_AGE: int = 5     # Cache-Control max-age for campaign and transaction reads
+    QR_CACHE_MAX_AGE: int = 3600    # Cache-Control max-age for QR codes
+    # Liveness / readiness probes (src/probes.py)
+    PROBE_INTERVAL: float = 10.0        # seconds between background dependency checks
+    PROBE_TIMEOUT: float = 2.0          # seconds a single dependency check may take
+    PROBE_REQUIRED: List[str] = ["database"]  # checks that must pass for /readyz
+    # Request deadlines (src/deadlines.py): route prefix -> seconds
+    REQUEST_DEADLINES: Dict[str, float] = {"/api/campaign-detail": 2.0, "/api/escrow-balance": 2.0}
+    DEADLINE_RESERVE: float = 0.25     # seconds kept back from upstream calls to answer from cache
+    BALANCE_STALE_TTL: int = 86400     # seconds an escrow balance is kept as a fallback after BALANCE_CACHE_TTL
+    PENDING_CAMPAIGN_TIMEOUT: int = 600  # seconds before a still-pending campaign's enrichment is re-enqueued
+    # Cache warm-up (src/warmup.py)
+    WARMUP_ENABLED: bool = True         # warm caches in the background on startup
+    WARMUP_CAMPAIGNS: int = 200         # most recently updated active campaigns warmed
+    WARMUP_CONCURRENCY: int = 8         # QR codes / campaign details built at once
+    WARMUP_READY_TIMEOUT: float = 15.0  # seconds /readyz waits for the startup warm-up at most
+    ADMIN_TOKEN: Optional[str] = None   # X-Admin-Token for POST /api/admin/warmup; unset = route disabled
+    # Per-request profiling (src/profiling.py)
+    PROFILE_TOKEN: Optional[str] = None     # X-Profile header value that profiles a request; unset = header ignored
+    PROFILE_SAMPLE_RATE: float = 0.0        # fraction of requests profiled without the header
+    PROFILE_TASK_SAMPLE_RATE: float = 0.0   # fraction of Celery task runs profiled
+    PROFILE_REPEAT_THRESHOLD: int = 3       # flag a statement / upstream method repeated this often in one request
+    PROFILE_DIR: str = os.path.join(tempfile.gettempdir(), "profiles")
+    PROFILE_MAX_FILES: int = 200            # newest profiles kept in PROFILE_DIR; older ones are deleted
+    # Production server (python -m src.serve)
+    SERVE_WORKERS: int = 0              # worker processes; 0 = one per CPU
+    SERVE_BACKLOG: int = 2048           # listen() backlog (capped by net.core.somaxconn)
+    SERVE_KEEPALIVE: int = 65           # idle keep-alive seconds; above the usual 60s load balancer idle timeout
+    SERVE_GRACEFUL_TIMEOUT: int = 30    # seconds a stopping worker gets to finish in-flight requests
+    # Wallet monitor ingest (src/ingest_sink.py)
+    SCAN_LEASE_TTL: int = 60            # seconds a wallet scan lease is held at most
+    INGEST_SCAN_BATCH: int = 25         # wallets scanned concurrently per check_wallet_batch task
+    INGEST_FLUSH_ROWS: int = 500        # flush the ingest sink once this many transfers are buffered...
+    INGEST_FLUSH_MS: int = 50           # ...or this many milliseconds after the first one
+    # Archival of expired campaigns' transactions (src/archive.py)
+    ARCHIVE_RETENTION_DAYS: int = 30    # days after expiry before a campaign's transactions are archived
+    ARCHIVE_BATCH_SIZE: int = 5000      # rows moved per DB transaction
+    # Backfill / rescan (src/backfill.py)
+    BACKFILL_PAGE_SIZE: int = 1000      # signatures per getSignaturesForAddress page (RPC max is 1000)
+    BACKFILL_CONCURRENCY: int = 8       # concurrent getTransaction calls
+    BACKFILL_PAGES_PER_TASK: int = 10   # pages per Celery task run before it re-enqueues itself
 
     model_config = SettingsConfigDict(
         case_sensitive=False,
@@ -33,6 +95,7 @@ config = Config()
 # Sync engine/session
 sync_engine = create_engine(config.DATABASE_URL)
 SyncSessionLocal = sessionmaker(bind=sync_engine, autocommit=False, autoflush=False)
+instrument_engine(sync_engine)
 
 
 #async config
@@ -40,6 +103,18 @@ engine = create_async_engine(url= config.DATABASE_URL)
 async_session = async_sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
+instrument_engine(engine)
+
+# Read replica for read-only routes (same engine as the primary when not configured)
+if config.DATABASE_READ_URL:
+    read_engine = create_async_engine(url=config.DATABASE_READ_URL)
+    instrument_engine(read_engine)
+else:
+    read_engine = engine
+read_session = async_sessionmaker(
+    bind=read_engine, class_=AsyncSession, expire_on_commit=False
+)
+PRIMARY_READS_COOKIE = "read_primary_until"
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
@@ -61,6 +136,29 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only routes: bound to the read replica, unless the client
+    wrote within READ_YOUR_WRITES_SECONDS (see stick_to_primary) and must see its write."""
+    factory = read_session
+    if read_engine is not engine:
+        try:
+            if int(request.cookies.get(PRIMARY_READS_COOKIE, 0)) > time.time():
+                factory = async_session
+        except ValueError:
+            pass
+    async with factory() as session:
+        yield session
+
+
+def stick_to_primary(response: Response):
+    """Mark a write's response so the client's following reads use the primary"""
+    if read_engine is not engine:
+        response.set_cookie(
+            PRIMARY_READS_COOKIE, str(int(time.time()) + config.READ_YOUR_WRITES_SECONDS),
+            max_age=config.READ_YOUR_WRITES_SECONDS, httponly=True, samesite="lax"
+        )
+
+
 def get_db_session_sync():
     return SyncSessionLocal()
 
@@ -89,7 +187,9 @@ async def init_db():
     the database for the first time or after a complete reset.
 
     The function uses a connection from the engine and runs the create_all
-    method synchronously within the asynchronous context.
+    method synchronously within the asynchronous context. On PostgreSQL the
+    SCHEMA_UPGRADES then run, each in its own transaction. Failures are
+    raised, so the server does not start on a half-upgraded schema.
     """
     try:
         async with engine.begin() as conn:
@@ -97,6 +197,19 @@ async def init_db():
             await conn.run_sync(Base.metadata.create_all)
     except SQLAlchemyError as e:
         logger.error(f"error creating the db: {e}")
+        raise
+    if engine.dialect.name != "postgresql":
+        return
+    from src.models import SCHEMA_UPGRADES
+    # one transaction per upgrade: a failing one does not undo the others, and
+    # startup stops instead of serving the old schema
+    for statement in SCHEMA_UPGRADES:
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(text(statement))
+        except SQLAlchemyError as e:
+            logger.error(f"schema upgrade failed: {statement.splitlines()[0][:120]}: {e}")
+            raise
 # Redis configuration
 try:
     redis_client = redis.from_url(url=config.REDIS_URL)
@@ -104,6 +217,8 @@ try:
 except:
     redis_client = None
     print("Warning: Redis not available, using in-memory cache")
+# Synchronous client for Celery tasks and the ingest path (the async client is bound to the API's event loop)
+sync_redis_client = redis_sync.Redis.from_url(config.REDIS_URL)
 
 
 async def drop_db():
@@ -0,0 +1,118 @@
+"""Per-request deadlines, so slow third parties cannot stretch a request.
+
+Routes listed in REQUEST_DEADLINES (path prefix -> seconds) get a time
+budget. A client may shorten it with ``X-Request-Deadline-Ms`` but not
+extend it. While the request runs, the deadline is visible to everything it
+calls:
+
+    upstream calls  take ``upstream_timeout(10)`` as their timeout: the
+                    remaining budget minus DEADLINE_RESERVE, capped at
+                    their usual timeout. With less than DEADLINE_RESERVE
+                    left they raise DeadlineExceeded without being made.
+    callers         catch the failure and serve the last cached value
+                    instead, and call ``mark_stale(source)``. The response
+                    then carries ``X-Stale: <sources>``.
+    everything else (DB statements, Redis) runs under the deadline
+                    itself: a request still running when it expires is
+                    cancelled and answered with 504.
+"""
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Set, Tuple
+
+from src.config import config
+from src.logger import setup_logger
+from src.metrics import DEADLINE_EXCEEDED, STALE_RESPONSES
+from src.responses import ORJSONResponse
+
+logger = setup_logger("deadlines", "deadlines.log")
+
+DEADLINE_HEADER = "x-request-deadline-ms"
+STALE_HEADER = "x-stale"
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+_stale: ContextVar[Optional[Set[str]]] = ContextVar("stale", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Too little of the request's budget is left for an upstream call"""
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline, None outside a request with a budget"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def upstream_timeout(default: Optional[float]) -> Optional[float]:
+    """Timeout for an upstream call: ``default``, shortened to fit the request's remaining budget"""
+    left = remaining()
+    if left is None:
+        return default
+    left -= config.DEADLINE_RESERVE
+    if left <= 0:
+        raise DeadlineExceeded("request deadline reached, upstream call skipped")
+    return left if default is None else min(default, left)
+
+
+def mark_stale(source: str):
+    """Record that the response includes a cached ``source`` served after an upstream failure"""
+    stale = _stale.get()
+    if stale is not None:
+        stale.add(source)
+        STALE_RESPONSES.labels(source).inc()
+
+
+class DeadlineMiddleware:
+    """ASGI middleware giving requests to ``budgets`` routes (path prefix -> seconds) a deadline"""
+
+    def __init__(self, app, budgets: Dict[str, float]):
+        self.app = app
+        # longest prefix first, so the most specific budget wins
+        self.budgets = sorted(budgets.items(), key=lambda item: -len(item[0]))
+
+    def _budget(self, scope) -> Tuple[Optional[str], Optional[float]]:
+        """Matching route prefix and budget in seconds, (None, None) for routes without one"""
+        prefix, budget = next(((p, s) for p, s in self.budgets if scope["path"].startswith(p)), (None, None))
+        if budget is None:
+            return None, None
+        for name, value in scope["headers"]:
+            if name == DEADLINE_HEADER.encode():
+                try:
+                    return prefix, min(budget, max(int(value) / 1000, 0))
+                except ValueError:
+                    break
+        return prefix, budget
+
+    async def __call__(self, scope, receive, send):
+        route, budget = self._budget(scope) if scope["type"] == "http" else (None, None)
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+
+        deadline_token = _deadline.set(time.monotonic() + budget)
+        stale: Set[str] = set()
+        stale_token = _stale.set(stale)
+        started = False
+
+        async def send_wrapper(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+                if stale:
+                    message["headers"] = [*message.get("headers", []), (STALE_HEADER.encode(), ", ".join(sorted(stale)).encode())]
+            await send(message)
+
+        try:
+            async with asyncio.timeout(budget):
+                await self.app(scope, receive, send_wrapper)
+        except TimeoutError:
+            DEADLINE_EXCEEDED.labels(route).inc()
+            logger.warning(f"{scope['method']} {scope['path']} exceeded its {budget:.2f}s deadline")
+            if started:
+                raise
+            await ORJSONResponse({"detail": "Deadline exceeded"}, status_code=504)(scope, receive, send)
+        finally:
+            _deadline.reset(deadline_token)
+            _stale.reset(stale_token)
@@ -0,0 +1,61 @@
+"""Conditional GET support for the read endpoints.
+
+A handler first computes a cheap version of the resource (the campaign's
+updated_at, the time of its last transaction, ...) and passes it to
+``not_modified``. When the client's If-None-Match / If-Modified-Since already
+matches, a 304 is returned without building the body; otherwise the same
+validators are attached to the full response with ``cache_headers``.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag from the values the response is derived from"""
+    digest = hashlib.blake2b("|".join(str(p) for p in parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def latest(*times: Optional[datetime]) -> Optional[datetime]:
+    """Most recent of several timestamps (naive ones are taken as UTC), ignoring None"""
+    aware = [t if t.tzinfo else t.replace(tzinfo=timezone.utc) for t in times if t is not None]
+    return max(aware) if aware else None
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime], max_age: int) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}, must-revalidate"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # weak comparison (RFC 9110 8.8.3.2): W/ prefixes are ignored
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[datetime],
+                 max_age: int) -> Optional[Response]:
+    """304 response if the client's cached copy is still current, else None"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-Modified-Since is ignored when If-None-Match is present
+        fresh = _etag_matches(if_none_match, etag)
+    else:
+        fresh = False
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and last_modified is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                since = None
+            # HTTP dates have one-second resolution
+            fresh = since is not None and since.tzinfo is not None and last_modified.replace(microsecond=0) <= since
+    if not fresh:
+        return None
+    return Response(status_code=304, headers=cache_headers(etag, last_modified, max_age))
@@ -0,0 +1,163 @@
+"""Write-behind batch writer for transfers found by the wallet monitor.
+
+Concurrent ``scan_wallet`` calls in a worker hand their new rows to the
+sink of their event loop instead of each opening a session and committing a
+few rows. The sink flushes when INGEST_FLUSH_ROWS rows are buffered or
+INGEST_FLUSH_MS milliseconds after the first buffered row, whichever comes
+first:
+
+    PostgreSQL  asyncpg COPY (copy_records_to_table) into a temporary staging
+                table, then INSERT ... SELECT ... ON CONFLICT DO NOTHING into
+                ``transactions`` in the same transaction
+    SQLite      one multi-row INSERT ... ON CONFLICT DO NOTHING (local
+                development); other databases are not supported
+
+``write`` returns once the flush holding its rows has committed, with the
+(signature, transfer_index) keys that were actually inserted. A Celery task
+therefore only finishes (and is acked) after its rows are durable. Rows
+already saved by another scan are skipped, and callers only count the
+returned keys.
+"""
+import asyncio
+import time
+import uuid
+import weakref
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.config import config, engine
+from src.models import Transaction
+from src.logger import setup_logger
+from src.metrics import INGEST_FLUSH_DURATION, INGEST_FLUSH_ROWS
+
+logger = setup_logger("ingest_sink", "ingest_sink.log")
+
+STAGING_TABLE = "transactions_ingest_staging"
+COLUMNS = [c.name for c in Transaction.__table__.columns]
+Key = Tuple[str, int]
+
+
+async def _copy_merge(conn, rows: List[Dict]) -> Set[Key]:
+    raw = await conn.get_raw_connection()
+    pg = raw.driver_connection  # asyncpg connection
+    columns = ", ".join(COLUMNS)
+    async with pg.transaction():
+        # per-connection temp table, emptied on commit
+        await pg.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (LIKE {Transaction.__tablename__}) ON COMMIT DELETE ROWS"
+        )
+        await pg.copy_records_to_table(
+            STAGING_TABLE, records=[tuple(row[c] for c in COLUMNS) for row in rows], columns=COLUMNS
+        )
+        inserted = await pg.fetch(
+            f"INSERT INTO {Transaction.__tablename__} ({columns}) SELECT {columns} FROM {STAGING_TABLE} "
+            f"ON CONFLICT (signature, transfer_index) DO NOTHING RETURNING signature, transfer_index"
+        )
+    return {(r["signature"], r["transfer_index"]) for r in inserted}
+
+
+async def _insert_merge(conn, rows: List[Dict]) -> Set[Key]:
+    from sqlalchemy.dialects.sqlite import insert
+    stmt = (
+        insert(Transaction)
+        .on_conflict_do_nothing(index_elements=["signature", "transfer_index"])
+        .returning(Transaction.signature, Transaction.transfer_index)
+    )
+    inserted = (await conn.execute(stmt, rows)).all()
+    await conn.commit()
+    return {(signature, transfer_index) for signature, transfer_index in inserted}
+
+
+_MERGES = {"postgresql": _copy_merge, "sqlite": _insert_merge}
+
+
+class IngestSink:
+    """Buffers rows from concurrent writers on one event loop and flushes them together"""
+
+    def __init__(self, max_rows: Optional[int] = None, max_delay_ms: Optional[int] = None):
+        self.max_rows = max_rows or config.INGEST_FLUSH_ROWS
+        self.max_delay = (max_delay_ms or config.INGEST_FLUSH_MS) / 1000
+        self._pending: List[Tuple[asyncio.Future, List[Dict]]] = []
+        self._pending_rows = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def write(self, rows: List[Dict]) -> Set[Key]:
+        """Buffer ``rows`` (transactions columns; id and processed_at are filled in)
+        and wait for them to be flushed. Returns the keys this call inserted."""
+        if not rows:
+            return set()
+        now = datetime.now(timezone.utc)
+        for row in rows:
+            row.setdefault("id", str(uuid.uuid4()))
+            row.setdefault("processed_at", now)
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._pending.append((waiter, rows))
+        self._pending_rows += len(rows)
+        if self._pending_rows >= self.max_rows:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._start_flush)
+        return await waiter
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_rows = self._pending, [], 0
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[asyncio.Future, List[Dict]]]):
+        # the first writer of a key owns it; later duplicates in the batch are skipped
+        owners: Dict[Key, Tuple[int, Dict]] = {}
+        for i, (_, rows) in enumerate(batch):
+            for row in rows:
+                owners.setdefault((row["signature"], row["transfer_index"]), (i, row))
+        rows = [row for _, row in owners.values()]
+
+        started = time.perf_counter()
+        try:
+            async with engine.connect() as conn:
+                merge = _MERGES.get(conn.dialect.name)
+                if merge is None:
+                    raise NotImplementedError(f"Ingest sink does not support {conn.dialect.name} databases")
+                inserted = await merge(conn, rows)
+        except Exception as e:
+            logger.error(f"Ingest flush of {len(rows)} rows failed: {e}", exc_info=True)
+            for waiter, _ in batch:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+        finally:
+            INGEST_FLUSH_DURATION.observe(time.perf_counter() - started)
+            INGEST_FLUSH_ROWS.observe(len(rows))
+
+        results: List[Set[Key]] = [set() for _ in batch]
+        for key in inserted:
+            results[owners[key][0]].add(key)
+        for (waiter, _), keys in zip(batch, results):
+            if not waiter.done():
+                waiter.set_result(keys)
+        logger.debug(f"Flushed {len(rows)} rows from {len(batch)} writers, {len(inserted)} inserted")
+
+
+# Pooled asyncpg connections belong to the loop that opened them, so each
+# event loop (one per worker thread, see services.run_async) gets its own sink.
+_sinks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, IngestSink]" = weakref.WeakKeyDictionary()
+
+
+def get_sink() -> IngestSink:
+    loop = asyncio.get_running_loop()
+    sink = _sinks.get(loop)
+    if sink is None:
+        sink = _sinks[loop] = IngestSink()
+    return sink
+
+
+async def write(rows: List[Dict]) -> Set[Key]:
+    """Write rows through the current event loop's sink"""
+    return await get_sink().write(rows)
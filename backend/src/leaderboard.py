@@ -0,0 +1,312 @@
+"""Campaign leaderboard kept in Redis sorted sets.
+
+Three sorted sets rank active campaigns, each scored by one metric:
+
+    leaderboard:raised_usd     total USD contributed (amount_usd at contribution time)
+    leaderboard:percent_goal   raised_usd / goal_amount * 100
+    leaderboard:velocity       USD contributed over the last VELOCITY_WINDOW_HOURS
+
+and a hash per campaign (leaderboard:campaign:<campaign_id>) holds the fields
+shown in a listing, so reads never touch Postgres.
+
+The ingest path updates the sets incrementally (record_contribution). Velocity
+is kept in hourly buckets that expire on their own and is merged into the
+velocity set by refresh_velocity every minute. rebuild() recomputes all of it
+from Postgres; it runs on a schedule to pick up campaigns that expired or
+were deactivated, and to repair drift if Redis lost writes.
+"""
+import base64
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import redis
+import sqlalchemy as sa
+
+from src.config import redis_client, sync_redis_client, async_session
+from src.models import Campaign, Transaction
+from src.logger import setup_logger
+
+logger = setup_logger("leaderboard", "leaderboard.log")
+
+KEY_PREFIX = "leaderboard"
+SORT_KEYS = {
+    "raised_usd": f"{KEY_PREFIX}:raised_usd",
+    "percent_goal": f"{KEY_PREFIX}:percent_goal",
+    "velocity": f"{KEY_PREFIX}:velocity",
+}
+VELOCITY_WINDOW_HOURS = 24
+CAMPAIGN_FIELDS = ("campaign_id", "name", "symbol", "contract_address", "image_url", "goal_amount", "raised_usd")
+
+# Workers write through the synchronous client; the API reads through the async one
+sync_redis = sync_redis_client
+
+
+def _campaign_key(campaign_id: str) -> str:
+    return f"{KEY_PREFIX}:campaign:{campaign_id}"
+
+
+def _bucket_key(hour: int) -> str:
+    return f"{KEY_PREFIX}:velocity:{hour}"
+
+
+def _current_hour() -> int:
+    return int(time.time()) // 3600
+
+
+# ----------------------------------------------------------------------------
+# Writes (ingest path and scheduled tasks)
+# ----------------------------------------------------------------------------
+
+# KEYS: campaign hash, raised set, percent set, velocity bucket (or "" to skip)
+# ARGV: campaign_id, usd, bucket ttl seconds
+_RECORD_SCRIPT = sync_redis.register_script("""
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return false
+end
+local raised = tonumber(redis.call('HINCRBYFLOAT', KEYS[1], 'raised_usd', ARGV[2]))
+redis.call('ZADD', KEYS[2], raised, ARGV[1])
+local goal = tonumber(redis.call('HGET', KEYS[1], 'goal_amount') or '0')
+if goal and goal > 0 then
+    redis.call('ZADD', KEYS[3], raised / goal * 100, ARGV[1])
+end
+if KEYS[4] ~= '' then
+    redis.call('ZINCRBY', KEYS[4], ARGV[2], ARGV[1])
+    redis.call('EXPIRE', KEYS[4], ARGV[3])
+end
+return tostring(raised)
+""")
+
+
+def record_contribution(campaign_id: str, amount_usd: float, block_time: Optional[int] = None):
+    """Add a contribution to a campaign's scores in one atomic round trip.
+
+    Campaigns that are not on the leaderboard (inactive, or not registered yet)
+    are skipped. Failures are logged and swallowed: the transaction is already
+    committed and the next rebuild() corrects the scores.
+    """
+    if not amount_usd:
+        return
+    hour = (block_time or int(time.time())) // 3600
+    in_window = hour > _current_hour() - VELOCITY_WINDOW_HOURS
+    try:
+        _RECORD_SCRIPT(
+            keys=[_campaign_key(campaign_id), SORT_KEYS["raised_usd"], SORT_KEYS["percent_goal"],
+                  _bucket_key(hour) if in_window else ""],
+            args=[campaign_id, float(amount_usd), (VELOCITY_WINDOW_HOURS + 1) * 3600],
+            client=sync_redis,
+        )
+    except redis.RedisError as e:
+        logger.warning(f"Could not update leaderboard for campaign {campaign_id}: {e}")
+
+
+def _campaign_mapping(campaign: Campaign, raised_usd: float = 0.0) -> Dict:
+    return {
+        "campaign_id": campaign.campaign_id,
+        "name": campaign.name,
+        "symbol": campaign.symbol or "",
+        "contract_address": campaign.contract_address,
+        "image_url": campaign.image_url or "",
+        "goal_amount": float(campaign.goal_amount),
+        "raised_usd": float(raised_usd),
+    }
+
+
+async def register_campaign(campaign: Campaign):
+    """Put a newly created campaign on the leaderboard with zero scores"""
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(_campaign_key(campaign.campaign_id), mapping=_campaign_mapping(campaign))
+            for key in SORT_KEYS.values():
+                pipe.zadd(key, {campaign.campaign_id: 0}, nx=True)
+            await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not add campaign {campaign.campaign_id} to leaderboard: {e}")
+
+
+async def remove_campaign(campaign_id: str):
+    """Take a campaign off the leaderboard"""
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.delete(_campaign_key(campaign_id))
+            for key in SORT_KEYS.values():
+                pipe.zrem(key, campaign_id)
+            await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not remove campaign {campaign_id} from leaderboard: {e}")
+
+
+def refresh_velocity():
+    """Merge the hourly buckets of the window into the velocity set.
+
+    The raised set is added with weight 0 so every active campaign is present
+    (with 0 when it had no recent contributions), then intersected with it so
+    campaigns that left the leaderboard drop out.
+    """
+    hour = _current_hour()
+    buckets = [_bucket_key(h) for h in range(hour - VELOCITY_WINDOW_HOURS + 1, hour + 1)]
+    raised = SORT_KEYS["raised_usd"]
+    velocity = SORT_KEYS["velocity"]
+    pipe = sync_redis.pipeline(transaction=True)
+    pipe.zunionstore(velocity, {**{b: 1 for b in buckets}, raised: 0})
+    pipe.zinterstore(velocity, {velocity: 1, raised: 0})
+    pipe.execute()
+
+
+async def rebuild() -> int:
+    """Recompute every set and campaign hash from Postgres; returns the number of campaigns ranked"""
+    now = datetime.now(timezone.utc)
+    window_start = now - timedelta(hours=VELOCITY_WINDOW_HOURS)
+    async with async_session() as db:
+        campaigns = (await db.execute(
+            sa.select(Campaign).where(
+                Campaign.status == 'active',
+                Campaign.is_active == True,
+                Campaign.expires_at > now,
+            )
+        )).scalars().all()
+        raised = dict((await db.execute(
+            sa.select(Transaction.campaign_id, sa.func.sum(Transaction.amount_usd))
+            .where(Transaction.amount_usd.isnot(None))
+            .group_by(Transaction.campaign_id)
+        )).all())
+        recent = (await db.execute(
+            sa.select(Transaction.campaign_id, Transaction.timestamp, Transaction.amount_usd)
+            .where(Transaction.amount_usd.isnot(None), Transaction.timestamp >= int(window_start.timestamp()))
+        )).all()
+
+    active = {c.campaign_id for c in campaigns}
+    buckets: Dict[int, Dict[str, float]] = {}
+    for campaign_id, timestamp, amount_usd in recent:
+        if campaign_id in active:
+            bucket = buckets.setdefault(timestamp // 3600, {})
+            bucket[campaign_id] = bucket.get(campaign_id, 0.0) + float(amount_usd)
+
+    previous = {m.decode() for m in sync_redis.zrange(SORT_KEYS["raised_usd"], 0, -1)}
+    staging = {name: f"{key}:rebuild" for name, key in SORT_KEYS.items()}
+    pipe = sync_redis.pipeline(transaction=True)
+    for key in staging.values():
+        pipe.delete(key)
+    for campaign in campaigns:
+        total = float(raised.get(campaign.campaign_id) or 0)
+        goal = float(campaign.goal_amount)
+        pipe.hset(_campaign_key(campaign.campaign_id), mapping=_campaign_mapping(campaign, total))
+        pipe.zadd(staging["raised_usd"], {campaign.campaign_id: total})
+        pipe.zadd(staging["percent_goal"], {campaign.campaign_id: total / goal * 100 if goal > 0 else 0})
+        pipe.zadd(staging["velocity"], {campaign.campaign_id: 0})
+    hour = _current_hour()
+    for h in range(hour - VELOCITY_WINDOW_HOURS, hour + 1):
+        pipe.delete(_bucket_key(h))
+    for hour, amounts in buckets.items():
+        pipe.zadd(_bucket_key(hour), amounts)
+        pipe.expireat(_bucket_key(hour), (hour + VELOCITY_WINDOW_HOURS + 1) * 3600)
+    for campaign_id in previous - active:
+        pipe.delete(_campaign_key(campaign_id))
+    for name, key in SORT_KEYS.items():
+        if campaigns:
+            pipe.rename(staging[name], key)
+        else:
+            pipe.delete(key)
+    pipe.execute()
+    refresh_velocity()
+    logger.info(f"Rebuilt leaderboard with {len(campaigns)} campaigns")
+    return len(campaigns)
+
+
+# ----------------------------------------------------------------------------
+# Reads (API)
+# ----------------------------------------------------------------------------
+
+def encode_cursor(score: float, campaign_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{score!r}|{campaign_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    score, campaign_id = raw.split("|", 1)
+    return float(score), campaign_id
+
+
+async def _after_cursor(key: str, score: float, last_id: str, limit: int) -> List:
+    """Up to ``limit`` (member, score) pairs that come after (score, last_id) in ZREVRANGE order.
+
+    ZREVRANGE orders by score, then by member, both descending. The rows after
+    the cursor are therefore the members tied at ``score`` that sort below
+    ``last_id``, followed by every member with a lower score.
+    """
+    last = last_id.encode()
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.zscore(key, last_id)
+        pipe.zrevrank(key, last_id)
+        pipe.zcount(key, f"({score!r}", "+inf")
+        current, rank, higher = await pipe.execute()
+
+    # members tied at the cursor's score; if the cursor's campaign still holds
+    # that score, those before it are skipped by offset, else by comparison
+    offset = rank - higher if current == score and rank is not None else 0
+    members = []
+    while len(members) < limit:
+        batch = await redis_client.zrevrangebyscore(key, score, score, start=offset, num=limit, withscores=True)
+        members.extend((m, s) for m, s in batch if m < last)
+        if len(batch) < limit:
+            break
+        offset += len(batch)
+    members = members[:limit]
+
+    if len(members) < limit:
+        members += await redis_client.zrevrangebyscore(
+            key, f"({score!r}", "-inf", start=0, num=limit - len(members), withscores=True
+        )
+    return members
+
+
+async def get_page(sort: str, limit: int, cursor: Optional[str] = None) -> Dict:
+    """One page of the leaderboard, highest score first.
+
+    Keyset pagination: the cursor is the (score, campaign_id) of the last row
+    returned and the page holds the rows ordered after it (_after_cursor), so
+    score changes between pages neither repeat nor skip campaigns that kept
+    their score. ``rank`` is each campaign's position when the page was read.
+    """
+    key = SORT_KEYS[sort]
+    if cursor:
+        score, last_id = decode_cursor(cursor)
+        members = await _after_cursor(key, score, last_id, limit)
+    else:
+        members = await redis_client.zrevrange(key, 0, limit - 1, withscores=True)
+
+    campaign_ids = [m.decode() for m, _ in members]
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for campaign_id in campaign_ids:
+            pipe.hmget(_campaign_key(campaign_id), CAMPAIGN_FIELDS)
+            pipe.zscore(SORT_KEYS["percent_goal"], campaign_id)
+            pipe.zscore(SORT_KEYS["velocity"], campaign_id)
+            pipe.zrevrank(key, campaign_id)
+        replies = await pipe.execute() if campaign_ids else []
+
+    entries: List[Dict] = []
+    for i, (campaign_id, (_, score)) in enumerate(zip(campaign_ids, members)):
+        fields, percent_goal, velocity, rank = replies[4 * i:4 * i + 4]
+        if rank is None:
+            # left the leaderboard between the two reads
+            continue
+        info = dict(zip(CAMPAIGN_FIELDS, (f.decode() if f is not None else None for f in fields)))
+        entries.append({
+            "rank": rank + 1,
+            "campaign_id": campaign_id,
+            "name": info["name"],
+            "symbol": info["symbol"] or None,
+            "contract_address": info["contract_address"],
+            "image_url": info["image_url"] or None,
+            "goal_amount": float(info["goal_amount"] or 0),
+            "raised_usd": float(info["raised_usd"] or 0),
+            "percent_goal": float(percent_goal or 0),
+            "velocity_usd": float(velocity or 0),
+            "score": score,
+        })
+
+    next_cursor = None
+    if len(members) == limit:
+        last_id, last_score = members[-1]
+        next_cursor = encode_cursor(last_score, last_id.decode())
+    return {"sort": sort, "campaigns": entries, "next_cursor": next_cursor}
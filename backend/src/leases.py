@@ -0,0 +1,72 @@
+"""Short-lived exclusive leases in Redis, used so that each escrow wallet is
+scanned by one worker at a time.
+
+A lease is ``lease:<name>`` holding a fencing token, set with a TTL so a
+crashed holder cannot block the wallet for longer than SCAN_LEASE_TTL. Tokens
+come from a per-name counter (``lease:<name>:fence``) and only ever grow.
+``release`` deletes the lease only if it still holds the caller's token.
+A holder whose lease expired and was taken over therefore cannot release the
+new holder's lease, and finds out that it lost the lease.
+
+The fencing token is not checked when rows are written. Duplicate rows are
+prevented by the ingest sink's ON CONFLICT DO NOTHING on (signature,
+transfer_index) alone, so a holder that overran its TTL can at worst repeat
+RPC calls. The token only lets ``release`` tell a lost lease from its own.
+
+``acquire`` and ``release`` use the blocking client: async callers run them
+in an executor.
+"""
+from typing import Optional
+
+import redis
+
+from src.config import config, sync_redis_client
+from src.logger import setup_logger
+from src.metrics import SCAN_LEASES
+
+logger = setup_logger("leases", "leases.log")
+
+KEY_PREFIX = "lease"
+
+# KEYS: lease, fence counter   ARGV: ttl ms
+_ACQUIRE_SCRIPT = sync_redis_client.register_script("""
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return false
+end
+local token = redis.call('INCR', KEYS[2])
+redis.call('SET', KEYS[1], token, 'PX', ARGV[1])
+return token
+""")
+
+# KEYS: lease   ARGV: token
+_RELEASE_SCRIPT = sync_redis_client.register_script("""
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+""")
+
+
+def _keys(name: str):
+    return [f"{KEY_PREFIX}:{name}", f"{KEY_PREFIX}:{name}:fence"]
+
+
+def acquire(name: str, ttl: Optional[int] = None) -> Optional[int]:
+    """Take the lease and return its fencing token, or None if someone else holds it"""
+    ttl = ttl or config.SCAN_LEASE_TTL
+    token = _ACQUIRE_SCRIPT(keys=_keys(name), args=[ttl * 1000], client=sync_redis_client)
+    SCAN_LEASES.labels("acquired" if token else "busy").inc()
+    return int(token) if token else None
+
+
+def release(name: str, token: int) -> bool:
+    """Give the lease back; False if it had expired and was no longer ours"""
+    try:
+        released = bool(_RELEASE_SCRIPT(keys=_keys(name)[:1], args=[token], client=sync_redis_client))
+    except redis.RedisError as e:
+        logger.warning(f"Could not release lease {name}: {e}")
+        return False
+    if not released:
+        SCAN_LEASES.labels("lost").inc()
+        logger.warning(f"Lease {name} (token {token}) expired before it was released")
+    return released
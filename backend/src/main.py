@@ -4,23 +4,26 @@ from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi import FastAPI
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
-from src.config import get_db, init_db, drop_db
+from src.config import config, get_db, init_db, drop_db, sync_redis_client
 from src.models import Campaign
-from src.services import SolanaMonitor
+from src.services import SolanaMonitor, celery_app, close_http_session
 from src.routes import routers
+from src.metrics import CeleryBacklogCollector, PrometheusMiddleware, metrics_endpoint, register_collector
+from src.responses import ORJSONResponse
+from src.profiling import ProfilingMiddleware
+from src.deadlines import DeadlineMiddleware
+from src import probes, warmup
 
 # Initialize monitor
 # monitor = SolanaMonitor()
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Startup
-    print("Starting up application...")
-    
+async def prepare_database():
+    """Create/upgrade the schema and add the sample campaign if none exist"""
     # print(f"server is dropping....")
     # await drop_db()
     # print(f"server has dropping!!")
@@ -52,10 +55,10 @@ async def lifespan(app: FastAPI):
                     expires_at=datetime.now(timezone.utc) + timedelta(hours=16),
                     social_twitter="https://x.com/i/communities/1957556044743201260",
                     social_website="https://spongebob.fandom.com/wiki/Karen_Plankton",
-                    liquidity="11086.4",
-                    market_cap="9194",
-                    price_usd="0.000009195",
-                    volume_24h="226917.14"
+                    liquidity=Decimal("11086.4"),
+                    market_cap=Decimal("9194"),
+                    price_usd=Decimal("0.000009195"),
+                    volume_24h=Decimal("226917.14")
                 )
                 db.add(sample_campaign)
                 await db.commit()
@@ -66,13 +69,33 @@ async def lifespan(app: FastAPI):
         finally:
             break  # Only use the first session from the generator
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup
+    print("Starting up application...")
+
+    # src.serve prepares the database once in the master before forking workers
+    if not getattr(app.state, "database_ready", False):
+        await prepare_database()
+
+    # Background dependency checks served by /readyz and /api/health
+    probes.monitor.start()
+
+    # Warm caches in the background; /readyz waits for it up to WARMUP_READY_TIMEOUT
+    if config.WARMUP_ENABLED:
+        warmup.start()
+        probes.monitor.add_gate("warming up caches", lambda: not warmup.running(), config.WARMUP_READY_TIMEOUT)
+
     print("Application startup complete")
     
     yield
     
     # Shutdown
     print("Shutting down application...")
-    # Add cleanup code here if needed
+    await warmup.stop()
+    await probes.monitor.stop()
+    await close_http_session()
 
 
 # Initialize FastAPI app
@@ -80,9 +103,14 @@ app = FastAPI(
     lifespan=lifespan,
     title="DexVault Campaign System",
     description="Campaign management and monitoring system",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+# Time budget of REQUEST_DEADLINES routes; added first so it is the innermost
+# middleware and its 504s still get CORS headers, metrics and profiles
+app.add_middleware(DeadlineMiddleware, budgets=config.REQUEST_DEADLINES)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -92,8 +120,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress transaction lists, QR payloads etc. for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=config.GZIP_MIN_SIZE)
+
+# Opt-in profiling of single requests (X-Profile header or sampling)
+app.add_middleware(
+    ProfilingMiddleware,
+    token=config.PROFILE_TOKEN,
+    sample_rate=config.PROFILE_SAMPLE_RATE,
+    output_dir=config.PROFILE_DIR,
+    repeat_threshold=config.PROFILE_REPEAT_THRESHOLD,
+    max_profiles=config.PROFILE_MAX_FILES,
+)
+
+# Per-route latency and in-flight metrics
+app.add_middleware(PrometheusMiddleware)
+
 app.include_router(routers)
 
+# Prometheus scrape endpoint
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+# Orchestrator probes: constant-time liveness, readiness from cached dependency checks
+app.add_route("/livez", probes.livez, include_in_schema=False)
+app.add_route("/readyz", probes.readyz, include_in_schema=False)
+# Celery queue lengths / memory and result backend size, read from Redis on each scrape
+register_collector(CeleryBacklogCollector(
+    sync_redis_client,
+    {queue.name for queue in celery_app.conf.task_queues} | {route['queue'] for route in celery_app.conf.task_routes.values()},
+))
+
 # Mount Socket.IO
 # app.mount("/socket.io", socket_app)
 
@@ -0,0 +1,149 @@
+"""Token market data (liquidity, market cap, price, 24h volume) of live campaigns.
+
+The ``refresh_market_data`` task asks DexScreener for the tokens of all
+active campaigns, MAX_TOKENS_PER_CALL addresses per request, and writes the
+results with one UPDATE ... FROM (VALUES ...) statement on PostgreSQL. Rows whose values
+did not change are left alone, so their ``updated_at`` (and the HTTP
+validators derived from it) only move when the data does.
+
+The columns are NUMERIC so listings can sort on them in SQL; the API still
+renders them as strings (``as_str``) for existing clients.
+"""
+import asyncio
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional
+
+import aiohttp
+import sqlalchemy as sa
+
+from src.config import config, async_session
+from src.models import Campaign
+from src.logger import setup_logger
+from src.metrics import observe_upstream
+
+logger = setup_logger("market_data", "market_data.log")
+
+MAX_TOKENS_PER_CALL = 30  # DexScreener limit for comma-separated token addresses
+FIELDS = ("liquidity", "market_cap", "price_usd", "volume_24h")
+
+
+def _decimal(value) -> Optional[Decimal]:
+    if value is None or value == "":
+        return None
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        return None
+    return number if number.is_finite() else None
+
+
+def from_metadata(token_metadata: Dict) -> Dict[str, Optional[Decimal]]:
+    """Market columns from a TokenService.fetch_token_metadata result"""
+    return {field: _decimal(token_metadata.get(field)) for field in FIELDS}
+
+
+def from_pair(pair: Dict) -> Dict[str, Optional[Decimal]]:
+    """Market columns from a DexScreener pair"""
+    return {
+        "liquidity": _decimal((pair.get("liquidity") or {}).get("usd")),
+        "market_cap": _decimal(pair.get("marketCap")),
+        "price_usd": _decimal(pair.get("priceUsd")),
+        "volume_24h": _decimal((pair.get("volume") or {}).get("h24")),
+    }
+
+
+def as_str(value: Optional[Decimal]) -> str:
+    """API rendering of a market column: "11086.4", "0" when unknown"""
+    return "0" if value is None else format(value.normalize(), "f")
+
+
+async def fetch_pairs(session: aiohttp.ClientSession, addresses: List[str]) -> Dict[str, Dict]:
+    """The most liquid DexScreener pair of each of ``addresses`` that DexScreener knows"""
+    async def _fetch_chunk(chunk: List[str]) -> List[Dict]:
+        with observe_upstream("dexscreener", "tokens"):
+            async with session.get(
+                f"{config.DEXSCREENER_API_URL}/latest/dex/tokens/{','.join(chunk)}",
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                response.raise_for_status()
+                return (await response.json()).get("pairs") or []
+
+    chunks = [addresses[i:i + MAX_TOKENS_PER_CALL] for i in range(0, len(addresses), MAX_TOKENS_PER_CALL)]
+    results = await asyncio.gather(*(_fetch_chunk(chunk) for chunk in chunks), return_exceptions=True)
+
+    wanted = set(addresses)
+    best: Dict[str, Dict] = {}
+    for chunk, pairs in zip(chunks, results):
+        if isinstance(pairs, Exception):
+            logger.warning(f"DexScreener market data request for {len(chunk)} tokens failed: {pairs}")
+            continue
+        for pair in pairs:
+            address = (pair.get("baseToken") or {}).get("address")
+            if address not in wanted:
+                continue
+            liquidity = (pair.get("liquidity") or {}).get("usd") or 0
+            if address not in best or liquidity > ((best[address].get("liquidity") or {}).get("usd") or 0):
+                best[address] = pair
+    return best
+
+
+async def fetch(session: aiohttp.ClientSession, addresses: List[str]) -> Dict[str, Dict]:
+    """Market data of ``addresses`` (those DexScreener knows), from the most liquid pair of each token"""
+    return {address: from_pair(pair) for address, pair in (await fetch_pairs(session, addresses)).items()}
+
+
+def _changed(new: Dict) -> sa.ColumnElement:
+    return sa.or_(*(getattr(Campaign, field).is_distinct_from(new[field]) for field in FIELDS))
+
+
+async def store(db, market: Dict[str, Dict]) -> int:
+    """Write market data of active campaigns in one statement; returns the number of rows changed
+
+    PostgreSQL gets a single UPDATE ... FROM (VALUES ...); SQLite cannot name
+    the columns of a VALUES list, so it runs the same UPDATE per token.
+    """
+    if not market:
+        return 0
+    table = Campaign.__table__
+    if db.bind.dialect.name == "postgresql":
+        values = sa.values(
+            sa.column("contract_address", sa.String),
+            *(sa.column(field, table.c[field].type) for field in FIELDS),
+            name="market",
+        ).data([(address, *(data[field] for field in FIELDS)) for address, data in market.items()])
+        new = {field: sa.cast(values.c[field], table.c[field].type) for field in FIELDS}
+        stmt = (
+            sa.update(table)
+            .where(table.c.contract_address == values.c.contract_address, table.c.status == 'active', _changed(new))
+            .values(new)
+        )
+        result = await db.execute(stmt)
+    else:
+        new = {field: sa.bindparam(f"new_{field}", type_=table.c[field].type) for field in FIELDS}
+        stmt = (
+            sa.update(table)
+            .where(table.c.contract_address == sa.bindparam("address"), table.c.status == 'active', _changed(new))
+            .values(new)
+        )
+        result = await db.execute(stmt, [
+            {"address": address, **{f"new_{field}": data[field] for field in FIELDS}}
+            for address, data in market.items()
+        ])
+    await db.commit()
+    return result.rowcount
+
+
+async def refresh(session: aiohttp.ClientSession) -> Dict:
+    """Fetch and store market data for the tokens of all active, unexpired campaigns"""
+    async with async_session() as db:
+        addresses = (await db.execute(
+            sa.select(Campaign.contract_address).distinct().where(
+                Campaign.status == 'active', Campaign.expires_at > datetime.now(timezone.utc)
+            )
+        )).scalars().all()
+    # no connection is held while DexScreener answers
+    market = await fetch(session, list(addresses))
+    async with async_session() as db:
+        updated = await store(db, market)
+    return {"tokens": len(addresses), "found": len(market), "updated": updated}
@@ -0,0 +1,394 @@
+import asyncio
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    push_to_gateway,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Match
+
+from src.logger import setup_logger
+from src import profiling
+
+logger = setup_logger("metrics", "metrics.log")
+
+# --------------------------
+# Multiprocess mode
+# --------------------------
+# When PROMETHEUS_MULTIPROC_DIR is set (uvicorn workers, celery prefork children)
+# every process writes its samples to that directory and the scrape endpoint
+# aggregates them with a MultiProcessCollector.
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+# Latency buckets tuned for an API that talks to slow third parties (up to 10s timeouts)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# --------------------------
+# HTTP routes
+# --------------------------
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Latency of HTTP requests by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served by route template",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+
+# --------------------------
+# Upstream calls (CoinGecko, DexScreener, Solana RPC)
+# --------------------------
+UPSTREAM_REQUEST_DURATION = Histogram(
+    "upstream_request_duration_seconds",
+    "Latency of calls to third-party services",
+    ["service", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total",
+    "Failed calls to third-party services",
+    ["service", "method"],
+)
+
+# --------------------------
+# Database
+# --------------------------
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Duration of SQL statements by statement type",
+    ["operation"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+DB_QUERIES = Counter(
+    "db_queries_total",
+    "SQL statements executed by statement type",
+    ["operation"],
+)
+
+# --------------------------
+# Celery
+# --------------------------
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Duration of celery task executions",
+    ["task"],
+    buckets=LATENCY_BUCKETS,
+)
+CELERY_TASKS = Counter(
+    "celery_tasks_total",
+    "Finished celery task executions by final state",
+    ["task", "state"],
+)
+
+# --------------------------
+# Ingest
+# --------------------------
+INGEST_LAG = Gauge(
+    "ingest_lag_seconds",
+    "Seconds between the block_time of the newest ingested transaction and when it was saved",
+    multiprocess_mode="mostrecent",
+)
+INGESTED_TRANSACTIONS = Counter(
+    "ingested_transactions_total",
+    "Transactions saved by the wallet monitor",
+)
+BACKFILLED_TRANSACTIONS = Counter(
+    "backfilled_transactions_total",
+    "Transactions inserted by wallet backfills (src/backfill.py); not counted in ingest lag",
+)
+SCAN_LEASES = Counter(
+    "wallet_scan_leases_total",
+    "Wallet scan lease attempts by outcome (acquired, busy: scan skipped, lost: expired while scanning)",
+    ["outcome"],
+)
+INGEST_FLUSH_DURATION = Histogram(
+    "ingest_flush_duration_seconds",
+    "Duration of ingest sink flushes (COPY into staging and merge)",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+INGEST_FLUSH_ROWS = Histogram(
+    "ingest_flush_rows",
+    "Transfers written per ingest sink flush",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+
+
+# --------------------------
+# Dependency checks (src/probes.py)
+# --------------------------
+DEPENDENCY_UP = Gauge(
+    "dependency_up",
+    "Result of the last background check of a dependency (1 ok, 0 failing)",
+    ["dependency"],
+    multiprocess_mode="livemin",
+)
+
+# --------------------------
+# Request deadlines
+# --------------------------
+DEADLINE_EXCEEDED = Counter(
+    "request_deadline_exceeded_total",
+    "Requests cancelled with 504 because their deadline passed, by route prefix",
+    ["route"],
+)
+STALE_RESPONSES = Counter(
+    "stale_responses_total",
+    "Responses that served a cached value because its upstream call failed or did not fit the deadline",
+    ["source"],
+)
+
+
+@contextmanager
+def observe_upstream(service: str, method: str):
+    """Time a call to a third-party service and count it as an error if it raises.
+
+    Works around both sync calls and awaited calls:
+
+        with observe_upstream("solana_rpc", "getBalance"):
+            await loop.run_in_executor(None, solana_client.get_balance, pubkey)
+    """
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        UPSTREAM_ERRORS.labels(service, method).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        UPSTREAM_REQUEST_DURATION.labels(service, method).observe(elapsed)
+        profiling.record_upstream(service, method, elapsed, error)
+
+
+def record_ingest(block_time: Optional[int]):
+    """Record a saved transaction and the lag between its block time and now"""
+    INGESTED_TRANSACTIONS.inc()
+    if block_time:
+        INGEST_LAG.set(max(time.time() - block_time, 0))
+
+
+# --------------------------
+# HTTP middleware
+# --------------------------
+class PrometheusMiddleware:
+    """ASGI middleware recording per-route latency and in-flight requests.
+
+    Requests are labelled with the route template (``/api/token/{contract_address}``)
+    rather than the raw path so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _route_template(scope) -> str:
+        router = scope["app"].router
+        for route in router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", scope["path"])
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route_template(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            HTTP_REQUEST_DURATION.labels(method, route, str(status["code"])).observe(
+                time.perf_counter() - start
+            )
+
+
+# Collectors read at scrape time by the API process only (see register_collector)
+_scrape_collectors: List = []
+
+
+def register_collector(collector):
+    """Expose ``collector`` on this process's scrape endpoint (not in multiprocess files)"""
+    _scrape_collectors.append(collector)
+    if not MULTIPROC_DIR:
+        REGISTRY.register(collector)
+
+
+def _registry():
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in _scrape_collectors:
+            registry.register(collector)
+        return registry
+    return REGISTRY
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Prometheus scrape endpoint"""
+    # collectors may do blocking I/O (Redis): keep it off the event loop
+    output = await asyncio.get_running_loop().run_in_executor(None, generate_latest, _registry())
+    return Response(output, headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+# --------------------------
+# Celery broker / result backend size
+# --------------------------
+class CeleryBacklogCollector:
+    """Length and Redis memory of each Celery queue, and size of the result backend.
+
+    Read from Redis at scrape time. Messages delivered to a worker but not yet
+    acknowledged (task_acks_late) are reported as queue ``unacked``. Result
+    memory is summed over at most ``sample_size`` result keys and extrapolated
+    to the rest.
+    """
+
+    RESULT_PATTERN = "celery-task-meta-*"
+
+    def __init__(self, redis_client, queues: Iterable[str], sample_size: int = 500):
+        self.redis = redis_client
+        self.queues = sorted(queues)
+        self.sample_size = sample_size
+
+    def describe(self):
+        # without this, registering the collector would call collect() (and Redis) at import time
+        return []
+
+    def collect(self):
+        length = GaugeMetricFamily("celery_queue_length", "Messages in a Celery queue", labels=["queue"])
+        memory = GaugeMetricFamily("celery_queue_memory_bytes", "Redis memory used by a Celery queue", labels=["queue"])
+        results = GaugeMetricFamily("celery_result_keys", "Task results stored in the Celery result backend")
+        results_memory = GaugeMetricFamily(
+            "celery_result_memory_bytes", "Redis memory used by stored task results (estimated beyond the sample)"
+        )
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for queue in self.queues:
+                pipe.llen(queue)
+                pipe.memory_usage(queue)
+            pipe.hlen("unacked")
+            pipe.memory_usage("unacked")
+            pipe.memory_usage("unacked_index")
+            replies = pipe.execute()
+
+            keys, sample = 0, []
+            for key in self.redis.scan_iter(match=self.RESULT_PATTERN, count=1000):
+                keys += 1
+                if len(sample) < self.sample_size:
+                    sample.append(key)
+            pipe = self.redis.pipeline(transaction=False)
+            for key in sample:
+                pipe.memory_usage(key)
+            sampled = [size or 0 for size in pipe.execute()] if sample else []
+        except Exception as e:
+            logger.warning(f"Could not read Celery queue sizes from Redis: {e}")
+            return
+
+        for i, queue in enumerate(self.queues):
+            length.add_metric([queue], replies[2 * i])
+            memory.add_metric([queue], replies[2 * i + 1] or 0)
+        unacked, unacked_memory, index_memory = replies[-3:]
+        length.add_metric(["unacked"], unacked)
+        memory.add_metric(["unacked"], (unacked_memory or 0) + (index_memory or 0))
+        results.add_metric([], keys)
+        results_memory.add_metric([], sum(sampled) * keys / len(sampled) if sampled else 0)
+        yield from (length, memory, results, results_memory)
+
+
+# --------------------------
+# SQLAlchemy instrumentation
+# --------------------------
+def instrument_engine(engine):
+    """Attach query count/duration listeners to a (sync or async) SQLAlchemy engine"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        operation = statement.lstrip().split(" ", 1)[0].upper() or "OTHER"
+        DB_QUERIES.labels(operation).inc()
+        DB_QUERY_DURATION.labels(operation).observe(elapsed)
+        profiling.record_query(statement, elapsed)
+
+
+# --------------------------
+# Celery instrumentation
+# --------------------------
+def instrument_celery(celery_app, pushgateway_url: Optional[str] = None, push_interval: float = 15.0):
+    """Record task duration/throughput and export worker metrics.
+
+    Worker metrics are exported either through multiprocess mode (a shared
+    PROMETHEUS_MULTIPROC_DIR scraped by the API or a sidecar) or, when
+    ``pushgateway_url`` is given, by pushing from each worker process on a timer.
+    """
+    from celery.signals import task_prerun, task_postrun, worker_process_init, worker_process_shutdown
+
+    task_start_times = {}
+
+    @task_prerun.connect(weak=False)
+    def _task_prerun(task_id=None, task=None, **kwargs):
+        task_start_times[task_id] = time.perf_counter()
+
+    @task_postrun.connect(weak=False)
+    def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+        start = task_start_times.pop(task_id, None)
+        if start is not None:
+            CELERY_TASK_DURATION.labels(task.name).observe(time.perf_counter() - start)
+        CELERY_TASKS.labels(task.name, state or "UNKNOWN").inc()
+
+    @worker_process_shutdown.connect(weak=False)
+    def _worker_process_shutdown(pid=None, **kwargs):
+        if MULTIPROC_DIR:
+            multiprocess.mark_process_dead(pid or os.getpid())
+
+    if pushgateway_url:
+        @worker_process_init.connect(weak=False)
+        def _start_pusher(**kwargs):
+            grouping_key = {"instance": f"{os.uname().nodename}-{os.getpid()}"}
+
+            def _push_forever():
+                while True:
+                    time.sleep(push_interval)
+                    try:
+                        push_to_gateway(pushgateway_url, job="celery_worker", registry=REGISTRY,
+                                        grouping_key=grouping_key)
+                    except Exception as e:
+                        logger.warning(f"Failed to push metrics to {pushgateway_url}: {e}")
+
+            threading.Thread(target=_push_forever, name="metrics-pusher", daemon=True).start()
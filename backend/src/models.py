@@ -9,30 +9,42 @@ class Campaign(Base):
     
     id = sa.Column(sa.String, primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
     campaign_id = sa.Column(sa.String(20), unique=True, nullable=False, index=True)
-    wallet_address = sa.Column(sa.String(44), nullable=False)  # Escrow wallet
+    wallet_address = sa.Column(sa.String(44), nullable=False, index=True)  # Escrow wallet (may be shared)
+    reference = sa.Column(sa.String(44), unique=True, index=True)  # Solana Pay reference routing payments to this campaign
     is_active = sa.Column(sa.Boolean, default=True)
     
     #from creating the endpoint
-    contract_address = sa.Column(sa.String(44), nullable=False)  # Token contract
+    contract_address = sa.Column(sa.String(44), nullable=False, index=True)  # Token contract
     goal_amount = sa.Column(sa.Numeric(15, 2), nullable=False)  # Goal in USD
     expires_at = sa.Column(sa.DateTime(timezone=True), nullable=False)
     campaign_type = sa.Column(sa.String(50), nullable=False)
     
-    #from dexscrenner api
-    name = sa.Column(sa.String(255), nullable=False)  # Token name
-    symbol = sa.Column(sa.String(20), nullable=False)  # Token symbol
+    #from dexscrenner api, filled in by the enrich_campaign task
+    name = sa.Column(sa.String(255))  # Token name
+    symbol = sa.Column(sa.String(20))  # Token symbol
     image_url = sa.Column(sa.Text)  # Token image
-    status = sa.Column(sa.String(20), default='active') #use enum later
+    status = sa.Column(sa.String(20), default='active')  # pending | active | failed | expired | duplicate
+    error = sa.Column(sa.Text)  # why enrichment failed
     created_at = sa.Column(sa.DateTime(timezone=True), default=datetime.now(timezone.utc))
+    updated_at = sa.Column(sa.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+                           onupdate=lambda: datetime.now(timezone.utc))  # version for HTTP caching
     social_twitter = sa.Column(sa.Text)
     social_website = sa.Column(sa.Text)
     description = sa.Column(sa.Text)
     token_launchpad = sa.Column(sa.String(50))
     token_source = sa.Column(sa.String(50))
-    liquidity = sa.Column(sa.String(20))
-    market_cap = sa.Column(sa.String(20))
-    price_usd = sa.Column(sa.String(20))
-    volume_24h = sa.Column(sa.String(20))
+    # USD market data, refreshed by the refresh_market_data task (src/market_data.py)
+    liquidity = sa.Column(sa.Numeric(24, 2))
+    market_cap = sa.Column(sa.Numeric(24, 2))
+    price_usd = sa.Column(sa.Numeric(38, 18))
+    volume_24h = sa.Column(sa.Numeric(24, 2))
+
+    __table_args__ = (
+        # at most one live (pending or active) campaign per token
+        sa.Index('uq_campaigns_live_contract', 'contract_address', unique=True,
+                 postgresql_where=sa.text("status IN ('pending', 'active')"),
+                 sqlite_where=sa.text("status IN ('pending', 'active')")),
+    )
 
 class TokenCache(Base):
     __tablename__ = 'token_cache'
@@ -51,11 +63,95 @@ class Transaction(Base):
     
     id = sa.Column(sa.String, primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
     campaign_id = sa.Column(sa.String(20), nullable=False, index=True)
-    signature = sa.Column(sa.String(88), unique=True, nullable=False)  # Changed from tx_hash
+    signature = sa.Column(sa.String(88), nullable=False)  # Changed from tx_hash
+    transfer_index = sa.Column(sa.Integer, nullable=False, default=0)  # nth transfer to the escrow within the signature
+    mint = sa.Column(sa.String(44))  # SPL token mint, NULL for SOL
     amount = sa.Column(sa.Numeric(20, 9), nullable=False)  # Amount in SOL
     from_wallet = sa.Column(sa.String(44), nullable=False)  # Changed from sender_wallet
     to_wallet = sa.Column(sa.String(44), nullable=False)  # Changed from recipient_wallet
     timestamp = sa.Column(sa.Integer, nullable=False)  # Unix timestamp
     amount_usd = sa.Column(sa.Numeric(15, 2))
     block_time = sa.Column(sa.DateTime(timezone=True))
-    processed_at = sa.Column(sa.DateTime(timezone=True), default=datetime.now(timezone.utc))
+    processed_at = sa.Column(sa.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        # one row per transfer; a transaction can carry several transfers to the escrow
+        sa.Index('uq_transactions_signature_transfer', 'signature', 'transfer_index', unique=True),
+    )
+
+
+class ArchivedTransaction(Base):
+    """Transactions of campaigns expired past ARCHIVE_RETENTION_DAYS, moved out of ``transactions``
+    by src/archive.py. On PostgreSQL the table is range-partitioned by month of ``timestamp``."""
+    __tablename__ = 'transactions_archive'
+
+    id = sa.Column(sa.String, primary_key=True)
+    campaign_id = sa.Column(sa.String(20), nullable=False, index=True)
+    signature = sa.Column(sa.String(88), nullable=False, index=True)
+    transfer_index = sa.Column(sa.Integer, nullable=False, default=0)
+    mint = sa.Column(sa.String(44))
+    amount = sa.Column(sa.Numeric(20, 9), nullable=False)
+    from_wallet = sa.Column(sa.String(44), nullable=False)
+    to_wallet = sa.Column(sa.String(44), nullable=False)
+    timestamp = sa.Column(sa.Integer, primary_key=True)  # partition key, so part of the primary key
+    amount_usd = sa.Column(sa.Numeric(15, 2))
+    block_time = sa.Column(sa.DateTime(timezone=True))
+    processed_at = sa.Column(sa.DateTime(timezone=True))
+    archived_at = sa.Column(sa.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = {'postgresql_partition_by': 'RANGE (timestamp)'}
+
+
+class BackfillCheckpoint(Base):
+    __tablename__ = 'backfill_checkpoints'
+
+    id = sa.Column(sa.String, primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
+    wallet_address = sa.Column(sa.String(44), nullable=False, index=True)
+    campaign_id = sa.Column(sa.String(20), nullable=False)
+    min_slot = sa.Column(sa.BigInteger)  # stop once signatures are older than this slot
+    max_slot = sa.Column(sa.BigInteger)  # skip signatures newer than this slot
+    before_signature = sa.Column(sa.String(88))  # resume cursor: oldest signature already processed
+    status = sa.Column(sa.String(20), nullable=False, default='pending')  # pending | running | done | failed
+    pages = sa.Column(sa.Integer, nullable=False, default=0)
+    signatures_scanned = sa.Column(sa.Integer, nullable=False, default=0)
+    transactions_inserted = sa.Column(sa.Integer, nullable=False, default=0)
+    error = sa.Column(sa.Text)
+    created_at = sa.Column(sa.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at = sa.Column(sa.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+                           onupdate=lambda: datetime.now(timezone.utc))
+
+# Idempotent DDL run by init_db() on PostgreSQL. create_all() only creates missing
+# tables, so columns/indexes added to existing tables must be listed here.
+SCHEMA_UPGRADES = [
+    "ALTER TABLE transactions ADD COLUMN IF NOT EXISTS transfer_index INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE transactions ADD COLUMN IF NOT EXISTS mint VARCHAR(44)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_transactions_signature_transfer ON transactions (signature, transfer_index)",
+    "ALTER TABLE transactions DROP CONSTRAINT IF EXISTS transactions_signature_key",
+    "CREATE INDEX IF NOT EXISTS ix_campaigns_contract_address ON campaigns (contract_address)",
+    "ALTER TABLE campaigns ADD COLUMN IF NOT EXISTS reference VARCHAR(44)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_campaigns_reference ON campaigns (reference)",
+    "CREATE INDEX IF NOT EXISTS ix_campaigns_wallet_address ON campaigns (wallet_address)",
+    "ALTER TABLE campaigns ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE campaigns ADD COLUMN IF NOT EXISTS error TEXT",
+    "ALTER TABLE campaigns ALTER COLUMN name DROP NOT NULL",
+    "ALTER TABLE campaigns ALTER COLUMN symbol DROP NOT NULL",
+    # campaigns created twice for a token before the index existed: keep the newest live
+    "UPDATE campaigns c SET status = 'duplicate', is_active = FALSE WHERE c.status IN ('pending', 'active') AND EXISTS ("
+    "SELECT 1 FROM campaigns n WHERE n.contract_address = c.contract_address AND n.status IN ('pending', 'active') "
+    "AND (n.created_at, n.id) > (c.created_at, c.id))",
+    # rows that left the live statuses without clearing is_active
+    "UPDATE campaigns SET is_active = FALSE WHERE status NOT IN ('pending', 'active') AND is_active",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_campaigns_live_contract ON campaigns (contract_address) "
+    "WHERE status IN ('pending', 'active')",
+    # market data columns were VARCHAR(20); values that are not numbers (e.g. 'None') become NULL
+    r"""DO $$ BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'campaigns' AND column_name = 'liquidity') = 'character varying' THEN
+        ALTER TABLE campaigns
+            ALTER COLUMN liquidity TYPE NUMERIC(24, 2) USING CASE WHEN liquidity ~ '^-?[0-9]+(\.[0-9]+)?([eE][-+]?[0-9]+)?$' THEN CAST(liquidity AS NUMERIC) END,
+            ALTER COLUMN market_cap TYPE NUMERIC(24, 2) USING CASE WHEN market_cap ~ '^-?[0-9]+(\.[0-9]+)?([eE][-+]?[0-9]+)?$' THEN CAST(market_cap AS NUMERIC) END,
+            ALTER COLUMN price_usd TYPE NUMERIC(38, 18) USING CASE WHEN price_usd ~ '^-?[0-9]+(\.[0-9]+)?([eE][-+]?[0-9]+)?$' THEN CAST(price_usd AS NUMERIC) END,
+            ALTER COLUMN volume_24h TYPE NUMERIC(24, 2) USING CASE WHEN volume_24h ~ '^-?[0-9]+(\.[0-9]+)?([eE][-+]?[0-9]+)?$' THEN CAST(volume_24h AS NUMERIC) END;
+    END IF;
+    END $$""",
+]
@@ -0,0 +1,208 @@
+"""Minute-resolution SOL/USD price series stored in Redis.
+
+Each UTC day is one Redis string of 1440 little-endian float32 prices
+(5760 bytes) under ``sol_price:<YYYYMMDD>``; minute ``m`` of the day is at
+byte offset ``4 * m`` and 0.0 marks a missing sample. Writes are SETRANGE and
+reads GETRANGE, so both are O(1) whatever the history length (about 2 MB per
+year).
+
+``update_sol_price`` appends the current price every minute, ``backfill_gaps``
+fills holes from CoinGecko's market_chart/range, and ``price_at`` values a
+transaction at its block time from a per-process cache of day strings, so
+ingest makes no HTTP calls.
+"""
+import struct
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+import redis
+import requests
+
+from src.config import config, redis_client, sync_redis_client
+from src.logger import setup_logger
+from src.metrics import observe_upstream
+
+logger = setup_logger("price_series", "price_series.log")
+
+KEY_PREFIX = "sol_price"
+LATEST_KEY = f"{KEY_PREFIX}:latest"
+MINUTES_PER_DAY = 1440
+MAX_LOOKBACK_MINUTES = 15    # use the last sample up to this old when a minute is missing
+LATEST_MAX_AGE = 300         # seconds before latest_price() is considered stale
+CACHE_RETRY_SECONDS = 5      # re-read a cached day at most this often when a minute is missing
+CACHE_MAX_DAYS = 8
+MAX_BACKFILL_REQUESTS = 10   # CoinGecko calls per backfill run
+
+_PRICE = struct.Struct("<f")
+_day_cache: Dict[str, Tuple[float, bytes]] = {}
+
+
+def _slot(ts: int) -> Tuple[str, int]:
+    """Redis key and minute-of-day for a unix timestamp"""
+    day = datetime.fromtimestamp(ts, timezone.utc)
+    return f"{KEY_PREFIX}:{day:%Y%m%d}", day.hour * 60 + day.minute
+
+
+def _quantize(price: float) -> Decimal:
+    # float32 keeps ~7 significant digits; round away the representation noise
+    return Decimal(str(round(price, 4)))
+
+
+# ----------------------------------------------------------------------------
+# Writes
+# ----------------------------------------------------------------------------
+
+def record(ts: int, price: float):
+    """Store the price for the minute containing ``ts`` and mark it as the latest"""
+    key, minute = _slot(ts)
+    pipe = sync_redis_client.pipeline(transaction=False)
+    pipe.setrange(key, minute * 4, _PRICE.pack(price))
+    pipe.set(LATEST_KEY, f"{ts}:{price}")
+    pipe.execute()
+
+
+def record_minutes(prices: Dict[int, float]):
+    """Store many ``{minute_ts: price}`` values, one SETRANGE per contiguous run"""
+    runs: List[Tuple[int, List[float]]] = []
+    for ts in sorted(prices):
+        minute_ts = ts - ts % 60
+        if runs and minute_ts == runs[-1][0] + 60 * len(runs[-1][1]) and _slot(minute_ts)[1] != 0:
+            runs[-1][1].append(prices[ts])
+        else:
+            runs.append((minute_ts, [prices[ts]]))
+    pipe = sync_redis_client.pipeline(transaction=False)
+    for start, values in runs:
+        key, minute = _slot(start)
+        pipe.setrange(key, minute * 4, b"".join(_PRICE.pack(v) for v in values))
+    pipe.execute()
+    for start, _ in runs:
+        _day_cache.pop(_slot(start)[0], None)
+
+
+# ----------------------------------------------------------------------------
+# Reads
+# ----------------------------------------------------------------------------
+
+def _day(key: str, refresh: bool = False) -> bytes:
+    cached = _day_cache.get(key)
+    if cached and not (refresh and time.monotonic() - cached[0] > CACHE_RETRY_SECONDS):
+        return cached[1]
+    data = sync_redis_client.get(key) or b""
+    _day_cache[key] = (time.monotonic(), data)
+    while len(_day_cache) > CACHE_MAX_DAYS:
+        _day_cache.pop(min(_day_cache, key=lambda k: _day_cache[k][0]))
+    return data
+
+
+def _lookup(ts: int, refresh: bool) -> Optional[float]:
+    for back in range(MAX_LOOKBACK_MINUTES + 1):
+        key, minute = _slot(ts - back * 60)
+        data = _day(key, refresh)
+        if len(data) >= minute * 4 + 4:
+            price = _PRICE.unpack_from(data, minute * 4)[0]
+            if price > 0:
+                return price
+    return None
+
+
+def price_at(ts: int) -> Optional[Decimal]:
+    """SOL/USD at ``ts``: the sample for that minute, or the closest earlier one
+    within MAX_LOOKBACK_MINUTES. None when the series has no price there yet
+    or Redis is unreachable."""
+    try:
+        price = _lookup(ts, refresh=False)
+        if price is None:
+            price = _lookup(ts, refresh=True)
+    except redis.RedisError as e:
+        logger.warning(f"Could not read SOL price series: {e}")
+        return None
+    return _quantize(price) if price is not None else None
+
+
+async def latest_price(max_age: Optional[int] = LATEST_MAX_AGE) -> Optional[float]:
+    """Most recent price appended by update_sol_price, if it is at most ``max_age`` seconds old (None: any age)"""
+    raw = await redis_client.get(LATEST_KEY)
+    if not raw:
+        return None
+    ts, price = raw.decode().split(":", 1)
+    if max_age is not None and time.time() - int(ts) > max_age:
+        return None
+    return float(price)
+
+
+# ----------------------------------------------------------------------------
+# Gap backfill
+# ----------------------------------------------------------------------------
+
+def find_gaps(start_ts: int, end_ts: int) -> List[Tuple[int, int]]:
+    """Missing minutes in [start_ts, end_ts) as (first_minute_ts, last_minute_ts) runs"""
+    gaps: List[Tuple[int, int]] = []
+    ts = start_ts - start_ts % 60
+    while ts < end_ts:
+        key, minute = _slot(ts)
+        data = sync_redis_client.get(key) or b""
+        day_end = min(end_ts, ts + (MINUTES_PER_DAY - minute) * 60)
+        while ts < day_end:
+            missing = len(data) < minute * 4 + 4 or _PRICE.unpack_from(data, minute * 4)[0] <= 0
+            if missing:
+                if gaps and gaps[-1][1] == ts - 60:
+                    gaps[-1] = (gaps[-1][0], ts)
+                else:
+                    gaps.append((ts, ts))
+            ts += 60
+            minute += 1
+    return gaps
+
+
+def fetch_range(start_ts: int, end_ts: int) -> List[Tuple[int, float]]:
+    """CoinGecko samples between two timestamps as (unix seconds, price), oldest first"""
+    with observe_upstream("coingecko", "market_chart_range"):
+        response = requests.get(
+            f"{config.COINGECKO_API_URL}/coins/solana/market_chart/range",
+            params={"vs_currency": "usd", "from": start_ts, "to": end_ts},
+            timeout=10
+        )
+        response.raise_for_status()
+    return [(int(ms) // 1000, float(price)) for ms, price in response.json().get("prices", [])]
+
+
+def backfill_gaps(hours: int = 48, merge_within: int = 3600) -> int:
+    """Fill missing minutes of the last ``hours`` from CoinGecko; returns minutes filled.
+
+    Gaps closer than ``merge_within`` seconds are fetched with one request.
+    CoinGecko returns 5-minute samples for ranges under a day and hourly ones
+    beyond, so each missing minute takes the last sample at or before it.
+    """
+    now = int(time.time())
+    # the current and previous minute are still being written by update_sol_price
+    gaps = find_gaps(now - hours * 3600, now - 120)
+    merged: List[Tuple[int, int]] = []
+    for first, last in gaps:
+        if merged and first - merged[-1][1] <= merge_within:
+            merged[-1] = (merged[-1][0], last)
+        else:
+            merged.append((first, last))
+
+    missing = {ts for first, last in gaps for ts in range(first, last + 60, 60)}
+    filled = 0
+    for first, last in merged[-MAX_BACKFILL_REQUESTS:]:
+        samples = fetch_range(first - 3600, last + 60)
+        if not samples:
+            continue
+        prices: Dict[int, float] = {}
+        i = 0
+        for ts in range(first, last + 60, 60):
+            if ts not in missing:
+                continue
+            while i + 1 < len(samples) and samples[i + 1][0] <= ts:
+                i += 1
+            if samples[i][0] <= ts + 60:
+                prices[ts] = samples[i][1]
+        if prices:
+            record_minutes(prices)
+            filled += len(prices)
+    if filled:
+        logger.info(f"Backfilled {filled} missing SOL price minutes")
+    return filled
@@ -0,0 +1,174 @@
+"""Liveness / readiness probes backed by cached dependency checks.
+
+Orchestrator probes must not touch third parties on every call, and must not
+fail because CoinGecko is slow. Each API process runs ``DependencyMonitor``
+in the background. Every PROBE_INTERVAL seconds it checks the database,
+Redis and the Solana RPC concurrently, each bounded by PROBE_TIMEOUT. It also
+reads the campaign counts per status, the last SOL price and the beat leader
+status. The endpoints only read that snapshot:
+
+    /livez        constant 200 while the event loop answers
+    /readyz       200 when the PROBE_REQUIRED checks passed in the last
+                  refresh, 503 before the first one, when one of them failed,
+                  when the monitor stopped refreshing, or while a gate added
+                  with ``add_gate`` (the startup cache warm-up) is open
+    /api/health   the whole snapshot (see routes.health_check)
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import sqlalchemy as sa
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src import beat, price_series
+from src.config import config, async_session, read_session, redis_client, solana_client
+from src.logger import setup_logger
+from src.metrics import DEPENDENCY_UP
+from src.models import Campaign
+from src.responses import ORJSONResponse
+
+logger = setup_logger("probes", "probes.log")
+
+
+class DependencyMonitor:
+    """Periodically checks dependencies and keeps the last results for the probe endpoints"""
+
+    def __init__(self, interval: float, timeout: float, required: Iterable[str]):
+        self.interval = interval
+        self.timeout = timeout
+        self.required = set(required)
+        self.checks: Dict[str, Dict] = {}
+        self.campaigns: Dict[str, int] = {}
+        self.sol_price: Optional[float] = None
+        self.scheduler: Optional[Dict] = None
+        self.checked_at: Optional[datetime] = None
+        self._refreshed = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._gates: List[Tuple[str, Callable[[], bool], float]] = []
+
+    # ------------------------------------------------------------------
+    # Checks
+    # ------------------------------------------------------------------
+
+    async def _database(self):
+        async with async_session() as db:
+            await db.execute(sa.select(1))
+
+    async def _redis(self):
+        if redis_client is None:
+            raise RuntimeError("Redis not configured")
+        await redis_client.ping()
+
+    async def _solana_rpc(self):
+        await asyncio.get_running_loop().run_in_executor(None, solana_client.get_slot)
+
+    async def _campaigns(self):
+        # counts only: the probe must not load every active campaign
+        async with read_session() as db:
+            rows = await db.execute(sa.select(Campaign.status, sa.func.count()).group_by(Campaign.status))
+            self.campaigns = {status: count for status, count in rows.all()}
+
+    async def _check(self, name: str, check) -> Dict:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(check(), self.timeout)
+            result = {"ok": True, "error": None}
+        except Exception as e:
+            result = {"ok": False, "error": str(e) or type(e).__name__}
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        DEPENDENCY_UP.labels(name).set(1 if result["ok"] else 0)
+        if not result["ok"]:
+            logger.warning(f"Dependency check {name} failed: {result['error']}")
+        return result
+
+    async def refresh(self):
+        """Run every check once (concurrently) and store the results"""
+        checks = {
+            "database": self._database,
+            "redis": self._redis,
+            "solana_rpc": self._solana_rpc,
+            "campaigns": self._campaigns,
+        }
+        results = await asyncio.gather(*(self._check(name, check) for name, check in checks.items()))
+        self.checks = dict(zip(checks, results))
+
+        if self.checks["redis"]["ok"]:
+            try:
+                self.sol_price = await price_series.latest_price(max_age=None)
+                self.scheduler = await beat.leader_status(redis_client)
+            except Exception as e:
+                logger.warning(f"Could not read SOL price / beat status: {e}")
+        self.checked_at = datetime.now(timezone.utc)
+        self._refreshed = time.monotonic()
+
+    async def run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Dependency checks failed: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ------------------------------------------------------------------
+    # Readiness
+    # ------------------------------------------------------------------
+
+    def add_gate(self, reason: str, done: Callable[[], bool], timeout: float):
+        """Report ``reason`` as not ready until ``done()`` is true, for at most ``timeout`` seconds"""
+        self._gates.append((reason, done, time.monotonic() + timeout))
+
+    def not_ready(self) -> Optional[str]:
+        """Why the process is not ready, None if it is"""
+        if self.checked_at is None:
+            return "dependency checks have not run yet"
+        if time.monotonic() - self._refreshed > 3 * self.interval + self.timeout:
+            return "dependency checks are not being refreshed"
+        failed = sorted(name for name in self.required if not self.checks.get(name, {}).get("ok"))
+        if failed:
+            return f"failing: {', '.join(failed)}"
+        now = time.monotonic()
+        self._gates = [gate for gate in self._gates if not gate[1]() and now < gate[2]]
+        if self._gates:
+            return self._gates[0][0]
+        return None
+
+
+monitor = DependencyMonitor(config.PROBE_INTERVAL, config.PROBE_TIMEOUT, config.PROBE_REQUIRED)
+
+
+# ----------------------------------------------------------------------------
+# Endpoints
+# ----------------------------------------------------------------------------
+
+async def livez(request: Request) -> Response:
+    """Liveness: no I/O, answers as long as the process serves requests"""
+    return ORJSONResponse({"status": "ok"})
+
+
+async def readyz(request: Request) -> Response:
+    """Readiness from the last cached dependency checks"""
+    reason = monitor.not_ready()
+    body = {
+        "status": "ready" if reason is None else "not ready",
+        "checked_at": monitor.checked_at.isoformat() if monitor.checked_at else None,
+        "checks": {name: monitor.checks[name]["ok"] for name in monitor.checks},
+    }
+    if reason is not None:
+        body["reason"] = reason
+    return ORJSONResponse(body, status_code=200 if reason is None else 503)
@@ -0,0 +1,273 @@
+"""Opt-in profiling of single requests and Celery tasks.
+
+A request is profiled when it carries ``X-Profile: <PROFILE_TOKEN>`` or is
+picked at random with probability PROFILE_SAMPLE_RATE (PROFILE_TASK_SAMPLE_RATE
+for Celery tasks). While it runs, pyinstrument samples its call stack, and
+every SQL statement (engine events in src.metrics) and upstream call
+(observe_upstream) is recorded with its duration. Requests are sampled in
+pyinstrument's async mode: time spent awaiting shows up on the await, and
+other requests running on the same loop are not counted.
+
+The result is written to PROFILE_DIR as ``<id>.html`` (pyinstrument's call
+tree) and ``<id>.json`` (timings, statements, upstream calls, findings), and a
+summary is logged. Only the newest PROFILE_MAX_FILES profiles are kept: older
+ones are deleted whenever a profile is saved. The same statement or upstream method issued
+PROFILE_REPEAT_THRESHOLD times or more by one request is flagged as a likely
+N+1 pattern. Profiled responses carry ``X-Profile-Id``; GET /api/profiles/{id}
+downloads the artifact with the same token.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import secrets
+import time
+import uuid
+from collections import defaultdict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from pyinstrument import Profiler
+
+from src.logger import setup_logger
+
+logger = setup_logger("profiling", "profiling.log")
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "x-profile-id"
+PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+_current: ContextVar[Optional["Profile"]] = ContextVar("profile", default=None)
+
+
+class Profile:
+    """Statements, upstream calls and the stack profile of one request or task"""
+
+    def __init__(self, name: str, repeat_threshold: int):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.repeat_threshold = repeat_threshold
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status: Optional[int] = None
+        self.queries: List[Dict] = []
+        self.upstream: List[Dict] = []
+
+    def findings(self) -> List[Dict]:
+        """Statements and upstream methods repeated at least ``repeat_threshold`` times"""
+        groups = defaultdict(list)
+        for query in self.queries:
+            groups[("sql", query["statement"])].append(query["ms"])
+        for call in self.upstream:
+            groups[("upstream", f"{call['service']} {call['method']}")].append(call["ms"])
+        return sorted((
+            {"kind": kind, "target": target, "count": len(times), "total_ms": round(sum(times), 3)}
+            for (kind, target), times in groups.items() if len(times) >= self.repeat_threshold
+        ), key=lambda f: -f["total_ms"])
+
+    def report(self) -> Dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "query_count": len(self.queries),
+            "query_ms": round(sum(q["ms"] for q in self.queries), 3),
+            "upstream_count": len(self.upstream),
+            "upstream_ms": round(sum(c["ms"] for c in self.upstream), 3),
+            "findings": self.findings(),
+            "queries": self.queries,
+            "upstream": self.upstream,
+        }
+
+
+# ----------------------------------------------------------------------------
+# Recording (called from src.metrics)
+# ----------------------------------------------------------------------------
+
+def record_query(statement: str, elapsed: float):
+    profile = _current.get()
+    if profile is not None:
+        profile.queries.append({"statement": statement, "ms": round(elapsed * 1000, 3)})
+
+
+def record_upstream(service: str, method: str, elapsed: float, error: bool):
+    profile = _current.get()
+    if profile is not None:
+        profile.upstream.append({"service": service, "method": method, "ms": round(elapsed * 1000, 3), "error": error})
+
+
+# ----------------------------------------------------------------------------
+# Capture
+# ----------------------------------------------------------------------------
+
+class _Capture:
+    """Starts recording and the stack sampler for a profile, and saves both at the end"""
+
+    def __init__(self, name: str, output_dir: str, repeat_threshold: int, interval: float, async_mode: str,
+                 max_profiles: int):
+        self.profile = Profile(name, repeat_threshold)
+        self.output_dir = output_dir
+        self.max_profiles = max_profiles
+        self.profiler = Profiler(interval=interval, async_mode=async_mode)
+        self._token = None
+
+    def start(self) -> Profile:
+        self._token = _current.set(self.profile)
+        try:
+            self.profiler.start()
+        except RuntimeError as e:
+            # e.g. an outer profiler already runs in this context; statements are still recorded
+            logger.warning(f"Stack profile of {self.profile.name} unavailable: {e}")
+            self.profiler = None
+        return self.profile
+
+    def stop(self):
+        """Stop recording; save with ``save`` (blocking file I/O) afterwards"""
+        self.profile.duration = time.perf_counter() - self.profile.started
+        if self.profiler is not None:
+            self.profiler.stop()
+        _current.reset(self._token)
+
+    def save(self) -> Dict:
+        report = self.profile.report()
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, self.profile.id)
+        if self.profiler is not None:
+            with open(f"{path}.html", "w") as f:
+                f.write(self.profiler.output_html())
+        with open(f"{path}.json", "w") as f:
+            json.dump(report, f, indent=2)
+        prune(self.output_dir, self.max_profiles)
+
+        summary = (f"Profile {report['id']} {report['name']}: {report['duration_ms']} ms, "
+                   f"{report['query_count']} queries ({report['query_ms']} ms), "
+                   f"{report['upstream_count']} upstream calls ({report['upstream_ms']} ms)")
+        if report["findings"]:
+            flagged = "; ".join(f"{f['count']}x {f['kind']} {f['target'][:120]}" for f in report["findings"])
+            logger.warning(f"{summary}. Repeated calls (possible N+1): {flagged}")
+        else:
+            logger.info(summary)
+        return report
+
+
+def prune(output_dir: str, keep: int):
+    """Delete all but the ``keep`` most recently saved profiles in ``output_dir``"""
+    saved = []
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            profile_id, _, fmt = entry.name.partition(".")
+            if fmt == "json" and PROFILE_ID.match(profile_id):
+                try:
+                    saved.append((entry.stat().st_mtime, profile_id))
+                except FileNotFoundError:
+                    pass
+    if len(saved) <= keep:
+        return
+    saved.sort()
+    for _, profile_id in saved[:len(saved) - keep]:
+        for fmt in ("json", "html"):
+            try:
+                os.remove(os.path.join(output_dir, f"{profile_id}.{fmt}"))
+            except FileNotFoundError:
+                # pruned concurrently by another process
+                pass
+
+
+def artifact_path(output_dir: str, profile_id: str, fmt: str) -> Optional[str]:
+    """Path of a saved profile artifact (``html`` or ``json``), None if unknown"""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(output_dir, f"{profile_id}.{fmt}")
+    return path if os.path.exists(path) else None
+
+
+# ----------------------------------------------------------------------------
+# HTTP middleware
+# ----------------------------------------------------------------------------
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests that ask for it (``X-Profile: <token>``) or are sampled"""
+
+    def __init__(self, app, token: Optional[str] = None, sample_rate: float = 0.0, output_dir: str = "profiles",
+                 repeat_threshold: int = 3, interval: float = 0.001, max_profiles: int = 200,
+                 exclude: tuple = ("/api/profiles", "/metrics", "/livez", "/readyz")):
+        self.app = app
+        self.max_profiles = max_profiles
+        self.exclude = exclude
+        self.token = token
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.repeat_threshold = repeat_threshold
+        self.interval = interval
+
+    def _wanted(self, scope) -> bool:
+        if scope["path"].startswith(self.exclude):
+            return False
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER.encode():
+                    return secrets.compare_digest(value.decode("latin-1"), self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        capture = _Capture(f"{scope['method']} {scope['path']}", self.output_dir, self.repeat_threshold,
+                           self.interval, async_mode="enabled", max_profiles=self.max_profiles)
+        profile = capture.start()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message["headers"] = [*message.get("headers", []), (PROFILE_ID_HEADER.encode(), profile.id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            capture.stop()
+            try:
+                # rendering the call tree takes a few ms: keep it off the event loop
+                await asyncio.get_running_loop().run_in_executor(None, capture.save)
+            except Exception as e:
+                logger.error(f"Could not save profile {profile.id}: {e}")
+
+
+# ----------------------------------------------------------------------------
+# Celery
+# ----------------------------------------------------------------------------
+
+def instrument_celery(sample_rate: float, output_dir: str, repeat_threshold: int = 3, interval: float = 0.001,
+                      max_profiles: int = 200):
+    """Profile a ``sample_rate`` fraction of Celery task runs"""
+    if sample_rate <= 0:
+        return
+    from celery.signals import task_prerun, task_postrun
+
+    captures: Dict[str, _Capture] = {}
+
+    @task_prerun.connect(weak=False)
+    def _start(task_id=None, task=None, **kwargs):
+        if random.random() < sample_rate:
+            capture = _Capture(f"task {task.name}", output_dir, repeat_threshold, interval, async_mode="disabled",
+                               max_profiles=max_profiles)
+            captures[task_id] = capture
+            capture.start()
+
+    @task_postrun.connect(weak=False)
+    def _stop(task_id=None, task=None, state=None, **kwargs):
+        capture = captures.pop(task_id, None)
+        if capture is not None:
+            capture.profile.status = state
+            capture.stop()
+            try:
+                capture.save()
+            except Exception as e:
+                logger.error(f"Could not save profile {capture.profile.id}: {e}")
@@ -0,0 +1,35 @@
+"""Response classes that skip FastAPI's generic encoding path.
+
+By default a route's return value is validated against its response_model,
+walked by jsonable_encoder and dumped with the stdlib json module. Returning
+one of these responses bypasses all of that:
+
+    ORJSONResponse   plain dicts/lists, encoded by orjson (the app default)
+    ModelResponse    a pydantic model, serialized to bytes by pydantic-core
+                     without being validated again
+"""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+
+def _default(obj: Any):
+    # matches jsonable_encoder, which also emits Decimals as numbers
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ModelResponse(JSONResponse):
+    def render(self, content: BaseModel) -> bytes:
+        return content.__pydantic_serializer__.to_json(content)
@@ -1,20 +1,28 @@
+import csv
+import io
+import secrets
 import uuid
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Optional
+from typing import Literal, Optional
 
-from fastapi import HTTPException, Depends, Query, APIRouter
+from fastapi import HTTPException, Depends, Query, APIRouter, Request
+from fastapi.responses import FileResponse, StreamingResponse
+import orjson
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from solders.pubkey import Pubkey
 import asyncio
 
-from src.config import solana_client, get_db
-from src.models import Campaign, Transaction, TokenCache
-from src.services import TokenService, QRCodeService, SolanaMonitor, get_monitoring_status, start_monitoring_campaign, CampaignService
-from src.schema import CampaignCreate, CampaignResponse, ErrorResponse
+from src.config import solana_client, get_db, get_read_db, async_session, stick_to_primary
+from src.models import Campaign, TokenCache
+from src.services import TokenService, QRCodeService, SolanaMonitor, start_monitoring_campaign, CampaignService, new_reference, TOKEN_CACHE_MAX_AGE
+from src.schema import CampaignCreate, CampaignResponse, CampaignStatusResponse, ErrorResponse, CampaignBulkRequest, CampaignBulkResponse, LeaderboardResponse
 from src.config import config
 from src.logger import setup_logger
+from src.metrics import observe_upstream
+from src import leaderboard, balances, http_cache, archive, profiling, deadlines, probes, warmup
+from src.responses import ORJSONResponse, ModelResponse
 
 
 
@@ -29,18 +37,24 @@ def get_solana_monitor(db: AsyncSession = Depends(get_db)):
 def get_campaign_service(db: AsyncSession = Depends(get_db)):
     return  CampaignService(db=db) 
 
-@routers.post('/campaigns', response_model=CampaignResponse)
+def get_read_campaign_service(db: AsyncSession = Depends(get_read_db)):
+    return CampaignService(db=db)
+
+@routers.post('/campaigns', response_model=CampaignResponse, status_code=202)
 #create the campaigns from the backend, the frontend just pass the contact address to the verify endpoint 
 async def create_campaign(
             campaign_data: CampaignCreate,
             get_campaign: CampaignService = Depends(get_campaign_service)):
     
-    """Create a new campaign"""
+    """Create a new campaign; it is 'pending' until the enrich_campaign task activates it"""
     logger.info(f"Attempting to create a new campaign with data: {campaign_data}")
     try:
         campaign = await get_campaign.create(campaign_data)
         logger.info(f"Campaign created successfully: {campaign.campaign_id}")
-        return campaign.model_dump()
+        response = ModelResponse(campaign, status_code=202,
+                                 headers={"Location": f"{routers.prefix}/campaigns/{campaign.campaign_id}/status"})
+        stick_to_primary(response)
+        return response
     except HTTPException as http_exc:
         logger.warning(f"HTTPException while creating campaign: {http_exc.detail}")
         raise
@@ -49,18 +63,87 @@ async def create_campaign(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@routers.get('/campaign-detail/{contract_address}')
+@routers.get('/campaigns/{campaign_id}/status', response_model=CampaignStatusResponse)
+async def get_campaign_status(campaign_id: str,
+                              get_campaign: CampaignService = Depends(get_read_campaign_service)):
+    """Creation progress of a campaign: pending, then active (or failed, with the reason)"""
+    status = await get_campaign.get_status(campaign_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return ModelResponse(status)
+
+
+@routers.get('/campaigns', response_model=CampaignBulkResponse)
+async def get_campaigns_bulk(
+    contract_addresses: str = Query(..., description="Comma-separated token contract addresses"),
+    sort: Optional[Literal['liquidity', 'market_cap', 'price_usd', 'volume_24h']] = Query(
+        None, description="Order by this market data field, highest first, instead of the request order"),
+    get_campaign: CampaignService = Depends(get_read_campaign_service)):
+    
+    """Get campaign summaries for several contract addresses"""
+    addresses = contract_addresses.split(",")
+    logger.info(f"Attempting to get campaign summaries for {len(addresses)} contract addresses")
+    try:
+        return ModelResponse(await get_campaign.get_campaigns_bulk(addresses, sort=sort))
+    except HTTPException as http_exc:
+        logger.warning(f"HTTPException while getting campaign summaries: {http_exc.detail}")
+        raise
+
+
+@routers.post('/campaigns/lookup', response_model=CampaignBulkResponse)
+async def lookup_campaigns_bulk(
+    lookup: CampaignBulkRequest,
+    get_campaign: CampaignService = Depends(get_read_campaign_service)):
+    
+    """Get campaign summaries for a list of contract addresses (body variant of GET /campaigns)"""
+    logger.info(f"Attempting to get campaign summaries for {len(lookup.contract_addresses)} contract addresses")
+    try:
+        return ModelResponse(await get_campaign.get_campaigns_bulk(lookup.contract_addresses))
+    except HTTPException as http_exc:
+        logger.warning(f"HTTPException while getting campaign summaries: {http_exc.detail}")
+        raise
+
+
+@routers.get('/leaderboard', response_model=LeaderboardResponse)
+async def get_leaderboard(
+    sort: str = Query("raised_usd", pattern="^(raised_usd|percent_goal|velocity)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")):
+    
+    """List active campaigns ranked by raised USD, percent of goal or 24h velocity (served from Redis)"""
+    logger.info(f"Attempting to get leaderboard sorted by {sort} (limit={limit}, cursor={cursor})")
+    try:
+        page = await leaderboard.get_page(sort, limit, cursor)
+        return ORJSONResponse({"success": True, **page})
+    except (ValueError, UnicodeDecodeError):
+        logger.warning(f"Invalid leaderboard cursor: {cursor}")
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    except Exception as e:
+        logger.error(f"Unexpected error getting leaderboard: {e}", exc_info=True)
+        raise HTTPException(status_code=503, detail="Leaderboard unavailable")
+
+
+@routers.get('/campaign-detail/{contract_address}', response_model=CampaignResponse)
 async def get_campaign_detail(
     contract_address: str, 
-    get_campaign: CampaignService = Depends(get_campaign_service)):
+    request: Request,
+    get_campaign: CampaignService = Depends(get_read_campaign_service)):
     
     """Get campaign details by contract address"""
     logger.info(f"Attempting to get campaign details for contract address: {contract_address}")
     try:
-        details = await get_campaign.get_campaign_details(contract_address)
+        summary = await get_campaign.get_campaign_summary(contract_address)
+        campaign, balance_sol, contributor_count, _ = summary
+        current_sol_price = await SolanaMonitor.get_current_sol_price()
+        # current_balance is valued at the current SOL price, so it is part of the version. A price
+        # change has no modification time: no Last-Modified, so If-Modified-Since cannot give a stale 304
+        etag = http_cache.make_etag(campaign.id, campaign.updated_at, balance_sol, contributor_count, current_sol_price)
+        cached = http_cache.not_modified(request, etag, None, config.HTTP_CACHE_MAX_AGE)
+        if cached:
+            return cached
+        details = await get_campaign.get_campaign_details(contract_address, summary, current_sol_price)
         logger.info(f"Campaign details retrieved successfully for contract address: {contract_address}")
-        return details.model_dump()
-        #TODO pass through pydantic
+        return ModelResponse(details, headers=http_cache.cache_headers(etag, None, config.HTTP_CACHE_MAX_AGE))
     except HTTPException as http_exc:
         logger.warning(f"HTTPException while getting campaign details for {contract_address}: {http_exc.detail}")
         raise
@@ -70,26 +153,41 @@ async def get_campaign_detail(
     
     
     
+async def _wallet_campaigns(db: AsyncSession, wallet_address: str):
+    """(campaign_id, created_at, updated_at) of every campaign paid into ``wallet_address``"""
+    stmt = (
+        select(Campaign.campaign_id, Campaign.created_at, Campaign.updated_at)
+        .where(Campaign.wallet_address == wallet_address)
+        .order_by(Campaign.campaign_id)
+    )
+    return (await db.execute(stmt)).all()
+
+
 @routers.get('/escrow-transactions/{wallet_address}')
-async def get_escrow_transactions(wallet_address: str, db: AsyncSession = Depends(get_db)):
+async def get_escrow_transactions(wallet_address: str, request: Request, db: AsyncSession = Depends(get_read_db)):
     """Get transactions for an escrow address"""
     logger.info(f"Attempting to get escrow transactions for wallet address: {wallet_address}")
     try:
-        # Find campaign by escrow address (async)
-        stmt = select(Campaign).where(Campaign.wallet_address == wallet_address)
-        result = await db.execute(stmt)
-        campaign = result.scalar_one_or_none()
-        
-        if not campaign:
+        # Every campaign on the escrow: a shared wallet (config.WALLET) holds many
+        campaigns = await _wallet_campaigns(db, wallet_address)
+        if not campaigns:
             logger.warning(f"Campaign not found for wallet address: {wallet_address}")
             raise HTTPException(status_code=404, detail="Campaign not found")
         
+        # Hot and archived rows alike; versioned by campaigns and latest saved transaction before loading them
+        txs = archive.all_transactions([c.campaign_id for c in campaigns])
+        count_stmt = select(func.count(), func.max(txs.c.processed_at))
+        count, last_transaction_at = (await db.execute(count_stmt)).one()
+        etag = http_cache.make_etag(*(f"{c.campaign_id}:{c.updated_at}" for c in campaigns), count, last_transaction_at)
+        last_modified = http_cache.latest(*(c.updated_at or c.created_at for c in campaigns), last_transaction_at)
+        cached = http_cache.not_modified(request, etag, last_modified, config.HTTP_CACHE_MAX_AGE)
+        if cached:
+            return cached
+        
         # Get transactions (async)
-        tx_stmt = select(Transaction).where(
-            Transaction.campaign_id == campaign.campaign_id
-        ).order_by(Transaction.timestamp.desc())
+        tx_stmt = select(txs).order_by(txs.c.timestamp.desc())
         tx_result = await db.execute(tx_stmt)
-        transactions = tx_result.scalars().all()
+        transactions = tx_result.all()
         
         # Get unique contributors
         contributors = list(set(tx.from_wallet for tx in transactions if tx.from_wallet != "Unknown"))
@@ -100,6 +198,8 @@ async def get_escrow_transactions(wallet_address: str, db: AsyncSession = Depend
                 "signature": tx.signature,
                 "amount": float(tx.amount),
                 "from": tx.from_wallet,
+                "mint": tx.mint,
+                "campaign_id": tx.campaign_id,
                 "timestamp": tx.timestamp
             })
         
@@ -109,7 +209,7 @@ async def get_escrow_transactions(wallet_address: str, db: AsyncSession = Depend
             "transactions": transaction_list
         }
         logger.info(f"Retrieved {len(transactions)} transactions for wallet address: {wallet_address}")
-        return response_data
+        return ORJSONResponse(response_data, headers=http_cache.cache_headers(etag, last_modified, config.HTTP_CACHE_MAX_AGE))
         
     except HTTPException as http_exc:
         logger.warning(f"HTTPException while getting escrow transactions for {wallet_address}: {http_exc.detail}")
@@ -118,60 +218,75 @@ async def get_escrow_transactions(wallet_address: str, db: AsyncSession = Depend
         logger.error(f"Unexpected error getting escrow transactions for {wallet_address}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 @routers.get('/escrow-balance')
-async def get_escrow_balance(wallet: str = Query(...), db: AsyncSession = Depends(get_db)):
+async def get_escrow_balance(wallet: str = Query(...), db: AsyncSession = Depends(get_read_db)):
     """Get escrow wallet balance"""
     logger.info(f"Attempting to get escrow balance for wallet: {wallet}")
     try:
         # Get balance from Solana RPC (run in thread pool)
         async def get_balance():
             try:
-                pubkey = Pubkey.from_string(wallet)
-                balance_response = await asyncio.get_event_loop().run_in_executor(
-                    None, solana_client.get_balance, pubkey
-                )
-                balance_lamports = balance_response.value
+                # Served from the cache kept fresh by refresh_escrow_balances; RPC only on a miss
+                balance_lamports = await balances.get_cached_balance(wallet)
+                if balance_lamports is None:
+                    pubkey = Pubkey.from_string(wallet)
+                    try:
+                        timeout = deadlines.upstream_timeout(None)
+                        with observe_upstream("solana_rpc", "getBalance"):
+                            balance_response = await asyncio.wait_for(asyncio.get_event_loop().run_in_executor(
+                                None, solana_client.get_balance, pubkey
+                            ), timeout)
+                        balance_lamports = balance_response.value
+                        await balances.cache_balance(wallet, balance_lamports)
+                    except Exception as e:
+                        # RPC failed or did not fit the request deadline: last known balance, flagged stale
+                        balance_lamports = await balances.get_cached_balance(wallet, stale_ok=True)
+                        if balance_lamports is None:
+                            # nothing to fall back on: an error, never a zero balance
+                            logger.error(f"No balance available for {wallet}: {e!r}")
+                            if isinstance(e, (deadlines.DeadlineExceeded, asyncio.TimeoutError)) and deadlines.remaining() is not None:
+                                raise HTTPException(status_code=504, detail="Deadline exceeded")
+                            raise HTTPException(status_code=503, detail="Escrow balance unavailable")
+                        logger.warning(f"Serving stale balance for {wallet}: {e!r}")
+                        deadlines.mark_stale("balance")
                 balance_sol = balance_lamports / 1e9
                 current_sol_price = await SolanaMonitor.get_current_sol_price()
                 balance_usd = balance_sol * current_sol_price
                 logger.debug(f"Successfully fetched Solana balance for {wallet}: {balance_sol} SOL, {balance_usd} USD")
                 return balance_sol, balance_usd
+            except HTTPException:
+                raise
             except Exception as e:
                 logger.error(f"Error fetching Solana balance for {wallet}: {e}", exc_info=True)
                 return 0, 0
         
         balance_sol, balance_usd = await get_balance()
         
-        # Get transaction count from database (async)
-        stmt = select(Campaign).where(Campaign.wallet_address == wallet)
-        result = await db.execute(stmt)
-        campaign = result.scalar_one_or_none()
+        # Transaction count over every campaign on the escrow (async)
+        campaigns = await _wallet_campaigns(db, wallet)
         
         transaction_count = 0
         recent_transactions = []
         
-        if campaign:
-            logger.debug(f"Campaign found for wallet {wallet}, fetching transactions.")
-            # Get all transactions
-            tx_stmt = select(Transaction).where(Transaction.campaign_id == campaign.campaign_id)
-            tx_result = await db.execute(tx_stmt)
-            transactions = tx_result.scalars().all()
-            transaction_count = len(transactions)
+        if campaigns:
+            logger.debug(f"{len(campaigns)} campaigns found for wallet {wallet}, fetching transactions.")
+            # Count transactions, hot and archived
+            txs = archive.all_transactions([c.campaign_id for c in campaigns])
+            transaction_count = (await db.execute(select(func.count()).select_from(txs))).scalar_one()
             
             # Get recent transactions
-            recent_stmt = select(Transaction).where(
-                Transaction.campaign_id == campaign.campaign_id
-            ).order_by(Transaction.timestamp.desc()).limit(5)
+            recent_stmt = select(txs).order_by(txs.c.timestamp.desc()).limit(5)
             recent_result = await db.execute(recent_stmt)
-            recent = recent_result.scalars().all()
+            recent = recent_result.all()
             
             for tx in recent:
                 recent_transactions.append({
                     "signature": tx.signature,
                     "amount": float(tx.amount),
                     "from": tx.from_wallet,
+                    "campaign_id": tx.campaign_id,
                     "timestamp": tx.timestamp
                 })
-            logger.debug(f"Retrieved {transaction_count} total transactions and {len(recent_transactions)} recent transactions for campaign {campaign.campaign_id}")
+            logger.debug(f"Retrieved {transaction_count} total transactions and {len(recent_transactions)} recent transactions for wallet {wallet}")
         else:
             logger.debug(f"No campaign found for wallet: {wallet}")
         
@@ -186,15 +301,18 @@ async def get_escrow_balance(wallet: str = Query(...), db: AsyncSession = Depend
             }
         }
         logger.info(f"Escrow balance and transaction data retrieved for wallet: {wallet}")
-        return response_data
+        return ORJSONResponse(response_data)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Unexpected error getting escrow balance for {wallet}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @routers.get('/campaigns/{campaign_id}/qr')
-async def get_campaign_qr(campaign_id: str, amount: Optional[float] = Query(None), db: AsyncSession = Depends(get_db)):
+async def get_campaign_qr(campaign_id: str, request: Request, amount: Optional[float] = Query(None),
+                          db: AsyncSession = Depends(get_read_db)):
     """Generate QR code for campaign"""
     logger.info(f"Attempting to generate QR code for campaign ID: {campaign_id} with amount: {amount}")
     try:
@@ -207,17 +325,30 @@ async def get_campaign_qr(campaign_id: str, amount: Optional[float] = Query(None
             logger.warning(f"Campaign not found for ID: {campaign_id}")
             raise HTTPException(status_code=404, detail="Campaign not found")
         
-        # Generate QR code (now async)
-        qr_code_data, solana_pay_uri = await QRCodeService.generate_qr_code(
-            campaign.wallet_address,
-            amount
-        )
+        # Campaigns created before references existed get one on first use (a write, so on the primary)
+        if not campaign.reference:
+            async with async_session() as primary:
+                campaign = await primary.get(Campaign, campaign.id)
+                if not campaign.reference:
+                    campaign.reference = new_reference()
+                    await primary.commit()
+        
+        # The QR code only depends on the payment fields, so clients revalidate without it being rebuilt
+        etag = http_cache.make_etag(campaign.wallet_address, campaign.reference, campaign.campaign_id, amount)
+        last_modified = http_cache.latest(campaign.updated_at or campaign.created_at)
+        cached = http_cache.not_modified(request, etag, last_modified, config.QR_CACHE_MAX_AGE)
+        if cached:
+            return cached
+        
+        # Reference and memo route the payment to this campaign; the amount-less code is pre-rendered
+        qr_code_data, solana_pay_uri = await QRCodeService.campaign_qr_code(campaign, amount)
         logger.info(f"QR code generated successfully for campaign ID: {campaign_id}")
-        return {
+        return ORJSONResponse({
             "qr_code": qr_code_data,
             "solana_pay_uri": solana_pay_uri,
-            "escrow_address": campaign.wallet_address
-        }
+            "escrow_address": campaign.wallet_address,
+            "reference": campaign.reference
+        }, headers=http_cache.cache_headers(etag, last_modified, config.QR_CACHE_MAX_AGE))
         
     except HTTPException as http_exc:
         logger.warning(f"HTTPException while generating QR code for campaign {campaign_id}: {http_exc.detail}")
@@ -227,6 +358,54 @@ async def get_campaign_qr(campaign_id: str, amount: Optional[float] = Query(None
         raise HTTPException(status_code=500, detail=str(e))
     
     
+EXPORT_COLUMNS = ("signature", "transfer_index", "mint", "amount", "amount_usd", "from_wallet", "to_wallet",
+                  "timestamp", "block_time", "processed_at")
+
+
+async def _export_chunks(campaign_id: str, fmt: str, rows_per_chunk: int = 500):
+    """Encode a campaign's transactions as CSV or JSON lines, a few hundred rows per chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(EXPORT_COLUMNS)
+    pending = 0
+    async for row in archive.stream_transactions(campaign_id):
+        values = [row[name] for name in EXPORT_COLUMNS]
+        if fmt == "csv":
+            writer.writerow(["" if v is None else v.isoformat() if isinstance(v, datetime) else v for v in values])
+        else:
+            # amounts as strings so no precision is lost
+            buffer.write(orjson.dumps(dict(zip(EXPORT_COLUMNS, values)), default=str).decode() + "\n")
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+@routers.get('/campaigns/{campaign_id}/transactions/export')
+async def export_campaign_transactions(
+    campaign_id: str,
+    format: str = Query("csv", pattern="^(csv|jsonl)$"),
+    db: AsyncSession = Depends(get_read_db)):
+    
+    """Stream every transaction of a campaign, including archived ones, as CSV or JSON lines"""
+    logger.info(f"Attempting to export transactions of campaign {campaign_id} as {format}")
+    exists = (await db.execute(select(Campaign.id).where(Campaign.campaign_id == campaign_id))).first()
+    if not exists:
+        logger.warning(f"Campaign not found for ID: {campaign_id}")
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_chunks(campaign_id, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{campaign_id}-transactions.{format}"'}
+    )
+
+
 @routers.get('/token/{contract_address}')
 async def get_token_info(contract_address: str, db: AsyncSession = Depends(get_db)):
     """Get token information"""
@@ -237,7 +416,7 @@ async def get_token_info(contract_address: str, db: AsyncSession = Depends(get_d
         result = await db.execute(stmt)
         cached_token = result.scalar_one_or_none()
         
-        if cached_token and (datetime.now(timezone.utc) - cached_token.last_updated).seconds < 300:
+        if cached_token and (datetime.now(timezone.utc) - cached_token.last_updated).seconds < TOKEN_CACHE_MAX_AGE:
             token_data = {
                 "contract_address": cached_token.contract_address,
                 "name": cached_token.name,
@@ -277,7 +456,7 @@ async def get_token_info(contract_address: str, db: AsyncSession = Depends(get_d
             
             await db.commit()
         
-        return {"status": "success", "data": token_data}
+        return ORJSONResponse({"status": "success", "data": token_data})
         
     except HTTPException as http_exc:
         logger.warning(f"HTTPException while getting token info for {contract_address}: {http_exc.detail}")
@@ -287,35 +466,57 @@ async def get_token_info(contract_address: str, db: AsyncSession = Depends(get_d
         raise HTTPException(status_code=500, detail=str(e))
     
     
+@routers.get('/profiles/{profile_id}', include_in_schema=False)
+async def get_profile(profile_id: str, request: Request, format: Literal['html', 'json'] = Query('html')):
+    """Download a request profile saved by ProfilingMiddleware (needs the X-Profile token)"""
+    token = request.headers.get(profiling.PROFILE_HEADER)
+    if not config.PROFILE_TOKEN or not token or not secrets.compare_digest(token, config.PROFILE_TOKEN):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    path = profiling.artifact_path(config.PROFILE_DIR, profile_id, format)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=f"profile-{profile_id}.{format}")
+
+
+@routers.post('/admin/warmup', status_code=202, include_in_schema=False)
+async def trigger_warmup(request: Request):
+    """Warm this process's caches in the background, e.g. ahead of a launch (needs X-Admin-Token)"""
+    token = request.headers.get("x-admin-token")
+    if not config.ADMIN_TOKEN or not token or not secrets.compare_digest(token, config.ADMIN_TOKEN):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {"status": "started" if warmup.start() else "running"}
+
+
 @routers.get('/health')
-async def health_check(db: AsyncSession = Depends(get_db)):
-    """Health check endpoint"""
-    logger.info("Performing health check.")
-    try:
-        # Test database connection (async)
-        await db.execute(select(1))
-        logger.debug("Database connection successful.")
-        
-        # Test Solana RPC (run in thread pool)
-        await asyncio.get_event_loop().run_in_executor(
-            None, solana_client.get_slot
-        )
-        logger.debug("Solana RPC connection successful.")
-        
-        # Get monitoring status (now async)
-        monitoring_status = await get_monitoring_status()
-        logger.debug(f"Monitoring status retrieved: {monitoring_status}")
-        
-        logger.info("Health check completed successfully.")
-        return {
-            "status": "healthy",
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "sol_price": monitoring_status.get("current_sol_price", 180.0),
-            "campaign_status": monitoring_status
-        }
-    except Exception as e:
-        logger.error(f"Health check failed: {e}", exc_info=True)
-        raise HTTPException(
-            status_code=503, 
-            detail={"status": "unhealthy", "error": str(e)}
-        )
+async def health_check():
+    """Health check endpoint: the last background dependency checks (src/probes.py), no I/O"""
+    monitor = probes.monitor
+    reason = monitor.not_ready()
+    failing = sorted(name for name, check in monitor.checks.items() if not check["ok"])
+    # a stale beat leader means periodic monitoring has stopped
+    if reason is not None:
+        status = "unhealthy"
+    elif failing or (monitor.scheduler and monitor.scheduler["stale"]):
+        status = "degraded"
+    else:
+        status = "healthy"
+    
+    body = {
+        "status": status,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "checked_at": monitor.checked_at.isoformat() if monitor.checked_at else None,
+        "checks": monitor.checks,
+        "sol_price": monitor.sol_price,
+        "campaign_status": {
+            "active_campaigns": monitor.campaigns.get("active", 0),
+            "campaigns_by_status": monitor.campaigns,
+            "current_sol_price": monitor.sol_price,
+            "monitoring_active": True
+        },
+        "scheduler": monitor.scheduler,
+        "warmup": {"running": warmup.running(), "last": warmup.last_result}
+    }
+    if reason is not None:
+        logger.error(f"Health check failed: {reason}")
+        raise HTTPException(status_code=503, detail={**body, "error": reason})
+    return ORJSONResponse(body)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 # Pydantic models for request/response
 class CampaignCreate(BaseModel):
@@ -20,7 +20,7 @@ class ErrorResponse(BaseModel):
 
 class CampaignData(BaseModel):
     id: str
-    name: str
+    name: Optional[str] = None  # None while the campaign is pending
     symbol: Optional[str] = None
     contract_address: str
     image_url: Optional[str] = None
@@ -47,5 +47,43 @@ class CampaignResponse(BaseModel):
     success: bool
     campaign_id: Optional[str] = None
     escrow_address: Optional[str] = None
+    status: Optional[str] = None
     error: Optional[str] = None
     campaign: Optional[CampaignData] = None
+
+
+class CampaignStatusResponse(BaseModel):
+    campaign_id: str
+    status: str
+    error: Optional[str] = None
+
+
+class CampaignBulkRequest(BaseModel):
+    contract_addresses: List[str]
+
+
+class CampaignBulkResponse(BaseModel):
+    success: bool
+    campaigns: List[CampaignData] = []
+    not_found: List[str] = []
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    campaign_id: str
+    name: Optional[str] = None
+    symbol: Optional[str] = None
+    contract_address: Optional[str] = None
+    image_url: Optional[str] = None
+    goal_amount: float
+    raised_usd: float
+    percent_goal: float
+    velocity_usd: float
+    score: float
+
+
+class LeaderboardResponse(BaseModel):
+    success: bool
+    sort: str
+    campaigns: List[LeaderboardEntry] = []
+    next_cursor: Optional[str] = None
@@ -0,0 +1,120 @@
+"""Production entry point: the API under gunicorn with uvicorn workers.
+
+    python -m src.serve [--workers N] [--bind 0.0.0.0:8000]
+
+Starts SERVE_WORKERS worker processes (one per CPU by default) that share one
+listening socket. Each worker runs uvicorn on uvloop with the httptools
+parser. The master process:
+
+    on_starting  creates/upgrades the schema and the sample campaign once,
+                 instead of every worker racing to do it in its lifespan
+    post_fork    drops DB and Redis connections inherited from the master,
+                 so each worker opens its own pools on its own event loop
+    child_exit   marks the worker's Prometheus samples dead
+
+On SIGTERM the workers stop accepting connections and get
+SERVE_GRACEFUL_TIMEOUT seconds to finish in-flight requests before the master
+kills them.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+
+# every worker writes its metrics here so /metrics sums all of them; must be
+# set before src.metrics is imported
+if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+from src.config import config
+
+
+class Worker(UvicornWorker):
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # finish in-flight requests, leaving time for lifespan shutdown
+        # before the master's SIGKILL at graceful_timeout
+        self.config.timeout_graceful_shutdown = max(self.cfg.graceful_timeout - 5, 1)
+
+
+# ----------------------------------------------------------------------------
+# Server hooks
+# ----------------------------------------------------------------------------
+
+def on_starting(server):
+    from src.config import engine
+    from src.main import prepare_database
+
+    async def _prepare():
+        await prepare_database()
+        # close the master's connections before any worker is forked
+        await engine.dispose()
+
+    asyncio.run(_prepare())
+    server.app.application.state.database_ready = True
+
+
+def post_fork(server, worker):
+    from src import services
+    from src.config import engine, read_engine, sync_engine, redis_client, sync_redis_client
+
+    # close=False: the sockets belong to the master's pool, leave them alone
+    for pooled in {engine.sync_engine, read_engine.sync_engine, sync_engine}:
+        pooled.dispose(close=False)
+    sync_redis_client.connection_pool.reset()
+    if redis_client is not None:
+        redis_client.connection_pool.reset()
+    services._http_sessions.clear()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+class Server(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        self.application = None
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        if self.application is None:
+            from src.main import app
+            self.application = app
+        return self.application
+
+
+def main():
+    parser = argparse.ArgumentParser(description="run the API with gunicorn + uvicorn workers")
+    parser.add_argument("--workers", type=int, default=config.SERVE_WORKERS or multiprocessing.cpu_count())
+    parser.add_argument("--bind", default="0.0.0.0:8000")
+    args = parser.parse_args()
+
+    Server({
+        "bind": args.bind,
+        "workers": args.workers,
+        "worker_class": "src.serve.Worker",
+        "backlog": config.SERVE_BACKLOG,
+        "keepalive": config.SERVE_KEEPALIVE,
+        "graceful_timeout": config.SERVE_GRACEFUL_TIMEOUT,
+        # import the app once in the master; workers share its memory copy-on-write
+        "preload_app": True,
+        "on_starting": on_starting,
+        "post_fork": post_fork,
+        "child_exit": child_exit,
+    }).run()
+
+
+if __name__ == "__main__":
+    main()
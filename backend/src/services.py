@@ -2,26 +2,39 @@ import aiohttp
 import asyncio
 from fastapi import HTTPException
 import requests
+import redis
 import qrcode
 import io
 import base64
+import json
 import time
+import threading
+import weakref
+from functools import partial
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import datetime, timezone
-from typing import Dict, Optional, List
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, List, Tuple
 from decimal import Decimal
 import sqlalchemy as sa
 from solders.pubkey import Pubkey
 from celery import Celery
 from celery.schedules import crontab
 import uuid
-from src.schema import CampaignCreate, CampaignResponse, ErrorResponse, CampaignData
-from src.config import solana_client, get_db_session_sync, config, async_session
+from urllib.parse import urlencode
+from solders.keypair import Keypair
+from src.schema import CampaignCreate, CampaignResponse, ErrorResponse, CampaignData, CampaignBulkResponse, CampaignStatusResponse
+from src.config import solana_client, get_db_session_sync, config, async_session, redis_client
 from src.models import Transaction, Campaign
 from src.logger import setup_logger
+from src.metrics import observe_upstream, record_ingest, instrument_celery
+from src import leaderboard, price_series, balances, archive, ingest_sink, leases, market_data, profiling, deadlines
 
 logger = setup_logger("service", "service.log")
 
+# campaign_id for transfers into a shared escrow that carry no campaign reference or memo
+UNATTRIBUTED_CAMPAIGN = "unattributed"
+
 # Create a Celery app instance with the name "solana_monitor"
 celery_app = Celery('solana_monitor')
 
@@ -43,11 +56,61 @@ celery_app.conf.beat_schedule = {
         'task': 'src.services.check_all_monitored_wallets',
         'schedule': 15.0,                         # Run every 15 seconds
     },
+    # Task 3: Refresh cached escrow balances (getMultipleAccounts, 100 wallets per call)
+    'refresh-escrow-balances': {
+        'task': 'src.services.refresh_escrow_balances',
+        'schedule': 10.0,                         # Run every 10 seconds
+    },
+    # Task 4: Fill holes in the minute SOL price series and value transactions saved without a price
+    'backfill-sol-prices': {
+        'task': 'src.services.backfill_sol_prices',
+        'schedule': 600.0,                        # Run every 10 minutes
+    },
+    # Task 5: Merge hourly contribution buckets into the leaderboard velocity ranking
+    'refresh-leaderboard-velocity': {
+        'task': 'src.services.refresh_leaderboard_velocity',
+        'schedule': 60.0,                         # Run every 1 minute
+    },
+    # Task 6: Recompute the leaderboard from the database (drops expired campaigns, repairs drift)
+    'rebuild-leaderboard': {
+        'task': 'src.services.rebuild_leaderboard',
+        'schedule': 900.0,                        # Run every 15 minutes
+    },
+    # Task 7: Move transactions of campaigns expired past the retention window to the archive
+    'archive-expired-transactions': {
+        'task': 'src.services.archive_expired_transactions',
+        'schedule': 3600.0,                       # Run every hour
+    },
+    # Task 8: Re-enqueue enrichment of campaigns stuck in 'pending'
+    'retry-pending-campaigns': {
+        'task': 'src.services.retry_pending_campaigns',
+        'schedule': 300.0,                        # Run every 5 minutes
+    },
+    # Task 9: Refresh liquidity / market cap / price / volume of active campaigns (30 tokens per DexScreener call)
+    'refresh-market-data': {
+        'task': 'src.services.refresh_market_data',
+        'schedule': 60.0,                         # Run every 1 minute
+    },
 }
 
 # Ensure all scheduling uses UTC
 celery_app.conf.timezone = 'UTC'
 
+# Task duration/throughput metrics and worker metric export
+instrument_celery(celery_app, pushgateway_url=config.PROMETHEUS_PUSHGATEWAY_URL)
+# Profiles of a sample of task runs (src/profiling.py)
+profiling.instrument_celery(config.PROFILE_TASK_SAMPLE_RATE, config.PROFILE_DIR,
+                            repeat_threshold=config.PROFILE_REPEAT_THRESHOLD, max_profiles=config.PROFILE_MAX_FILES)
+
+
+
+# Campaign statuses that hold a token's single live campaign (uq_campaigns_live_contract)
+LIVE_STATUSES = ('pending', 'active')
+
+
+def new_reference() -> str:
+    """Random public key used as a campaign's Solana Pay reference"""
+    return str(Keypair().pubkey())
 
 
 class CampaignService():
@@ -55,18 +118,21 @@ class CampaignService():
         self.db = db
     
     
-    async def check_if_campaign_exist(self, campaign_id):
+    async def check_if_campaign_exist(self, contract_address):
+        """The live (pending or active) campaign of a token, if any"""
         campaign = await self.db.execute(
             sa.select(Campaign).where(
                 sa.and_(
-                campaign_id == Campaign.campaign_id,
-                Campaign.status == 'active'
+                Campaign.contract_address == contract_address,
+                Campaign.status.in_(LIVE_STATUSES)
                 )
             )
         )
         return campaign.scalar_one_or_none()
     
     async def create(self, campaign_data: CampaignCreate):
+        """Insert the campaign as 'pending' and leave token metadata, the QR code and
+        monitoring to the enrich_campaign task, so creation never waits on DexScreener"""
         try:
             # Generate campaign ID
             campaign_id = f"cmp_{uuid.uuid4().hex[:8]}"
@@ -74,45 +140,52 @@ class CampaignService():
             # Generate escrow wallet (in production, use a secure key generation method)
             wallet_address = Pubkey.from_string(config.WALLET)  # Mock escrow
             
-            # Fetch token metadata (now async)
-            token_metadata = await TokenService.fetch_token_metadata(campaign_data.contract_address)
-            if not token_metadata:
-                raise HTTPException(status_code=400, detail="Unable to fetch token metadata")
-            
-            campaign_exist = await self.check_if_campaign_exist(campaign_id=campaign_id)
-            if campaign_exist:
-                raise HTTPException(status_code=400, detail=f"token {campaign_exist.name} already exists and is active")
+            # An expired campaign no longer blocks a new one for the same token
+            await self.db.execute(
+                sa.update(Campaign)
+                .where(
+                    Campaign.contract_address == campaign_data.contract_address,
+                    Campaign.status.in_(LIVE_STATUSES),
+                    Campaign.expires_at < datetime.now(timezone.utc),
+                )
+                .values(status='expired', is_active=False)
+            )
             # Create campaign
             campaign = Campaign(
                 campaign_id=campaign_id,
-                name=token_metadata['name'],
-                symbol=token_metadata['symbol'],
                 contract_address=campaign_data.contract_address,
-                image_url=token_metadata['image_url'],
                 wallet_address=str(wallet_address),
+                reference=new_reference(),
+                status='pending',
                 goal_amount=Decimal(str(campaign_data.goal_amount)),
                 campaign_type = campaign_data.campaign_type,
                 expires_at=datetime.fromisoformat(campaign_data.expires_at.replace('Z', '+00:00')), 
-                social_twitter=token_metadata["twitter_url"],
-                social_website=token_metadata["website_url"],
+                social_twitter=campaign_data.social_twitter,
+                social_website=campaign_data.social_website,
                 description=campaign_data.description,
-                liquidity=str(token_metadata.get('liquidity', 0)),
-                market_cap=str(token_metadata.get('market_cap', 0)),
-                price_usd=str(token_metadata.get('price_usd', 0)),
-                volume_24h=str(token_metadata.get('volume_24h', 0))
             )
             
             self.db.add(campaign)
-            await self.db.commit()
-            await self.db.refresh(campaign)
+            try:
+                await self.db.commit()
+            except sa.exc.IntegrityError:
+                # uq_campaigns_live_contract: the token already has a live campaign
+                await self.db.rollback()
+                campaign_exist = await self.check_if_campaign_exist(campaign_data.contract_address)
+                name = campaign_exist.name or campaign_exist.contract_address if campaign_exist else campaign_data.contract_address
+                raise HTTPException(status_code=400, detail=f"token {name} already exists and is active")
             
-            # Start monitoring this wallet (now async)
-            await start_monitoring_campaign(campaign_id, str(wallet_address))
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, partial(enrich_campaign.delay, campaign_id))
+            except Exception as e:
+                # picked up by the retry-pending-campaigns beat task
+                logger.error(f"Could not enqueue enrichment of campaign {campaign_id}: {e}")
             
             return CampaignResponse(
                 success=True,
                 campaign_id=campaign_id,
-                escrow_address=str(wallet_address)
+                escrow_address=str(wallet_address),
+                status=campaign.status
             )
             
         except HTTPException:
@@ -120,60 +193,97 @@ class CampaignService():
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
     
+    async def get_status(self, campaign_id: str) -> Optional[CampaignStatusResponse]:
+        campaign = (await self.db.execute(
+            sa.select(Campaign.campaign_id, Campaign.status, Campaign.error).where(Campaign.campaign_id == campaign_id)
+        )).one_or_none()
+        if campaign is None:
+            return None
+        return CampaignStatusResponse(campaign_id=campaign.campaign_id, status=campaign.status, error=campaign.error)
+    
+
+    @staticmethod
+    def _campaign_summary_query(*criteria):
+        """Live campaigns matching ``criteria`` joined with their aggregated SOL total,
+        contributor count and the time their last transaction was saved (one round trip).
+
+        The aggregate only reads the matching campaigns' rows, hot and archived.
+        """
+        live = (Campaign.is_active == True, Campaign.status.in_(LIVE_STATUSES))
+        campaign_ids = sa.select(Campaign.campaign_id).where(*live, *criteria)
+        txs = archive.all_transactions(campaign_ids)
+        totals = (
+            sa.select(
+                txs.c.campaign_id,
+                sa.func.coalesce(
+                    sa.func.sum(sa.case((txs.c.mint.is_(None), txs.c.amount), else_=0)), 0
+                ).label("balance_sol"),
+                sa.func.count(sa.distinct(txs.c.from_wallet)).label("contributor_count"),
+                sa.func.max(txs.c.processed_at).label("last_transaction_at"),
+            )
+            .group_by(txs.c.campaign_id)
+            .subquery()
+        )
+        return (
+            sa.select(
+                Campaign,
+                sa.func.coalesce(totals.c.balance_sol, 0),
+                sa.func.coalesce(totals.c.contributor_count, 0),
+                totals.c.last_transaction_at,
+            )
+            .outerjoin(totals, totals.c.campaign_id == Campaign.campaign_id)
+            .where(*live, *criteria)
+        )
+
+    @staticmethod
+    def _campaign_data(campaign: Campaign, balance_sol, contributor_count: int, sol_price: float) -> dict:
+        return {
+            "id": campaign.id,
+            "name": campaign.name,
+            "symbol": campaign.symbol,
+            "contract_address": campaign.contract_address,
+            "image_url": campaign.image_url,
+            "wallet_address": campaign.wallet_address,
+            "goal_amount": float(campaign.goal_amount),
+            "status": campaign.status,
+            "created_at": campaign.created_at.replace(tzinfo=timezone.utc),
+            "expires_at": campaign.expires_at.replace(tzinfo=timezone.utc),
+            "campaign_type": campaign.campaign_type,
+            "social_twitter": campaign.social_twitter,
+            "social_website": campaign.social_website,
+            "description": campaign.description,
+            "current_balance": float(balance_sol) * sol_price,
+            "contributor_count": int(contributor_count),
+            "token_launchpad": campaign.token_launchpad,
+            "token_source": campaign.token_source,
+            "liquidity": market_data.as_str(campaign.liquidity),
+            "market_cap": market_data.as_str(campaign.market_cap),
+            "price_usd": market_data.as_str(campaign.price_usd),
+            "volume_24h": market_data.as_str(campaign.volume_24h)
+        }
+
+    async def get_campaign_summary(self, contract_address):
+        """(campaign, balance_sol, contributor_count, last_transaction_at) for a contract address"""
+        # uq_campaigns_live_contract allows one live campaign per token; newest first regardless
+        stmt = self._campaign_summary_query(Campaign.contract_address == contract_address).order_by(
+            Campaign.created_at.desc()
+        )
+        result = await self.db.execute(stmt)
+        row = result.first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Campaign not found")
+        return row
 
-    async def get_campaign_details(self, contract_address):
+    async def get_campaign_details(self, contract_address, summary=None, current_sol_price=None):
         """Get campaign details by contract address"""
         try:
-            # Use async query
-            stmt = sa.select(Campaign).where(
-                Campaign.contract_address == contract_address,
-                Campaign.is_active == True
-            )
-            result = await self.db.execute(stmt)
-            campaign = result.scalar_one_or_none()
-            
-            if not campaign:
-                raise HTTPException(status_code=404, detail="Campaign not found")
-            
-            # Calculate current balance from transactions (async)
-            tx_stmt = sa.select(Transaction).where(Transaction.campaign_id == campaign.campaign_id)
-            tx_result = await self.db.execute(tx_stmt)
-            transactions = tx_result.scalars().all()
-            
-            current_balance_sol = sum(float(tx.amount) for tx in transactions)
-            current_sol_price = await SolanaMonitor.get_current_sol_price()
-            current_balance_usd = current_balance_sol * current_sol_price
-            
-            contributor_count = len(set(tx.from_wallet for tx in transactions))
-            
-            campaign_data = {
-                "id": campaign.id,
-                "name": campaign.name,
-                "symbol": campaign.symbol,
-                "contract_address": campaign.contract_address,
-                "image_url": campaign.image_url,
-                "wallet_address": campaign.wallet_address,
-                "goal_amount": float(campaign.goal_amount),
-                "status": campaign.status,
-                "created_at": campaign.created_at.replace(tzinfo=timezone.utc),
-                "expires_at": campaign.expires_at.replace(tzinfo=timezone.utc),
-                "campaign_type": campaign.campaign_type,
-                "social_twitter": campaign.social_twitter,
-                "social_website": campaign.social_website,
-                "description": campaign.description,
-                "current_balance": current_balance_usd,
-                "contributor_count": contributor_count,
-                "token_launchpad": campaign.token_launchpad,
-                "token_source": campaign.token_source,
-                "liquidity": campaign.liquidity or "0",
-                "market_cap": campaign.market_cap or "0",
-                "price_usd": campaign.price_usd or "0",
-                "volume_24h": campaign.volume_24h or "0"
-            }
+            campaign, balance_sol, contributor_count, _ = summary or await self.get_campaign_summary(contract_address)
+            if current_sol_price is None:
+                current_sol_price = await SolanaMonitor.get_current_sol_price()
             
             return CampaignResponse(
                 success=True,
-                campaign = campaign_data
+                campaign = self._campaign_data(campaign, balance_sol, contributor_count, current_sol_price)
             )
             # return {"success": True, "campaign": campaign_data}
             
@@ -182,22 +292,88 @@ class CampaignService():
         except Exception as e:
             logger.error(f"error: {e}", exc_info=True)
             raise HTTPException(status_code=500, detail=str(e))
+
+    async def get_campaigns_bulk(self, contract_addresses: List[str], sort: Optional[str] = None) -> CampaignBulkResponse:
+        """Get summaries for many contract addresses with one query and one SOL price lookup.
+
+        Campaigns come back in the order of ``contract_addresses``, or by ``sort``
+        (a market data column, highest first) when given.
+        """
+        addresses = list(dict.fromkeys(a.strip() for a in contract_addresses if a and a.strip()))
+        if not addresses:
+            raise HTTPException(status_code=400, detail="contract_addresses is required")
+        if len(addresses) > config.BULK_CAMPAIGN_LIMIT:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {config.BULK_CAMPAIGN_LIMIT} contract addresses per request"
+            )
+        try:
+            stmt = self._campaign_summary_query(Campaign.contract_address.in_(addresses))
+            if sort:
+                stmt = stmt.order_by(getattr(Campaign, sort).desc().nulls_last(), Campaign.contract_address)
+            # by_address keeps the first row of each token: the newest
+            stmt = stmt.order_by(Campaign.created_at.desc())
+            result = await self.db.execute(stmt)
+            rows = result.all()
+
+            current_sol_price = await SolanaMonitor.get_current_sol_price() if rows else 0.0
+            by_address = {}
+            for campaign, balance_sol, contributor_count, _ in rows:
+                by_address.setdefault(
+                    campaign.contract_address,
+                    self._campaign_data(campaign, balance_sol, contributor_count, current_sol_price)
+                )
+
+            return CampaignBulkResponse(
+                success=True,
+                campaigns=list(by_address.values()) if sort else [by_address[a] for a in addresses if a in by_address],
+                not_found=[a for a in addresses if a not in by_address]
+            )
+        except Exception as e:
+            logger.error(f"error: {e}", exc_info=True)
+            raise HTTPException(status_code=500, detail=str(e))
     
     
     
+# One aiohttp session (and keep-alive connection pool) per event loop, shared by
+# all upstream calls of a process instead of a new session per request.
+_http_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+
+def http_session() -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    session = _http_sessions.get(loop)
+    if session is None or session.closed:
+        session = _http_sessions[loop] = aiohttp.ClientSession()
+    return session
+
+
+async def close_http_session():
+    """Close the current event loop's shared session (on app shutdown)"""
+    session = _http_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
 class TokenService:
+    @staticmethod
+    async def fetch_sol_price() -> float:
+        """Get SOL price from CoinGecko, raising on failure (asynchronous)"""
+        timeout = deadlines.upstream_timeout(10)
+        with observe_upstream("coingecko", "simple_price"):
+            async with http_session().get(
+                f"{config.COINGECKO_API_URL}/simple/price?ids=solana&vs_currencies=usd",
+                timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                response.raise_for_status()
+                data = await response.json()
+                return float(data["solana"]["usd"])
+
     @staticmethod
     async def get_sol_price() -> float:
         """Get SOL price from CoinGecko (asynchronous)"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    "https://api.coingecko.com/api/v3/simple/price?ids=solana&vs_currencies=usd",
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    response.raise_for_status()
-                    data = await response.json()
-                    return float(data["solana"]["usd"])
+            return await TokenService.fetch_sol_price()
         except Exception as e:
             logger.error(f"Error getting SOL price from CoinGecko: {e}")
             return 180.0  # Fallback price
@@ -206,44 +382,45 @@ class TokenService:
     async def fetch_token_metadata(contract_address: str) -> Dict:
         """Fetch token metadata from DexScreener API (asynchronous)"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"https://api.dexscreener.com/latest/dex/tokens/{contract_address}",
-                    timeout=aiohttp.ClientTimeout(total=10)
+            timeout = deadlines.upstream_timeout(10)
+            with observe_upstream("dexscreener", "tokens"):
+                async with http_session().get(
+                    f"{config.DEXSCREENER_API_URL}/latest/dex/tokens/{contract_address}",
+                    timeout=aiohttp.ClientTimeout(total=timeout)
                 ) as response:
                     response.raise_for_status()
                     data = await response.json()
-                    
-                    if data.get('pairs') and len(data['pairs']) > 0:
-                        pair = data['pairs'][0]
-                        info = pair.get('info', {})
-                        websites = info.get('websites', [])
-                        socials = info.get('socials', [])
-
-                        # Extract socials safely
-                        twitter_url = next((s['url'] for s in socials if s.get('type') == 'twitter'), None)
-                        telegram_url = next((s['url'] for s in socials if s.get('type') == 'telegram'), None)
-                        website_url = websites[0]['url'] if websites else None
-                        image_url = info.get('imageUrl')
-
-                        return {
-                            "contract_address": contract_address,
-                            "name": pair['baseToken'].get('name'),
-                            "symbol": pair['baseToken'].get('symbol'),
-                            "decimals": 9,
-                            "price_usd": float(pair.get('priceUsd', 0)),
-                            "liquidity": pair.get('liquidity', {}).get('usd', 0),
-                            "volume_24h": pair.get('volume', {}).get('h24', 0),
-                            "market_cap": pair.get('marketCap', 0),
-                            "image_url": image_url,
-                            "website_url": website_url,
-                            "twitter_url": twitter_url,
-                            "telegram_url": telegram_url,
-                            "last_updated": datetime.now(timezone.utc).isoformat()
-                        }
-                        
-                    logger.warning(f"DexScreener did not return pairs for {contract_address}. Falling back to Solana RPC.")
-                    return await TokenService._fetch_from_solana(contract_address)
+
+            if data.get('pairs') and len(data['pairs']) > 0:
+                pair = data['pairs'][0]
+                info = pair.get('info', {})
+                websites = info.get('websites', [])
+                socials = info.get('socials', [])
+
+                # Extract socials safely
+                twitter_url = next((s['url'] for s in socials if s.get('type') == 'twitter'), None)
+                telegram_url = next((s['url'] for s in socials if s.get('type') == 'telegram'), None)
+                website_url = websites[0]['url'] if websites else None
+                image_url = info.get('imageUrl')
+
+                return {
+                    "contract_address": contract_address,
+                    "name": pair['baseToken'].get('name'),
+                    "symbol": pair['baseToken'].get('symbol'),
+                    "decimals": 9,
+                    "price_usd": float(pair.get('priceUsd', 0)),
+                    "liquidity": pair.get('liquidity', {}).get('usd', 0),
+                    "volume_24h": pair.get('volume', {}).get('h24', 0),
+                    "market_cap": pair.get('marketCap', 0),
+                    "image_url": image_url,
+                    "website_url": website_url,
+                    "twitter_url": twitter_url,
+                    "telegram_url": telegram_url,
+                    "last_updated": datetime.now(timezone.utc).isoformat()
+                }
+                
+            logger.warning(f"DexScreener did not return pairs for {contract_address}. Falling back to Solana RPC.")
+            return await TokenService._fetch_from_solana(contract_address)
                     
         except Exception as e:
             logger.error(f"Error fetching token metadata for {contract_address} from DexScreener: {e}")
@@ -254,10 +431,12 @@ class TokenService:
         """Fallback method to fetch basic token info from Solana (asynchronous)"""
         try:
             pubkey = Pubkey.from_string(contract_address)
+            timeout = deadlines.upstream_timeout(None)
             # Run the blocking Solana client call in a thread pool
-            account_info = await asyncio.get_event_loop().run_in_executor(
-                None, solana_client.get_account_info, pubkey
-            )
+            with observe_upstream("solana_rpc", "getAccountInfo"):
+                account_info = await asyncio.wait_for(asyncio.get_event_loop().run_in_executor(
+                    None, solana_client.get_account_info, pubkey
+                ), timeout)
             
             if account_info.value:
                 logger.info(f"Fetched basic token metadata for {contract_address} from Solana RPC.")
@@ -280,16 +459,31 @@ class TokenService:
         
         return None
 
+QR_CACHE_PREFIX = "qr"
+QR_CACHE_TTL = 7 * 24 * 3600  # the key includes the reference, so a cached code never goes stale
+TOKEN_CACHE_MAX_AGE = 300  # seconds a token_cache row is served by /api/token before it is refetched
+
+
 class QRCodeService:
     @staticmethod
-    async def generate_qr_code(wallet_address: str, amount: float = None) -> str:
-        """Generate QR code for Solana Pay (asynchronous)"""
+    async def generate_qr_code(wallet_address: str, amount: float = None,
+                               reference: str = None, memo: str = None) -> str:
+        """Generate QR code for Solana Pay (asynchronous)
+
+        ``reference`` and ``memo`` identify the campaign when several share the escrow.
+        """
         def _generate_qr():
             # Solana Pay URI format
+            params = {}
             if amount:
-                uri = f"solana:{wallet_address}?amount={amount}"
-            else:
-                uri = f"solana:{wallet_address}"
+                params["amount"] = amount
+            if reference:
+                params["reference"] = reference
+            if memo:
+                params["memo"] = memo
+            uri = f"solana:{wallet_address}"
+            if params:
+                uri += "?" + urlencode(params)
             
             # Generate QR code
             qr = qrcode.QRCode(version=1, box_size=10, border=5)
@@ -310,6 +504,35 @@ class QRCodeService:
         # Run QR code generation in thread pool to avoid blocking
         return await asyncio.get_event_loop().run_in_executor(None, _generate_qr)
 
+    @staticmethod
+    async def campaign_qr_code(campaign: Campaign, amount: float = None) -> Tuple[str, str]:
+        """QR code and Solana Pay URI of a campaign.
+
+        The amount-less code is kept in Redis: it is pre-rendered when the
+        campaign is activated and then served without rendering.
+        """
+        def _render():
+            return QRCodeService.generate_qr_code(
+                campaign.wallet_address, amount, reference=campaign.reference, memo=campaign.campaign_id
+            )
+        if amount:
+            return await _render()
+        
+        key = f"{QR_CACHE_PREFIX}:{campaign.campaign_id}:{campaign.reference}"
+        try:
+            cached = await redis_client.get(key)
+            if cached:
+                return tuple(json.loads(cached))
+        except Exception as e:
+            logger.warning(f"Could not read cached QR code of campaign {campaign.campaign_id}: {e}")
+        
+        qr_code_data, solana_pay_uri = await _render()
+        try:
+            await redis_client.set(key, json.dumps([qr_code_data, solana_pay_uri]), ex=QR_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Could not cache QR code of campaign {campaign.campaign_id}: {e}")
+        return qr_code_data, solana_pay_uri
+
 class SolanaMonitor:
     def __init__(self):
         self.sol_price = 180.0
@@ -351,13 +574,23 @@ class SolanaMonitor:
     async def get_current_sol_price() -> float:
         """Get current SOL price from database or default (asynchronous)"""
         try:
-            # You might store this in a settings table or cache
-            # For now, we'll use a simple approach
-            price = await TokenService.get_sol_price()
+            # Latest sample appended by update_sol_price; CoinGecko only if it is stale
+            price = await price_series.latest_price()
+            if price is None:
+                price = await TokenService.fetch_sol_price()
             return price
         except Exception as e:
             logger.error(f"Error getting current SOL price: {e}")
+        try:
+            # CoinGecko failed or did not fit the request deadline: serve the last known price
+            price = await price_series.latest_price(max_age=None)
+        except Exception as e:
+            logger.error(f"Error getting last known SOL price: {e}")
+            price = None
+        if price is None:
             return 180.0
+        deadlines.mark_stale("sol_price")
+        return price
     
     async def set_current_sol_price(self, price: float):
         """Cache current SOL price (asynchronous)"""
@@ -367,6 +600,21 @@ class SolanaMonitor:
 # CELERY TASKS
 # =============================================================================
 
+_loop_local = threading.local()
+
+def run_async(coro):
+    """Run a coroutine to completion on this thread's persistent event loop.
+
+    asyncio.run() closes its loop after every task, which strands pooled async
+    DB connections that are bound to it; reusing one loop per worker thread
+    keeps the connection pool usable across tasks.
+    """
+    loop = getattr(_loop_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _loop_local.loop = loop
+    return loop.run_until_complete(coro)
+
 
 """sumary_line
 
@@ -390,12 +638,14 @@ def update_sol_price(self):
     """
     async def _update_price():
         try:
-            new_price = await TokenService.get_sol_price()
+            new_price = await TokenService.fetch_sol_price()
             old_price = await SolanaMonitor.get_current_sol_price()
             
             if abs(new_price - old_price) > 0.01:  # Only log significant changes
                 logger.info(f"Updated SOL price: ${old_price:.2f} → ${new_price:.2f}")
             
+            # Append to the minute price series used to value contributions
+            price_series.record(int(time.time()), new_price)
             monitor = SolanaMonitor()
             await monitor.set_current_sol_price(new_price)
             return {"success": True, "price": new_price}
@@ -406,7 +656,7 @@ def update_sol_price(self):
             raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
     
     # Run the async function
-    return asyncio.run(_update_price())
+    return run_async(_update_price())
 
 
 @celery_app.task(bind=True, max_retries=3)
@@ -420,170 +670,552 @@ def check_all_monitored_wallets(self):
                 logger.debug("No active campaigns to monitor")
                 return {"success": True, "campaigns_checked": 0}
             
-            results = []
+            # Campaigns share escrow wallets: scan each wallet once and let
+            # scan_wallet route transfers to campaigns by reference/memo
+            campaigns_by_wallet: Dict[str, List[str]] = {}
             for campaign in active_campaigns:
+                campaigns_by_wallet.setdefault(campaign['wallet_address'], []).append(campaign['campaign_id'])
+            
+            # A wallet with a single campaign credits it by default
+            wallets = [
+                [wallet_address, campaign_ids[0] if len(campaign_ids) == 1 else None]
+                for wallet_address, campaign_ids in campaigns_by_wallet.items()
+            ]
+            
+            # Schedule one task per INGEST_SCAN_BATCH wallets; each scans its wallets
+            # concurrently so their new transfers share ingest sink flushes
+            results = []
+            for i in range(0, len(wallets), config.INGEST_SCAN_BATCH):
+                batch = wallets[i:i + config.INGEST_SCAN_BATCH]
                 try:
-                    # Schedule individual wallet check task
-                    result = check_wallet_transactions.delay(
-                        campaign['wallet_address'], 
-                        campaign['campaign_id']
-                    )
-                    results.append({
-                        'campaign_id': campaign['campaign_id'], 
-                        'task_id': result.id
-                    })
+                    check_wallet_batch.delay(batch)
+                    results.append(len(batch))
                 except Exception as e:
-                    logger.error(f"Error scheduling wallet check for campaign {campaign['campaign_id']}: {e}")
+                    logger.error(f"Error scheduling wallet checks for {len(batch)} wallets: {e}")
             
-            logger.debug(f"Scheduled wallet checks for {len(results)} campaigns")
-            return {"success": True, "campaigns_checked": len(results), "tasks": results}
+            wallets_checked = sum(results)
+            logger.debug(f"Scheduled wallet checks for {wallets_checked} wallets ({len(active_campaigns)} campaigns) in {len(results)} tasks")
+            return {"success": True, "campaigns_checked": len(active_campaigns), "wallets_checked": wallets_checked, "tasks": len(results)}
             
         except Exception as e:
             logger.error(f"Error in check_all_monitored_wallets: {e}")
             raise self.retry(exc=e, countdown=30 * (2 ** self.request.retries))
     
     # Run the async function
-    return asyncio.run(_check_wallets())
+    return run_async(_check_wallets())
 
 @celery_app.task(bind=True, max_retries=3)
-def check_wallet_transactions(self, wallet_address: str, campaign_id: str):
+def check_wallet_transactions(self, wallet_address: str, campaign_id: Optional[str] = None):
     """Celery task to check transactions for a specific wallet"""
-    async def _check_transactions():
-        try:
-            logger.debug(f"Checking wallet {wallet_address} for campaign {campaign_id}")
-            
-            pubkey = Pubkey.from_string(wallet_address)
-            # Run blocking Solana client calls in thread pool
-            signatures = await asyncio.get_event_loop().run_in_executor(
-                None, solana_client.get_signatures_for_address, pubkey, 5
-            )
-            
-            if not signatures.value:
-                return {"success": True, "new_transactions": 0}
-            
-            async def _db_operations():
-                async with async_session() as db:
-                    new_transactions = []
-                    
-                    try:
-                        for sig_info in signatures.value:
-                            sig_str = str(sig_info.signature)
-                            
-                            # Check if we already processed this transaction
-                            stmt = sa.select(Transaction).where(Transaction.signature == sig_str)
-                            existing = await db.execute(stmt).scalar_one_or_none()
-                            
-                            if existing:
-                                logger.debug(f"Transaction {sig_str} already processed.")
-                                continue
-                            
-                            # Get transaction details
-                            tx_detail = solana_client.get_transaction(
-                                sig_info.signature,
-                                encoding="jsonParsed",
-                                max_supported_transaction_version=0
-                            )
-                            
-                            if tx_detail.value and tx_detail.value.transaction:
-                                transaction_data = tx_detail.value.transaction
-                                
-                                if transaction_data.meta and not transaction_data.meta.err:
-                                    tx_info = parse_transaction(transaction_data, wallet_address)
-                                    if tx_info:
-                                        # Get SOL price synchronously in thread
-                                        try:
-                                            response = requests.get(
-                                                "https://api.coingecko.com/api/v3/simple/price?ids=solana&vs_currencies=usd",
-                                                timeout=10
-                                            )
-                                            response.raise_for_status()
-                                            data = response.json()
-                                            sol_price = float(data["solana"]["usd"])
-                                        except:
-                                            sol_price = 180.0
-                                        
-                                        transaction = Transaction(
-                                            campaign_id=campaign_id,
-                                            signature=sig_str,
-                                            amount=Decimal(str(tx_info['amount'])),
-                                            from_wallet=tx_info['from'],
-                                            to_wallet=wallet_address,
-                                            timestamp=sig_info.block_time or int(time.time()),
-                                            amount_usd=Decimal(str(tx_info['amount'] * sol_price))
-                                        )
-                                        
-                                        await db.add(transaction)
-                                        await db.commit()
-                                        
-                                        new_transactions.append({
-                                            'signature': sig_str,
-                                            'amount': tx_info['amount'],
-                                            'from': tx_info['from'],
-                                            'amount_usd': float(tx_info['amount'] * sol_price)
-                                        })
-                                        
-                                        logger.info(f"Saved new transaction: {tx_info['amount']} SOL from {tx_info['from']} for campaign {campaign_id}")
-                        
-                        return {
-                            "success": True, 
-                            "new_transactions": len(new_transactions),
-                            "transactions": new_transactions
-                        }
-                        
-                    except Exception as e:
-                        logger.error(f"an error occured: {e}")
-                    # finally:
-                    #     db.close()
-                
-            # Run database operations in thread pool
-            return asyncio.run(_db_operations())
-            # return await asyncio.get_event_loop().run_in_executor(None, _db_operations)
-                
-        except Exception as e:
-            logger.error(f"Error checking wallet {wallet_address}: {e}")
-            # Retry with exponential backoff, but don't retry forever
-            if self.request.retries < 2:
-                raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
-            return {"success": False, "error": str(e)}
+    try:
+        return run_async(scan_wallet(wallet_address, campaign_id))
+    except Exception as e:
+        logger.error(f"Error checking wallet {wallet_address}: {e}")
+        # Retry with exponential backoff, but don't retry forever
+        if self.request.retries < 2:
+            raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
+        return {"success": False, "error": str(e)}
+
+
+@celery_app.task(bind=True, max_retries=3)
+def check_wallet_batch(self, wallets: List[List]):
+    """Celery task to scan several ``[wallet_address, campaign_id]`` pairs concurrently.
+
+    Not retried: a wallet whose scan failed is picked up by the next
+    check_all_monitored_wallets run.
+    """
+    async def _scan_all():
+        return await asyncio.gather(
+            *(scan_wallet(wallet_address, campaign_id) for wallet_address, campaign_id in wallets),
+            return_exceptions=True
+        )
     
-    # Run the async function
-    return asyncio.run(_check_transactions())
-    # loop = asyncio.new_event_loop()
-    # asyncio.set_event_loop(loop)
-    # try:
-    #     return loop.run_until_complete(_check_transactions())
-    # finally:
-    #     loop.close()
-
-def parse_transaction(tx_detail, wallet_address: str) -> Optional[Dict]:
-    """Parse transaction to extract SOL transfers"""
+    results = run_async(_scan_all())
+    failed = [w for (w, _), r in zip(wallets, results) if isinstance(r, Exception) or not r.get("success")]
+    if failed:
+        logger.warning(f"Wallet checks failed for {len(failed)} of {len(wallets)} wallets: {failed[:5]}")
+    return {
+        "success": not failed,
+        "wallets": len(wallets),
+        "failed": failed,
+        "new_transactions": sum(r.get("new_transactions", 0) for r in results if isinstance(r, dict))
+    }
+
+
+@celery_app.task(bind=True, max_retries=3)
+def refresh_escrow_balances(self):
+    """Celery task to cache the balances of all monitored escrow wallets"""
+    try:
+        active_campaigns = run_async(SolanaMonitor.get_active_campaigns())
+        cached = balances.refresh_balances(c['wallet_address'] for c in active_campaigns)
+        logger.debug(f"Refreshed {cached} escrow balances")
+        return {"success": True, "wallets": cached}
+    except Exception as e:
+        logger.error(f"Error refreshing escrow balances: {e}")
+        raise self.retry(exc=e, countdown=10)
+
+
+@celery_app.task(bind=True, max_retries=3)
+def refresh_market_data(self):
+    """Celery task to refresh the market data of active campaigns' tokens from DexScreener
+    (MAX_TOKENS_PER_CALL tokens per request, one bulk UPDATE)"""
+    async def _refresh():
+        return await market_data.refresh(http_session())
+    try:
+        result = run_async(_refresh())
+        logger.debug(f"Refreshed market data: {result}")
+        return {"success": True, **result}
+    except Exception as e:
+        logger.error(f"Error refreshing market data: {e}")
+        raise self.retry(exc=e, countdown=30)
+
+
+@celery_app.task(bind=True, max_retries=3)
+def backfill_sol_prices(self, hours: int = 48):
+    """Celery task to fill gaps in the SOL price series, then value SOL
+    transactions that were saved before a price was available for their block time"""
+    async def _revalue():
+        revalued = 0
+        async with async_session() as db:
+            stmt = sa.select(Transaction).where(
+                Transaction.amount_usd.is_(None),
+                Transaction.mint.is_(None)
+            ).order_by(Transaction.timestamp.desc()).limit(1000)
+            for tx in (await db.execute(stmt)).scalars():
+                sol_price = price_series.price_at(tx.timestamp)
+                if sol_price is not None:
+                    tx.amount_usd = tx.amount * sol_price
+                    revalued += 1
+            await db.commit()
+        return revalued
+
     try:
-        pre_balances = tx_detail.meta.pre_balances
-        post_balances = tx_detail.meta.post_balances
-        account_keys = tx_detail.transaction.message.account_keys
+        filled = price_series.backfill_gaps(hours)
+        revalued = run_async(_revalue())
+        if revalued:
+            logger.info(f"Valued {revalued} transactions from the backfilled price series")
+        return {"success": True, "minutes_filled": filled, "transactions_revalued": revalued}
+    except Exception as e:
+        logger.error(f"Error backfilling SOL prices: {e}")
+        raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
+
+
+@celery_app.task(bind=True, max_retries=3)
+def refresh_leaderboard_velocity(self):
+    """Celery task to merge the hourly velocity buckets into the leaderboard"""
+    try:
+        leaderboard.refresh_velocity()
+        return {"success": True}
+    except Exception as e:
+        logger.error(f"Error refreshing leaderboard velocity: {e}")
+        raise self.retry(exc=e, countdown=30)
+
+
+@celery_app.task(bind=True, max_retries=3)
+def rebuild_leaderboard(self):
+    """Celery task to recompute the leaderboard from the database"""
+    try:
+        return {"success": True, "campaigns": run_async(leaderboard.rebuild())}
+    except Exception as e:
+        logger.error(f"Error rebuilding leaderboard: {e}")
+        raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
+
+
+@celery_app.task(bind=True, max_retries=3)
+def archive_expired_transactions(self):
+    """Celery task to move transactions of long-expired campaigns to the archive"""
+    try:
+        result = run_async(archive.archive_expired())
+        if result["transactions"]:
+            logger.info(f"Archived {result['transactions']} transactions of {result['campaigns']} campaigns")
+        return {"success": True, **result}
+    except Exception as e:
+        logger.error(f"Error archiving transactions: {e}")
+        raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
+
+
+class TokenMetadataUnavailable(Exception):
+    """DexScreener and the Solana RPC fallback returned nothing for a token"""
+
+
+async def activate_campaign(campaign_id: str, give_up: bool = False) -> Dict:
+    """Fill in a pending campaign's token metadata, pre-render its QR code and start monitoring it.
+
+    Raises TokenMetadataUnavailable when no metadata is found, so the task
+    retries; with ``give_up`` the campaign is marked failed instead.
+    """
+    async with async_session() as db:
+        campaign = (await db.execute(
+            sa.select(Campaign).where(Campaign.campaign_id == campaign_id)
+        )).scalar_one_or_none()
+        if campaign is None or campaign.status != 'pending':
+            return {"success": True, "campaign_id": campaign_id, "status": campaign.status if campaign else None}
         
-        for i, (pre, post) in enumerate(zip(pre_balances, post_balances)):
-            if str(account_keys[i]) == wallet_address and post > pre:
-                amount_lamports = post - pre
-                amount_sol = amount_lamports / 1e9
-                
-                # Find sender (simplified)
-                sender = "Unknown"
-                for j, (pre_j, post_j) in enumerate(zip(pre_balances, post_balances)):
-                    if j != i and post_j < pre_j and abs((pre_j - post_j) - amount_lamports) < 5000:
-                        sender = str(account_keys[j])
-                        break
+        pending = sa.update(Campaign).where(Campaign.id == campaign.id, Campaign.status == 'pending')
+        token_metadata = await TokenService.fetch_token_metadata(campaign.contract_address)
+        if not token_metadata:
+            if not give_up:
+                raise TokenMetadataUnavailable(campaign.contract_address)
+            await db.execute(pending.values(status='failed', is_active=False, error="Unable to fetch token metadata"))
+            await db.commit()
+            logger.warning(f"Campaign {campaign_id} failed: no token metadata for {campaign.contract_address}")
+            return {"success": False, "campaign_id": campaign_id, "status": 'failed'}
+        
+        # a concurrent run (retry or sweep) may have activated it already
+        result = await db.execute(pending.values(
+            status='active',
+            name=token_metadata.get('name'),
+            symbol=token_metadata.get('symbol'),
+            image_url=token_metadata.get('image_url'),
+            social_twitter=campaign.social_twitter or token_metadata.get('twitter_url'),
+            social_website=campaign.social_website or token_metadata.get('website_url'),
+            **market_data.from_metadata(token_metadata),
+        ))
+        await db.commit()
+        if result.rowcount == 0:
+            return {"success": True, "campaign_id": campaign_id, "status": 'active'}
+        await db.refresh(campaign)
+    
+    await QRCodeService.campaign_qr_code(campaign)
+    await leaderboard.register_campaign(campaign)
+    await start_monitoring_campaign(campaign_id, campaign.wallet_address)
+    logger.info(f"Campaign {campaign_id} ({campaign.symbol}) is active")
+    return {"success": True, "campaign_id": campaign_id, "status": 'active'}
+
+
+@celery_app.task(bind=True, max_retries=3)
+def enrich_campaign(self, campaign_id: str):
+    """Celery task to enrich and activate a campaign created as 'pending'"""
+    try:
+        return run_async(activate_campaign(campaign_id, give_up=self.request.retries >= self.max_retries))
+    except Exception as e:
+        logger.error(f"Error enriching campaign {campaign_id}: {e}")
+        raise self.retry(exc=e, countdown=10 * (2 ** self.request.retries))
+
+
+@celery_app.task(bind=True, max_retries=3)
+def retry_pending_campaigns(self):
+    """Celery task to re-enqueue enrichment of campaigns still pending after PENDING_CAMPAIGN_TIMEOUT
+    (enqueueing failed at creation, or the task was lost)"""
+    async def _stuck():
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=config.PENDING_CAMPAIGN_TIMEOUT)
+        async with async_session() as db:
+            return (await db.execute(
+                sa.select(Campaign.campaign_id).where(Campaign.status == 'pending', Campaign.updated_at < cutoff)
+            )).scalars().all()
+    try:
+        campaign_ids = run_async(_stuck())
+        for campaign_id in campaign_ids:
+            enrich_campaign.delay(campaign_id)
+        if campaign_ids:
+            logger.warning(f"Re-enqueued enrichment of {len(campaign_ids)} pending campaigns")
+        return {"success": True, "campaigns": len(campaign_ids)}
+    except Exception as e:
+        logger.error(f"Error re-enqueueing pending campaigns: {e}")
+        raise self.retry(exc=e, countdown=60)
+
+
+async def _resolve_campaigns(db: AsyncSession, wallet_address: str, keys: set, memos: set) -> Dict[str, str]:
+    """Map Solana Pay references and memos seen in transactions to campaign ids.
+
+    One query for a whole scan: references go through the unique index on
+    campaigns.reference, memos are matched against campaign_id.
+    """
+    if not keys and not memos:
+        return {}
+    stmt = sa.select(Campaign.campaign_id, Campaign.reference).where(
+        Campaign.wallet_address == wallet_address,
+        sa.or_(Campaign.reference.in_(keys), Campaign.campaign_id.in_(memos))
+    )
+    routes = {}
+    for campaign_id, reference in (await db.execute(stmt)).all():
+        routes[campaign_id] = campaign_id
+        if reference:
+            routes[reference] = campaign_id
+    return routes
+
+
+async def scan_wallet(wallet_address: str, campaign_id: Optional[str] = None, rpc=None) -> Dict:
+    """Fetch the latest signatures for an escrow wallet and save any new transfers into it.
+
+    Several campaigns can share one escrow, so each transaction is credited to
+    the campaign whose Solana Pay ``reference`` key is among its accounts, or
+    whose campaign_id is its memo. Transfers matching neither go to
+    ``campaign_id`` when given (the wallet's only campaign), else are stored
+    under UNATTRIBUTED_CAMPAIGN so they are not fetched again.
+
+    New rows are written through the ingest sink, batched with those of other
+    scans running in this worker; DB sessions are only held for the two lookups.
+
+    Only one scan of a wallet runs at a time: a scan that finds the wallet's
+    lease taken returns ``skipped`` without calling the RPC.
+    
+    ``rpc`` defaults to the shared Solana client; benchmarks pass a replay client.
+    """
+    lease = f"scan:{wallet_address}"
+    # the lease calls are blocking Redis round trips: keep them off the event loop
+    loop = asyncio.get_running_loop()
+    try:
+        token = await loop.run_in_executor(None, leases.acquire, lease)
+    except redis.RedisError as e:
+        # fail open: duplicate scans are harmless, missed ones are not
+        logger.warning(f"Scanning {wallet_address} without a lease, Redis unavailable: {e}")
+        token = 0
+    if token is None:
+        logger.debug(f"Wallet {wallet_address} is being scanned by another worker, skipping")
+        return {"success": True, "skipped": True, "new_transactions": 0}
+    try:
+        return await _scan_wallet(wallet_address, campaign_id, rpc)
+    finally:
+        if token:
+            await loop.run_in_executor(None, leases.release, lease, token)
+
+
+async def _scan_wallet(wallet_address: str, campaign_id: Optional[str], rpc) -> Dict:
+    rpc = rpc or solana_client
+    logger.debug(f"Checking wallet {wallet_address} (default campaign {campaign_id})")
+    
+    pubkey = Pubkey.from_string(wallet_address)
+    loop = asyncio.get_event_loop()
+    # Run blocking Solana client calls in thread pool
+    with observe_upstream("solana_rpc", "getSignaturesForAddress"):
+        signatures = await loop.run_in_executor(
+            None, partial(rpc.get_signatures_for_address, pubkey, limit=5)
+        )
+    
+    if not signatures.value:
+        return {"success": True, "new_transactions": 0}
+    
+    new_transactions = 0
+    try:
+        # Skip signatures we already processed, hot or archived (one query for the whole page)
+        page = {str(sig_info.signature): sig_info for sig_info in signatures.value}
+        async with async_session() as db:
+            known = await archive.known_signatures(db, list(page))
+        
+        parsed = []
+        for sig_str, sig_info in page.items():
+            if sig_str in known:
+                logger.debug(f"Transaction {sig_str} already processed.")
+                continue
+            
+            # Get transaction details
+            with observe_upstream("solana_rpc", "getTransaction"):
+                tx_detail = await loop.run_in_executor(None, partial(
+                    rpc.get_transaction,
+                    sig_info.signature,
+                    encoding="jsonParsed",
+                    max_supported_transaction_version=0
+                ))
+            
+            if tx_detail.value and tx_detail.value.transaction:
+                transaction_data = tx_detail.value.transaction
                 
-                logger.debug(f"Parsed transaction for {wallet_address}: {amount_sol} SOL from {sender}")
-                return {
-                    'amount': amount_sol,
-                    'from': sender
-                }
+                if transaction_data.meta and not transaction_data.meta.err:
+                    transfers = parse_transaction(transaction_data, wallet_address)
+                    if transfers:
+                        keys, memos = transaction_tags(transaction_data)
+                        parsed.append((sig_str, sig_info, transfers, keys, memos))
+        
+        if not parsed:
+            return {"success": True, "new_transactions": 0}
+        
+        async with async_session() as db:
+            routes = await _resolve_campaigns(
+                db, wallet_address,
+                {k for _, _, _, keys, _ in parsed for k in keys},
+                {m for _, _, _, _, memos in parsed for m in memos}
+            )
+        
+        rows = []
+        for sig_str, sig_info, transfers, keys, memos in parsed:
+            target = next((routes[t] for t in keys + memos if t in routes), campaign_id) or UNATTRIBUTED_CAMPAIGN
+            # SOL/USD at block time from the local price series (no HTTP call).
+            # None if the series has a hole there; backfill_sol_prices values it later.
+            sol_price = price_series.price_at(sig_info.block_time or int(time.time()))
+            
+            for tx_info in transfers:
+                # Only SOL contributions can be valued; token prices are not tracked
+                amount_usd = None
+                if tx_info['mint'] is None and sol_price is not None:
+                    amount_usd = tx_info['amount'] * sol_price
+                rows.append({
+                    "campaign_id": target,
+                    "signature": sig_str,
+                    "transfer_index": tx_info['transfer_index'],
+                    "mint": tx_info['mint'],
+                    "amount": tx_info['amount'],
+                    "from_wallet": tx_info['from'],
+                    "to_wallet": wallet_address,
+                    "timestamp": sig_info.block_time or int(time.time()),
+                    "amount_usd": amount_usd,
+                    "block_time": datetime.fromtimestamp(sig_info.block_time, timezone.utc) if sig_info.block_time else None
+                })
+        
+        # Rows another scan saved first are skipped by the sink and not counted here
+        inserted = await ingest_sink.write(rows)
+        
+        contributions: Dict[str, Tuple[str, Decimal, Optional[int]]] = {}
+        for row in rows:
+            if (row['signature'], row['transfer_index']) not in inserted:
+                continue
+            target, contributed_usd, block_time = contributions.get(
+                row['signature'], (row['campaign_id'], Decimal(0), page[row['signature']].block_time)
+            )
+            contributions[row['signature']] = (target, contributed_usd + (row['amount_usd'] or 0), block_time)
+            new_transactions += 1
+            logger.info(f"Saved new transaction: {row['amount']} {row['mint'] or 'SOL'} from {row['from_wallet']} for campaign {row['campaign_id']}")
+        
+        for target, contributed_usd, block_time in contributions.values():
+            record_ingest(block_time)
+            if target != UNATTRIBUTED_CAMPAIGN:
+                leaderboard.record_contribution(target, contributed_usd, block_time)
+        
+        return {"success": True, "new_transactions": new_transactions}
         
+    except Exception as e:
+        logger.error(f"an error occured: {e}")
+        return {"success": False, "error": str(e), "new_transactions": new_transactions}
+
+LAMPORTS_PER_SOL = Decimal(10 ** 9)
+
+
+def _transfer(amount: Decimal, sender: str, mint: Optional[str] = None) -> Dict:
+    return {'amount': amount, 'from': sender, 'mint': mint}
+
+
+def _iter_instructions(tx_detail):
+    """Top-level instructions, each followed by the inner instructions it invoked"""
+    inner = {ix.index: ix.instructions for ix in (tx_detail.meta.inner_instructions or [])}
+    for i, instruction in enumerate(tx_detail.transaction.message.instructions):
+        yield instruction
+        yield from inner.get(i, ())
+
+
+def transaction_tags(tx_detail) -> Tuple[List[str], List[str]]:
+    """Account keys and memo texts of a transaction, used to route it to a campaign.
+
+    Solana Pay wallets add the payment's ``reference`` as an extra read-only
+    account, and ``memo`` as an spl-memo instruction.
+    """
+    keys = [str(getattr(key, "pubkey", key)) for key in tx_detail.transaction.message.account_keys]
+    memos = []
+    for instruction in _iter_instructions(tx_detail):
+        if getattr(instruction, "program", None) == "spl-memo" and isinstance(getattr(instruction, "parsed", None), str):
+            memos.append(instruction.parsed.strip())
+    return keys, memos
+
+
+def parse_transaction(tx_detail, wallet_address: str) -> List[Dict]:
+    """Extract every SOL and SPL token transfer into ``wallet_address``.
+
+    Transfers are read from the parsed ``system`` / ``spl-token`` instructions
+    (top level and inner), which name the exact sender. Balance deltas are only
+    used as a fallback: whatever the escrow's SOL or token balance grew by
+    beyond its parsed transfers was moved by a program the RPC could not parse.
+    Each transfer is ``{'amount': Decimal, 'from': str, 'mint': str | None}``;
+    ``mint`` is None for SOL, and SOL amounts are in SOL.
+    """
+    transfers = []
+    try:
+        meta = tx_detail.meta
+        message = tx_detail.transaction.message
+        # jsonParsed responses carry ParsedAccount entries rather than bare pubkeys
+        keys = [str(getattr(key, "pubkey", key)) for key in message.account_keys]
+        if len(keys) < len(meta.pre_balances) and meta.loaded_addresses:
+            keys += [str(k) for k in meta.loaded_addresses.writable] + [str(k) for k in meta.loaded_addresses.readonly]
+        index = {key: i for i, key in enumerate(keys)}
+
+        # token account -> (owner, mint, decimals), from both pre and post balances
+        token_accounts = {}
+        for balance in (meta.pre_token_balances or []) + (meta.post_token_balances or []):
+            token_accounts[keys[balance.account_index]] = (
+                str(balance.owner) if balance.owner else None,
+                str(balance.mint),
+                balance.ui_token_amount.decimals,
+            )
+
+        # net lamports / raw token units moved by parsed transfers, per account,
+        # to reconcile against the balance deltas below
+        sol_moved: Dict[str, int] = defaultdict(int)
+        token_moved: Dict[str, int] = defaultdict(int)
+        for instruction in _iter_instructions(tx_detail):
+            program = getattr(instruction, "program", None)
+            parsed = getattr(instruction, "parsed", None)
+            if not program or not isinstance(parsed, dict):
+                continue
+            kind, info = parsed.get("type"), parsed.get("info", {})
+
+            if program == "system" and kind in ("transfer", "transferWithSeed"):
+                sol_moved[info.get("source")] -= int(info["lamports"])
+                sol_moved[info.get("destination")] += int(info["lamports"])
+                if info.get("destination") == wallet_address:
+                    transfers.append(_transfer(Decimal(info["lamports"]) / LAMPORTS_PER_SOL, info["source"]))
+
+            elif program.startswith("spl-token") and kind in ("transfer", "transferChecked"):
+                owner, mint, decimals = token_accounts.get(info.get("destination"), (None, None, None))
+                if "tokenAmount" in info:
+                    raw, decimals = info["tokenAmount"]["amount"], info["tokenAmount"]["decimals"]
+                else:
+                    raw = info["amount"]
+                token_moved[info.get("source")] -= int(raw)
+                token_moved[info.get("destination")] += int(raw)
+                if owner != wallet_address and info.get("destination") != wallet_address:
+                    continue
+                source_owner = token_accounts.get(info.get("source"), (None,))[0]
+                sender = source_owner or info.get("authority") or info.get("multisigAuthority") or "Unknown"
+                transfers.append(_transfer(Decimal(raw).scaleb(-(decimals or 0)), sender, info.get("mint", mint)))
+
+        # Fallback for SOL the escrow received beyond its parsed transfers
+        # (programs that moved SOL without a parsed system transfer, e.g. via CPI)
+        escrow = index.get(wallet_address)
+        if escrow is not None:
+            deltas = [post - pre for pre, post in zip(meta.pre_balances, meta.post_balances)]
+            received = deltas[escrow] - sol_moved[wallet_address] + (meta.fee if escrow == 0 else 0)
+            if received > 0:
+                transfers.append(_transfer(Decimal(received) / LAMPORTS_PER_SOL,
+                                           _closest_sender(deltas, received, meta.fee, keys)))
+
+        # Fallback for escrow token balances that grew beyond their parsed transfers
+        if meta.post_token_balances:
+            pre_amounts = {b.account_index: int(b.ui_token_amount.amount) for b in meta.pre_token_balances or []}
+            post_amounts = {b.account_index: int(b.ui_token_amount.amount) for b in meta.post_token_balances}
+            for balance in meta.post_token_balances:
+                if str(balance.owner) != wallet_address:
+                    continue
+                received = (post_amounts[balance.account_index] - pre_amounts.get(balance.account_index, 0)
+                            - token_moved[keys[balance.account_index]])
+                if received > 0:
+                    sender = next(
+                        (str(b.owner) for b in meta.pre_token_balances or []
+                         if b.mint == balance.mint and str(b.owner) != wallet_address
+                         and pre_amounts[b.account_index] - post_amounts.get(b.account_index, 0) == received),
+                        "Unknown",
+                    )
+                    transfers.append(_transfer(Decimal(received).scaleb(-balance.ui_token_amount.decimals),
+                                               sender, str(balance.mint)))
+
+        for i, transfer in enumerate(transfers):
+            transfer['transfer_index'] = i
+            logger.debug(f"Parsed transfer for {wallet_address}: {transfer['amount']} "
+                         f"{transfer['mint'] or 'SOL'} from {transfer['from']}")
+
     except Exception as e:
         logger.error(f"Error parsing transaction: {e}")
-    
-    return None
+
+    return transfers
+
+
+def _closest_sender(deltas: List[int], received: int, fee: int, keys: List[str]) -> str:
+    """Account whose lamport decrease best matches ``received`` (the fee payer at index 0 also paid the fee)"""
+    best, best_diff = "Unknown", None
+    for j, delta in enumerate(deltas):
+        if delta >= 0:
+            continue
+        diff = abs(-delta - (fee if j == 0 else 0) - received)
+        if best_diff is None or diff < best_diff:
+            best, best_diff = keys[j], diff
+    return best
 
 # =============================================================================
 # CONVENIENCE FUNCTIONS FOR YOUR MAIN APP
@@ -598,6 +1230,7 @@ async def start_monitoring_campaign(campaign_id: str, wallet_address: str):
 async def stop_monitoring_campaign(campaign_id: str):
     """Stop monitoring a campaign (called when campaign ends) - async"""
     logger.info(f"Stopped monitoring campaign {campaign_id}")
+    await leaderboard.remove_campaign(campaign_id)
     # Update campaign status in database, Celery beat will stop checking it automatically
 
 async def get_monitoring_status() -> Dict:
@@ -0,0 +1,201 @@
+"""Cache warm-up after a deploy, and ahead of expected traffic.
+
+A fresh API process starts with an empty DB connection pool, SQLAlchemy
+statement cache and HTTP session. Shared caches may also be cold: a SOL price
+older than price_series.LATEST_MAX_AGE, token_cache rows, and QR codes of
+new campaigns. Without warm-up, the first users after a rolling deploy pay
+for all of that. ``run`` preloads, for up to WARMUP_CAMPAIGNS active
+campaigns (most recently updated first):
+
+    sol price        CoinGecko, only if the recorded price is stale
+    token metadata   token_cache rows older than TOKEN_CACHE_MAX_AGE, from
+                     DexScreener MAX_TOKENS_PER_CALL tokens per request
+    qr codes         the cached amount-less QR code of each campaign
+    campaign detail  the /api/campaign-detail payload of each campaign,
+                     which opens pool connections and compiles its queries
+
+QR codes and details are built WARMUP_CONCURRENCY at a time. The lifespan
+starts a warm-up in the background. /readyz reports "warming up" until it
+finishes, for at most WARMUP_READY_TIMEOUT seconds, so a slow upstream
+delays readiness by a bounded time. POST /api/admin/warmup (with
+``X-Admin-Token: <ADMIN_TOKEN>``) warms the process that receives it, and
+
+    python -m src.warmup [--campaigns N]
+
+warms the shared caches (price, token metadata, QR codes) from anywhere,
+e.g. a cron job shortly before a campaign launch.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import sqlalchemy as sa
+
+from src import market_data, price_series
+from src.config import config, read_session, async_session
+from src.logger import setup_logger
+from src.models import Campaign, TokenCache
+from src.services import (
+    CampaignService, QRCodeService, TokenService, TOKEN_CACHE_MAX_AGE, close_http_session, http_session,
+)
+
+logger = setup_logger("warmup", "warmup.log")
+
+_FAILED = object()
+_task: Optional[asyncio.Task] = None
+last_result: Optional[Dict] = None
+
+
+# ----------------------------------------------------------------------------
+# Steps
+# ----------------------------------------------------------------------------
+
+async def _sol_price() -> bool:
+    """Fetch and record the SOL price if the recorded one is stale; True if it was fetched"""
+    if await price_series.latest_price() is not None:
+        return False
+    price = await TokenService.fetch_sol_price()
+    await asyncio.get_running_loop().run_in_executor(None, price_series.record, int(time.time()), price)
+    return True
+
+
+async def _campaigns(limit: int) -> List[Campaign]:
+    async with read_session() as db:
+        return (await db.execute(
+            sa.select(Campaign)
+            .where(Campaign.status == 'active', Campaign.expires_at > datetime.now(timezone.utc))
+            .order_by(Campaign.updated_at.desc())
+            .limit(limit)
+        )).scalars().all()
+
+
+async def _token_metadata(addresses: List[str]) -> int:
+    """Refresh stale token_cache rows of ``addresses``; returns how many were written"""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=TOKEN_CACHE_MAX_AGE)
+    async with async_session() as db:
+        fresh = set((await db.execute(
+            sa.select(TokenCache.contract_address)
+            .where(TokenCache.contract_address.in_(addresses), TokenCache.last_updated >= cutoff)
+        )).scalars())
+    stale = [a for a in addresses if a not in fresh]
+    if not stale:
+        return 0
+
+    # no connection is held while DexScreener answers
+    pairs = await market_data.fetch_pairs(http_session(), stale)
+    async with async_session() as db:
+        rows = {row.contract_address: row for row in (await db.execute(
+            sa.select(TokenCache).where(TokenCache.contract_address.in_(list(pairs)))
+        )).scalars()}
+        now = datetime.now(timezone.utc)
+        for address, pair in pairs.items():
+            row = rows.get(address)
+            if row is None:
+                row = TokenCache(contract_address=address, decimals=9, total_supply=0, holders_count=0)
+                db.add(row)
+            row.name = (pair.get("baseToken") or {}).get("name")
+            row.symbol = (pair.get("baseToken") or {}).get("symbol")
+            row.price_usd = market_data.from_pair(pair)["price_usd"]
+            row.last_updated = now
+        await db.commit()
+    return len(pairs)
+
+
+async def _qr_code(campaign: Campaign):
+    await QRCodeService.campaign_qr_code(campaign)
+
+
+async def _campaign_detail(campaign: Campaign):
+    async with read_session() as db:
+        await CampaignService(db).get_campaign_details(campaign.contract_address)
+
+
+# ----------------------------------------------------------------------------
+# Run
+# ----------------------------------------------------------------------------
+
+async def run(campaigns: Optional[int] = None, concurrency: Optional[int] = None, details: bool = True) -> Dict:
+    """Warm the caches once and return what was done. Failures are counted, never raised."""
+    global last_result
+    campaigns = config.WARMUP_CAMPAIGNS if campaigns is None else campaigns
+    semaphore = asyncio.Semaphore(concurrency or config.WARMUP_CONCURRENCY)
+    start = time.perf_counter()
+    result = {"sol_price": False, "campaigns": 0, "token_metadata": 0, "qr_codes": 0, "campaign_details": 0, "errors": 0}
+
+    async def _step(name: str, coro):
+        try:
+            return await coro
+        except Exception as e:
+            result["errors"] += 1
+            logger.warning(f"Warm-up step {name} failed: {e}")
+            return _FAILED
+
+    result["sol_price"] = await _step("sol_price", _sol_price()) is True
+    active = await _step("campaigns", _campaigns(campaigns))
+    active = [] if active is _FAILED else active
+    result["campaigns"] = len(active)
+    if active:
+        addresses = list(dict.fromkeys(c.contract_address for c in active))
+        written = await _step("token_metadata", _token_metadata(addresses))
+        result["token_metadata"] = 0 if written is _FAILED else written
+
+        async def _bounded(name: str, step, campaign: Campaign) -> bool:
+            async with semaphore:
+                return await _step(f"{name} {campaign.campaign_id}", step(campaign)) is not _FAILED
+
+        result["qr_codes"] = sum(await asyncio.gather(
+            *(_bounded("qr_code", _qr_code, c) for c in active if c.wallet_address)
+        ))
+        if details:
+            result["campaign_details"] = sum(await asyncio.gather(
+                *(_bounded("campaign_detail", _campaign_detail, c) for c in active)
+            ))
+
+    result["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    result["finished_at"] = datetime.now(timezone.utc).isoformat()
+    last_result = result
+    logger.info(f"Warm-up finished: {result}")
+    return result
+
+
+def start() -> bool:
+    """Start a warm-up in the background; False if one is already running"""
+    global _task
+    if _task is not None and not _task.done():
+        return False
+    _task = asyncio.get_running_loop().create_task(run())
+    return True
+
+
+def running() -> bool:
+    return _task is not None and not _task.done()
+
+
+async def stop():
+    if _task is not None and not _task.done():
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="warm the shared caches (SOL price, token metadata, QR codes)")
+    parser.add_argument("--campaigns", type=int, default=config.WARMUP_CAMPAIGNS, help="active campaigns to warm")
+    args = parser.parse_args()
+
+    async def _run():
+        try:
+            # campaign details only warm this process: skip them here
+            print(await run(args.campaigns, details=False))
+        finally:
+            await close_http_session()
+
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""Shared test setup.
+
+src.config reads its settings at import time, so placeholders are set before
+any test module imports the app. Nothing here needs a database, Redis server
+or Solana node: tests use fakeredis and in-memory fixtures.
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("SOLANA_RPC_URL", "http://127.0.0.1:9")
+os.environ.setdefault("WALLET", "9o24Px7asSDJ1ZLyQhZd7vehm9kX4VuTeJh7VGryjXkm")
+os.environ.setdefault("REDIS_URL", "redis://127.0.0.1:9/0")
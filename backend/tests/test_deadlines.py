@@ -0,0 +1,107 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from src import deadlines
+from src.config import config
+from src.metrics import DEADLINE_EXCEEDED
+
+BUDGET = 0.5
+
+
+async def timing(request):
+    return JSONResponse({"remaining": deadlines.remaining(), "upstream": deadlines.upstream_timeout(10)})
+
+
+async def slow(request):
+    await asyncio.sleep(5)
+    return JSONResponse({})
+
+
+async def stale(request):
+    deadlines.mark_stale("balance")
+    deadlines.mark_stale("sol_price")
+    return JSONResponse({})
+
+
+async def exhausted(request):
+    await asyncio.sleep(BUDGET - config.DEADLINE_RESERVE / 2)
+    try:
+        deadlines.upstream_timeout(10)
+    except deadlines.DeadlineExceeded:
+        return JSONResponse({"skipped": True})
+    return JSONResponse({"skipped": False})
+
+
+app = deadlines.DeadlineMiddleware(
+    Starlette(routes=[
+        Route("/budget/timing", timing), Route("/budget/slow", slow), Route("/budget/stale", stale),
+        Route("/budget/exhausted", exhausted), Route("/free/timing", timing), Route("/free/slow-prefix/timing", timing),
+    ]),
+    budgets={"/budget": BUDGET, "/free/slow-prefix": 30.0},
+)
+
+
+@pytest.fixture
+async def client():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+def test_no_deadline_outside_a_request():
+    assert deadlines.remaining() is None
+    assert deadlines.upstream_timeout(10) == 10
+    deadlines.mark_stale("balance")  # no-op
+
+
+async def test_routes_without_a_budget_have_no_deadline(client):
+    body = (await client.get("/free/timing")).json()
+    assert body == {"remaining": None, "upstream": 10}
+
+
+async def test_upstream_timeout_keeps_the_reserve_back(client):
+    body = (await client.get("/budget/timing")).json()
+    assert 0 < body["remaining"] <= BUDGET
+    assert body["upstream"] == pytest.approx(body["remaining"] - config.DEADLINE_RESERVE, abs=0.05)
+    # the transport runs the app in this task: the deadline must not outlive the request
+    assert deadlines.remaining() is None
+
+
+async def test_longest_prefix_wins(client):
+    body = (await client.get("/free/slow-prefix/timing")).json()
+    assert BUDGET < body["remaining"] <= 30.0
+    assert body["upstream"] == 10
+
+
+async def test_client_header_shortens_but_never_extends_the_budget(client):
+    shorter = (await client.get("/budget/timing", headers={"X-Request-Deadline-Ms": "300"})).json()
+    assert shorter["remaining"] <= 0.3
+    longer = (await client.get("/budget/timing", headers={"X-Request-Deadline-Ms": "60000"})).json()
+    assert longer["remaining"] <= BUDGET
+    invalid = (await client.get("/budget/timing", headers={"X-Request-Deadline-Ms": "soon"})).json()
+    assert 0.3 < invalid["remaining"] <= BUDGET
+
+
+async def test_upstream_call_skipped_when_less_than_the_reserve_is_left(client):
+    assert (await client.get("/budget/exhausted")).json() == {"skipped": True}
+
+
+async def test_overrun_answers_504(client):
+    before = DEADLINE_EXCEEDED.labels("/budget")._value.get()
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    response = await client.get("/budget/slow")
+    assert response.status_code == 504
+    assert response.json() == {"detail": "Deadline exceeded"}
+    assert loop.time() - started < BUDGET + 0.5
+    assert DEADLINE_EXCEEDED.labels("/budget")._value.get() == before + 1
+
+
+async def test_stale_sources_are_reported_in_a_header(client):
+    response = await client.get("/budget/stale")
+    assert response.headers["x-stale"] == "balance, sol_price"
+    assert "x-stale" not in (await client.get("/budget/timing")).headers
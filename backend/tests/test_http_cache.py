@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta, timezone
+
+from starlette.requests import Request
+
+from src import http_cache
+
+MODIFIED = datetime(2025, 8, 25, 10, 30, 0, 750_000, tzinfo=timezone.utc)
+MODIFIED_HTTP = "Mon, 25 Aug 2025 10:30:00 GMT"
+
+
+def request(**headers) -> Request:
+    return Request({
+        "type": "http", "method": "GET", "path": "/",
+        "headers": [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def test_etag_is_weak_and_changes_with_any_part():
+    etag = http_cache.make_etag("cmp_1", MODIFIED, 3, 180.0)
+    assert etag.startswith('W/"') and etag == http_cache.make_etag("cmp_1", MODIFIED, 3, 180.0)
+    assert etag != http_cache.make_etag("cmp_1", MODIFIED, 3, 181.0)
+
+
+def test_latest_ignores_none_and_reads_naive_times_as_utc():
+    naive = datetime(2025, 8, 25, 11, 0)
+    assert http_cache.latest(None, MODIFIED, naive) == naive.replace(tzinfo=timezone.utc)
+    assert http_cache.latest(None, None) is None
+
+
+def test_cache_headers():
+    headers = http_cache.cache_headers('W/"x"', MODIFIED, 5)
+    assert headers == {"ETag": 'W/"x"', "Cache-Control": "public, max-age=5, must-revalidate",
+                       "Last-Modified": MODIFIED_HTTP}
+    assert "Last-Modified" not in http_cache.cache_headers('W/"x"', None, 5)
+
+
+# ----------------------------------------------------------------------------
+# If-None-Match
+# ----------------------------------------------------------------------------
+
+def test_matching_etag_gives_304_with_validators():
+    etag = http_cache.make_etag("v1")
+    response = http_cache.not_modified(request(if_none_match=etag), etag, MODIFIED, 5)
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.headers["last-modified"] == MODIFIED_HTTP
+
+
+def test_etag_comparison_is_weak_and_accepts_lists_and_star():
+    etag = http_cache.make_etag("v1")
+    strong = etag.removeprefix("W/")
+    assert http_cache.not_modified(request(if_none_match=strong), etag, None, 5) is not None
+    assert http_cache.not_modified(request(if_none_match=f'"other", {etag}'), etag, None, 5) is not None
+    assert http_cache.not_modified(request(if_none_match="*"), etag, None, 5) is not None
+
+
+def test_changed_etag_gives_full_response():
+    assert http_cache.not_modified(request(if_none_match=http_cache.make_etag("v1")),
+                                   http_cache.make_etag("v2"), MODIFIED, 5) is None
+
+
+def test_if_modified_since_is_ignored_when_if_none_match_is_sent():
+    req = request(if_none_match=http_cache.make_etag("v1"), if_modified_since=MODIFIED_HTTP)
+    assert http_cache.not_modified(req, http_cache.make_etag("v2"), MODIFIED, 5) is None
+
+
+# ----------------------------------------------------------------------------
+# If-Modified-Since
+# ----------------------------------------------------------------------------
+
+def test_unmodified_since_gives_304_at_one_second_resolution():
+    # MODIFIED has microseconds; the HTTP date it was sent as does not
+    assert http_cache.not_modified(request(if_modified_since=MODIFIED_HTTP), "e", MODIFIED, 5) is not None
+
+
+def test_modified_since_gives_full_response():
+    later = MODIFIED + timedelta(seconds=1)
+    assert http_cache.not_modified(request(if_modified_since=MODIFIED_HTTP), "e", later, 5) is None
+
+
+def test_if_modified_since_without_last_modified_gives_full_response():
+    # campaign details depend on the SOL price and send no Last-Modified
+    assert http_cache.not_modified(request(if_modified_since="Fri, 01 Jan 2100 00:00:00 GMT"), "e", None, 5) is None
+
+
+def test_malformed_if_modified_since_gives_full_response():
+    assert http_cache.not_modified(request(if_modified_since="yesterday"), "e", MODIFIED, 5) is None
+
+
+def test_no_conditional_headers_gives_full_response():
+    assert http_cache.not_modified(request(), "e", MODIFIED, 5) is None
@@ -0,0 +1,117 @@
+import fakeredis
+import pytest
+
+from src import leaderboard
+
+KEY = leaderboard.SORT_KEYS["raised_usd"]
+
+
+@pytest.fixture
+async def redis(monkeypatch):
+    client = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(leaderboard, "redis_client", client)
+    yield client
+    await client.aclose()
+
+
+async def seed(redis, scores):
+    await redis.zadd(KEY, scores)
+    for campaign_id, score in scores.items():
+        await redis.hset(leaderboard._campaign_key(campaign_id),
+                         mapping={"name": campaign_id, "goal_amount": 100, "raised_usd": score})
+
+
+async def walk(limit, between_pages=None):
+    """Campaign ids of every page, calling ``between_pages`` after the first one"""
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = await leaderboard.get_page("raised_usd", limit, cursor)
+        seen += [c["campaign_id"] for c in page["campaigns"]]
+        pages += 1
+        if between_pages and pages == 1:
+            await between_pages()
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+# ties at every score, and a long run of zero scores like freshly registered campaigns
+SCORES = {**{f"c{i:02d}": float((i // 3) * 10) for i in range(12)}, **{f"z{i:02d}": 0.0 for i in range(7)}}
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, 5, 7, 19, 20, 100])
+async def test_pages_cover_the_ranking_exactly_once(redis, limit):
+    await seed(redis, SCORES)
+    expected = [m.decode() for m in await redis.zrevrange(KEY, 0, -1)]
+    assert await walk(limit) == expected
+
+
+async def test_page_boundary_inside_a_tie_continues_with_the_tied_members(redis):
+    await seed(redis, {"a": 5.0, "b": 5.0, "c": 5.0, "d": 1.0})
+    first = await leaderboard.get_page("raised_usd", 2, None)
+    assert [c["campaign_id"] for c in first["campaigns"]] == ["c", "b"]
+    second = await leaderboard.get_page("raised_usd", 2, first["next_cursor"])
+    assert [c["campaign_id"] for c in second["campaigns"]] == ["a", "d"]
+
+
+async def test_last_full_page_is_followed_by_an_empty_one(redis):
+    await seed(redis, {"a": 2.0, "b": 1.0})
+    first = await leaderboard.get_page("raised_usd", 2, None)
+    assert first["next_cursor"] is not None
+    last = await leaderboard.get_page("raised_usd", 2, first["next_cursor"])
+    assert last == {"sort": "raised_usd", "campaigns": [], "next_cursor": None}
+
+
+async def test_score_changes_between_pages_do_not_repeat_or_skip_unchanged_rows(redis):
+    await seed(redis, SCORES)
+    before = [m.decode() for m in await redis.zrevrange(KEY, 0, -1)]
+    first_page = before[:5]
+
+    async def contributions():
+        # a campaign already listed climbs further; one not listed yet drops but stays below the cursor
+        await redis.zincrby(KEY, 1000, first_page[-1])
+        await redis.zadd(KEY, {"c03": -1.0})
+
+    seen = await walk(5, contributions)
+    unchanged = [c for c in before if c not in (first_page[-1], "c03")]
+    assert [c for c in seen if c in unchanged] == unchanged
+    assert "c03" in seen and seen.count(first_page[-1]) == 1
+
+
+async def test_cursor_campaign_removed_from_the_leaderboard(redis):
+    await seed(redis, {"a": 3.0, "b": 2.0, "c": 2.0, "d": 1.0})
+    first = await leaderboard.get_page("raised_usd", 2, None)
+    assert [c["campaign_id"] for c in first["campaigns"]] == ["a", "c"]
+    await leaderboard.remove_campaign("c")
+    second = await leaderboard.get_page("raised_usd", 2, first["next_cursor"])
+    assert [c["campaign_id"] for c in second["campaigns"]] == ["b", "d"]
+
+
+async def test_cursor_campaign_whose_score_changed(redis):
+    await seed(redis, {"a": 3.0, "b": 2.0, "c": 2.0, "d": 1.0})
+    first = await leaderboard.get_page("raised_usd", 2, None)
+    await redis.zadd(KEY, {"c": 9.0})
+    # the page still resumes after the cursor's old position (2.0, "c")
+    second = await leaderboard.get_page("raised_usd", 2, first["next_cursor"])
+    assert [c["campaign_id"] for c in second["campaigns"]] == ["b", "d"]
+
+
+async def test_rank_is_the_current_position(redis):
+    await seed(redis, {"a": 3.0, "b": 2.0, "c": 1.0})
+    first = await leaderboard.get_page("raised_usd", 1, None)
+    assert first["campaigns"][0]["rank"] == 1
+    await redis.zadd(KEY, {"new": 10.0})
+    second = await leaderboard.get_page("raised_usd", 1, first["next_cursor"])
+    assert [(c["campaign_id"], c["rank"]) for c in second["campaigns"]] == [("b", 3)]
+
+
+def test_cursor_round_trip():
+    cursor = leaderboard.encode_cursor(12.5, "cmp_1234abcd")
+    assert leaderboard.decode_cursor(cursor) == (12.5, "cmp_1234abcd")
+
+
+@pytest.mark.parametrize("cursor", ["", "bm90LWEtY3Vyc29y", "!!!"])
+def test_malformed_cursor_raises_value_error(cursor):
+    # the route answers these with 400
+    with pytest.raises(ValueError):
+        leaderboard.decode_cursor(cursor)
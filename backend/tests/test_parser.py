@@ -0,0 +1,152 @@
+from decimal import Decimal
+
+from src.services import _closest_sender, parse_transaction, transaction_tags
+from tests.transactions import memo, opaque, pubkey, system_transfer, token_transfer, transaction
+
+ESCROW = pubkey(1)
+ALICE = pubkey(2)
+BOB = pubkey(3)
+RELAYER = pubkey(4)
+MINT = pubkey(10)
+ESCROW_ATA = pubkey(11)
+ALICE_ATA = pubkey(12)
+POOL_ATA = pubkey(13)
+BOB_ATA = pubkey(14)
+
+TOKEN_ACCOUNTS = {
+    ESCROW_ATA: (ESCROW, MINT),
+    ALICE_ATA: (ALICE, MINT),
+    POOL_ATA: (pubkey(20), MINT),
+    BOB_ATA: (BOB, MINT),
+}
+
+
+def amounts(transfers):
+    return [(t["amount"], t["from"], t["mint"]) for t in transfers]
+
+
+# ----------------------------------------------------------------------------
+# SOL
+# ----------------------------------------------------------------------------
+
+def test_parsed_sol_transfer():
+    tx = transaction(ALICE, [system_transfer(ALICE, ESCROW, 1_500_000_000)], sol=[(ALICE, ESCROW, 1_500_000_000)])
+    transfers = parse_transaction(tx, ESCROW)
+    assert amounts(transfers) == [(Decimal("1.5"), ALICE, None)]
+    assert transfers[0]["transfer_index"] == 0
+
+
+def test_several_transfers_in_one_signature_relayed_by_a_fee_payer():
+    movements = [(ALICE, ESCROW, 1_000_000_000), (BOB, ESCROW, 250_000_000)]
+    tx = transaction(RELAYER, [system_transfer(*m) for m in movements], sol=movements)
+    transfers = parse_transaction(tx, ESCROW)
+    # each sender is credited, not the fee payer
+    assert amounts(transfers) == [(Decimal("1"), ALICE, None), (Decimal("0.25"), BOB, None)]
+    assert [t["transfer_index"] for t in transfers] == [0, 1]
+
+
+def test_transfers_to_other_wallets_and_from_the_escrow_are_ignored():
+    movements = [(ALICE, BOB, 7_000), (ESCROW, BOB, 9_000)]
+    tx = transaction(ALICE, [system_transfer(*m) for m in movements], sol=movements)
+    assert parse_transaction(tx, ESCROW) == []
+
+
+def test_unparsed_sol_payment_is_read_from_balance_delta():
+    tx = transaction(RELAYER, [opaque(ALICE, ESCROW)], sol=[(ALICE, ESCROW, 2_000_000_000)])
+    # the fee payer only paid the fee: the closest lamport decrease is Alice's
+    assert amounts(parse_transaction(tx, ESCROW)) == [(Decimal("2"), ALICE, None)]
+
+
+def test_unparsed_sol_payment_next_to_an_unrelated_parsed_transfer():
+    tx = transaction(
+        ALICE, [system_transfer(ALICE, BOB, 1_000_000_000), opaque(ALICE, ESCROW)],
+        sol=[(ALICE, BOB, 1_000_000_000), (ALICE, ESCROW, 3_000_000_000)],
+    )
+    assert amounts(parse_transaction(tx, ESCROW)) == [(Decimal("3"), ALICE, None)]
+
+
+def test_parsed_and_unparsed_payments_to_the_escrow_are_both_counted_once():
+    tx = transaction(
+        RELAYER, [system_transfer(ALICE, ESCROW, 1_000_000_000), opaque(BOB, ESCROW)],
+        sol=[(ALICE, ESCROW, 1_000_000_000), (BOB, ESCROW, 500_000_000)],
+    )
+    assert amounts(parse_transaction(tx, ESCROW)) == [(Decimal("1"), ALICE, None), (Decimal("0.5"), BOB, None)]
+
+
+def test_escrow_as_fee_payer_does_not_turn_the_fee_into_a_payment():
+    tx = transaction(ESCROW, [system_transfer(ALICE, ESCROW, 1_000_000_000)], sol=[(ALICE, ESCROW, 1_000_000_000)])
+    assert amounts(parse_transaction(tx, ESCROW)) == [(Decimal("1"), ALICE, None)]
+
+
+# ----------------------------------------------------------------------------
+# SPL tokens
+# ----------------------------------------------------------------------------
+
+def test_parsed_token_transfer_checked():
+    tx = transaction(
+        ALICE, [token_transfer(ALICE_ATA, ESCROW_ATA, ALICE, 2_500_000, mint=MINT)],
+        tokens=[(ALICE_ATA, ESCROW_ATA, 2_500_000)], token_accounts=TOKEN_ACCOUNTS,
+    )
+    # scaled by the mint's decimals, credited to the owner of the source account
+    assert amounts(parse_transaction(tx, ESCROW)) == [(Decimal("2.500000"), ALICE, MINT)]
+
+
+def test_parsed_token_transfer_without_mint_takes_it_from_token_balances():
+    tx = transaction(
+        RELAYER, [token_transfer(BOB_ATA, ESCROW_ATA, BOB, 40)],
+        tokens=[(BOB_ATA, ESCROW_ATA, 40)], token_accounts=TOKEN_ACCOUNTS,
+    )
+    assert amounts(parse_transaction(tx, ESCROW)) == [(Decimal("0.000040"), BOB, MINT)]
+
+
+def test_token_transfer_in_inner_instructions():
+    tx = transaction(
+        ALICE, [opaque(ALICE_ATA, ESCROW_ATA)],
+        inner={0: [token_transfer(ALICE_ATA, ESCROW_ATA, ALICE, 1_000_000, mint=MINT)]},
+        tokens=[(ALICE_ATA, ESCROW_ATA, 1_000_000)], token_accounts=TOKEN_ACCOUNTS,
+    )
+    assert amounts(parse_transaction(tx, ESCROW)) == [(Decimal("1.000000"), ALICE, MINT)]
+
+
+def test_unparsed_token_payment_next_to_an_unrelated_parsed_swap():
+    tx = transaction(
+        ALICE, [token_transfer(ALICE_ATA, POOL_ATA, ALICE, 500, mint=MINT), opaque(BOB_ATA, ESCROW_ATA)],
+        tokens=[(ALICE_ATA, POOL_ATA, 500), (BOB_ATA, ESCROW_ATA, 300)], token_accounts=TOKEN_ACCOUNTS,
+    )
+    # Bob's balance dropped by exactly what the escrow received
+    assert amounts(parse_transaction(tx, ESCROW)) == [(Decimal("0.000300"), BOB, MINT)]
+
+
+def test_sol_and_token_payments_in_one_signature():
+    tx = transaction(
+        ALICE,
+        [system_transfer(ALICE, ESCROW, 100_000_000), token_transfer(ALICE_ATA, ESCROW_ATA, ALICE, 7_000_000, mint=MINT)],
+        sol=[(ALICE, ESCROW, 100_000_000)],
+        tokens=[(ALICE_ATA, ESCROW_ATA, 7_000_000)], token_accounts=TOKEN_ACCOUNTS,
+    )
+    assert amounts(parse_transaction(tx, ESCROW)) == [(Decimal("0.1"), ALICE, None), (Decimal("7.000000"), ALICE, MINT)]
+
+
+# ----------------------------------------------------------------------------
+# Helpers
+# ----------------------------------------------------------------------------
+
+def test_closest_sender_accounts_for_the_fee_paid_by_index_0():
+    keys = ["payer", "sender", "escrow"]
+    # the payer's decrease minus the fee matches exactly
+    assert _closest_sender([-1_005_000, -900_000, 1_000_000], 1_000_000, 5_000, keys) == "payer"
+    assert _closest_sender([-5_000, -1_000_000, 1_000_000], 1_000_000, 5_000, keys) == "sender"
+    assert _closest_sender([0, 0, 1_000_000], 1_000_000, 5_000, keys) == "Unknown"
+
+
+def test_transaction_tags_reads_references_and_memos():
+    reference = pubkey(30)
+    tx = transaction(ALICE, [system_transfer(ALICE, ESCROW, 1), memo(" cmp_1234abcd ")],
+                     sol=[(ALICE, ESCROW, 1)], references=[reference])
+    keys, memos = transaction_tags(tx)
+    assert reference in keys
+    assert memos == ["cmp_1234abcd"]
+
+
+def test_malformed_transaction_yields_no_transfers():
+    assert parse_transaction(object(), ESCROW) == []
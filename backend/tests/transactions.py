@@ -0,0 +1,127 @@
+"""Builders for jsonParsed getTransaction responses, parsed with solders like the monitor's.
+
+Balances are derived from the movements given, so each fixture is a
+consistent transaction: ``sol`` lists every lamport movement (parsed or
+not), ``tokens`` every token movement, and ``instructions`` only what the
+RPC would show as parsed instructions.
+"""
+import json
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from solders.pubkey import Pubkey
+from solders.rpc.responses import GetTransactionResp
+
+SYSTEM_PROGRAM = "11111111111111111111111111111111"
+TOKEN_PROGRAM = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+MEMO_PROGRAM = "MemoSq4gqABAXKb96qnH8TysNcWxMyWCqXgDLGmfcHr"
+OPAQUE_PROGRAM = str(Pubkey(bytes([200]) * 32))
+
+
+def pubkey(n: int) -> str:
+    """A valid, readable-in-tests pubkey for ``n`` (1-199)"""
+    return str(Pubkey(bytes([n]) * 32))
+
+
+def system_transfer(source: str, destination: str, lamports: int) -> Dict:
+    return {"program": "system", "programId": SYSTEM_PROGRAM, "stackHeight": None,
+            "parsed": {"type": "transfer", "info": {"source": source, "destination": destination, "lamports": lamports}}}
+
+
+def token_transfer(source: str, destination: str, authority: str, amount: int, mint: Optional[str] = None,
+                   decimals: int = 6) -> Dict:
+    """spl-token ``transferChecked`` (with ``mint``) or plain ``transfer``"""
+    if mint is None:
+        parsed = {"type": "transfer",
+                  "info": {"source": source, "destination": destination, "authority": authority, "amount": str(amount)}}
+    else:
+        ui = amount / 10 ** decimals
+        parsed = {"type": "transferChecked", "info": {
+            "source": source, "destination": destination, "authority": authority, "mint": mint,
+            "tokenAmount": {"amount": str(amount), "decimals": decimals, "uiAmount": ui, "uiAmountString": str(ui)},
+        }}
+    return {"program": "spl-token", "programId": TOKEN_PROGRAM, "stackHeight": None, "parsed": parsed}
+
+
+def memo(text: str) -> Dict:
+    return {"program": "spl-memo", "programId": MEMO_PROGRAM, "parsed": text, "stackHeight": None}
+
+
+def opaque(*accounts: str) -> Dict:
+    """An instruction of a program the RPC cannot parse (aggregator, CPI wrapper, ...)"""
+    return {"programId": OPAQUE_PROGRAM, "accounts": list(accounts), "data": "3Bxs4h24hBtQy9rw", "stackHeight": None}
+
+
+def transaction(fee_payer: str, instructions: List[Dict], sol: List[Tuple[str, str, int]] = (),
+                tokens: List[Tuple[str, str, int]] = (), token_accounts: Optional[Dict[str, Tuple[str, str]]] = None,
+                inner: Optional[Dict[int, List[Dict]]] = None, references: List[str] = (), fee: int = 5000,
+                decimals: int = 6):
+    """A transaction as ``parse_transaction`` receives it (``GetTransactionResp.value.transaction``).
+
+    ``sol`` and ``tokens`` are ``(source, destination, amount)`` movements;
+    ``token_accounts`` maps token account -> (owner, mint).
+    """
+    token_accounts = token_accounts or {}
+    keys: List[str] = []
+
+    def key(k: str):
+        if k not in keys:
+            keys.append(k)
+
+    key(fee_payer)
+    for source, destination, _ in list(sol) + list(tokens):
+        key(source)
+        key(destination)
+    for account in token_accounts:
+        key(account)
+    for program in (SYSTEM_PROGRAM, TOKEN_PROGRAM, MEMO_PROGRAM, OPAQUE_PROGRAM):
+        key(program)
+    for reference in references:
+        key(reference)
+
+    pre = [10 ** 12] * len(keys)
+    post = list(pre)
+    post[keys.index(fee_payer)] -= fee
+    for source, destination, lamports in sol:
+        post[keys.index(source)] -= lamports
+        post[keys.index(destination)] += lamports
+
+    token_pre = {account: 10 ** 9 for account in token_accounts}
+    token_post = defaultdict(int, token_pre)
+    for source, destination, amount in tokens:
+        token_post[source] -= amount
+        token_post[destination] += amount
+
+    def balances(amounts):
+        return [{
+            "accountIndex": keys.index(account), "mint": mint, "owner": owner, "programId": TOKEN_PROGRAM,
+            "uiTokenAmount": {"amount": str(amounts[account]), "decimals": decimals,
+                              "uiAmount": amounts[account] / 10 ** decimals,
+                              "uiAmountString": str(amounts[account] / 10 ** decimals)},
+        } for account, (owner, mint) in token_accounts.items()]
+
+    response = {"jsonrpc": "2.0", "id": 1, "result": {
+        "slot": 300_000_000, "blockTime": 1_700_000_000, "version": 0,
+        "transaction": {
+            "signatures": ["1" * 64],
+            "message": {
+                "accountKeys": [{"pubkey": k, "signer": k == fee_payer, "writable": True, "source": "transaction"}
+                                for k in keys],
+                "recentBlockhash": pubkey(199),
+                "instructions": instructions,
+            },
+        },
+        "meta": {
+            "err": None, "status": {"Ok": None}, "fee": fee,
+            "preBalances": pre, "postBalances": post,
+            "innerInstructions": [
+                {"index": index, "instructions": [{**ix, "stackHeight": 2} for ix in ixs]}
+                for index, ixs in (inner or {}).items()
+            ],
+            "logMessages": [],
+            "preTokenBalances": balances(token_pre), "postTokenBalances": balances(token_post),
+            "rewards": [], "loadedAddresses": {"writable": [], "readonly": []},
+            "computeUnitsConsumed": 450,
+        },
+    }}
+    return GetTransactionResp.from_json(json.dumps(response)).value.transaction